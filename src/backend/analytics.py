@@ -0,0 +1,170 @@
+"""
+analytics.py — Agregados de /api/analytics, actualizables de forma incremental.
+
+En lugar de recalcular los groupby sobre todo el dataset puntuado, se
+mantienen conteos y sumas por carrera, presión académica y horas de sueño,
+la distribución de riesgo, los conteos de factores y los top-k de alertas.
+Al ingerir registros nuevos (POST /api/students/ingest) solo se procesan
+esas filas y se arma el payload a partir de los agregados.
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+from serializers import alert_records
+from student_index import RISK_LEVELS
+
+# Cantidad de alertas en "recent_alerts"
+TOP_ALERTS = 10
+
+# (nombre en el payload, regla sobre el DataFrame) — mismo orden que el original
+FACTOR_RULES = [
+    ("Sueño Insuficiente", lambda df: df["Sleep Duration"].astype(str).str.contains(
+        "Less than 5|less than 5", case=False, na=False).to_numpy()),
+    ("Estrés Financiero Alto", lambda df: (pd.to_numeric(df["Financial Stress"], errors="coerce") >= 4).to_numpy()),
+    ("Presión Académica Alta", lambda df: (pd.to_numeric(df["Academic Pressure"], errors="coerce") >= 4).to_numpy()),
+    ("CGPA Bajo", lambda df: (pd.to_numeric(df["CGPA"], errors="coerce") < 4.0).to_numpy()),
+]
+
+
+class AnalyticsAggregates:
+    """
+    Estado agregado de un dataset puntuado (salida de predict_batch + id y
+    Depression_actual). `add` no modifica la instancia: retorna una nueva,
+    así quien esté armando un payload nunca ve un estado a medias.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.probability_sum = 0.0
+        self.risk_counts = np.zeros(len(RISK_LEVELS), dtype=np.int64)
+        self.by_degree = {}    # carrera → [low, medium, high]
+        self.by_pressure = {}  # presión → [conteo, suma prob., suma depresión, conteo con etiqueta]
+        self.by_sleep = {}     # sueño → ídem
+        self.factor_counts = {name: 0 for name, _ in FACTOR_RULES}
+        self.top = []          # [(probabilidad, posición)] de mayor a menor
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "AnalyticsAggregates":
+        return cls().add(df, offset=0)
+
+    def add(self, df: pd.DataFrame, offset: int) -> "AnalyticsAggregates":
+        """Nuevos agregados con las filas de `df`, que ocupan las posiciones offset.. del dataset."""
+        new = copy.deepcopy(self)
+        if len(df) == 0:
+            return new
+
+        probability = df["probability"].to_numpy(dtype=float)
+        risk = pd.Categorical(df["risk_level"], categories=RISK_LEVELS).codes
+        depression = pd.to_numeric(df["Depression_actual"], errors="coerce").to_numpy(dtype=float)
+        labeled = ~np.isnan(depression)
+
+        new.total += len(df)
+        new.probability_sum += float(probability.sum())
+        new.risk_counts += np.bincount(risk[risk >= 0], minlength=len(RISK_LEVELS))
+
+        # ── por carrera: conteos por nivel de riesgo ──
+        for degree, rows in _groups(df["Degree"]):
+            counts = new.by_degree.setdefault(degree, np.zeros(len(RISK_LEVELS), dtype=np.int64))
+            codes = risk[rows]
+            counts += np.bincount(codes[codes >= 0], minlength=len(RISK_LEVELS))
+
+        # ── por presión académica y por sueño: conteos y sumas ──
+        for column, target in (("Academic Pressure", new.by_pressure), ("Sleep Duration", new.by_sleep)):
+            for key, rows in _groups(df[column]):
+                acc = target.setdefault(key, [0, 0.0, 0.0, 0])
+                acc[0] += len(rows)
+                acc[1] += float(probability[rows].sum())
+                acc[2] += float(np.nansum(depression[rows]))
+                acc[3] += int(labeled[rows].sum())
+
+        for name, rule in FACTOR_RULES:
+            new.factor_counts[name] += int(rule(df).sum())
+
+        # ── top-k: a igualdad de probabilidad, primero la fila anterior ──
+        order = np.argsort(-probability, kind="stable")[:TOP_ALERTS]
+        candidates = new.top + [(float(probability[i]), offset + int(i)) for i in order]
+        new.top = sorted(candidates, key=lambda c: (-c[0], c[1]))[:TOP_ALERTS]
+        return new
+
+    def alert_positions(self) -> list:
+        """Posiciones en el dataset puntuado de las filas de "recent_alerts", en orden."""
+        return [position for _, position in self.top]
+
+    def payload(self, alert_rows: pd.DataFrame) -> dict:
+        """Payload de /api/analytics; `alert_rows` son las filas de alert_positions()."""
+        total_students = self.total
+
+        risk_by_degree = []
+        for degree in sorted(self.by_degree):
+            counts = self.by_degree[degree]
+            total = int(counts.sum())
+            if total < 10:
+                continue
+            risk_by_degree.append({
+                "degree": degree,
+                "low": int(counts[0]),
+                "medium": int(counts[1]),
+                "high": int(counts[2]),
+                "total": total,
+                "high_pct": round(np.float64(counts[2]) / total * 100, 1),
+            })
+        risk_by_degree.sort(key=lambda x: x["high_pct"], reverse=True)
+
+        risk_distribution = {level: int(self.risk_counts[i]) for i, level in enumerate(RISK_LEVELS)}
+
+        factors = [
+            {
+                "name": name,
+                "value": self.factor_counts[name],
+                "pct": round(self.factor_counts[name] / total_students * 100, 1),
+            }
+            for name, _ in FACTOR_RULES
+        ]
+        factors.sort(key=lambda x: x["value"], reverse=True)
+
+        risk_by_pressure = [
+            {"pressure": int(pressure), **_rates(self.by_pressure[pressure])}
+            for pressure in sorted(self.by_pressure)
+        ]
+        risk_by_sleep = [
+            {"sleep_duration": sleep, **_rates(self.by_sleep[sleep])}
+            for sleep in sorted(self.by_sleep)
+            if self.by_sleep[sleep][0] >= 5
+        ]
+
+        alerts = alert_records(alert_rows)
+
+        return {
+            "total_students": total_students,
+            "avg_probability": round(self.probability_sum / total_students, 1),
+            "risk_distribution": risk_distribution,
+            "risk_by_degree": risk_by_degree[:10],
+            "contributing_factors": factors,
+            "risk_by_pressure": risk_by_pressure,
+            "risk_by_sleep": risk_by_sleep,
+            "recent_alerts": alerts,
+        }
+
+
+def _groups(values: pd.Series):
+    """(valor, posiciones) por cada valor distinto no nulo, en orden de aparición."""
+    codes, uniques = pd.factorize(values)
+    if len(uniques) == 0:
+        return
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    for code, key in enumerate(uniques):
+        key = key.item() if isinstance(key, np.generic) else key
+        yield key, order[bounds[code]:bounds[code + 1]]
+
+
+def _rates(acc: list) -> dict:
+    count, probability_sum, depression_sum, labeled = acc
+    return {
+        "depression_rate": round(np.float64(depression_sum) / labeled * 100, 1) if labeled else None,
+        "avg_probability": round(probability_sum / count, 1),
+        "count": count,
+    }
@@ -0,0 +1,265 @@
+"""
+analytics_query.py — Consultas group-by genéricas para /api/analytics/query.
+
+Cada dimensión se reduce a un arreglo de códigos enteros por fila (-1 si
+falta el valor) y su lista de etiquetas:
+    - categóricas: los códigos de pandas (el dataset ya las carga como
+      category) o pd.factorize si la columna llegó como texto
+    - numéricas discretas (presiones, satisfacciones): un código por valor
+    - numéricas continuas (edad, CGPA, horas): intervalos fijos [a, b)
+Los códigos se calculan una vez por dataset puntuado y dimensión; al
+ingerir registros (QueryEngine.append) solo se codifican las filas nuevas.
+
+Una consulta combina los códigos de sus dimensiones en un solo índice de
+grupo (base mixta) y cada métrica es un np.bincount sobre ese índice:
+    count            → filas por grupo
+    risk_counts      → filas por grupo y nivel de riesgo (low/medium/high)
+    mean_probability → suma de probabilidades / filas
+    depression_rate  → suma de la etiqueta real / filas etiquetadas
+Sin groupby ni DataFrames intermedios: un cruce carrera × sueño sobre el
+dataset completo toma alrededor de un milisegundo.
+"""
+
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+
+from student_index import RISK_LEVELS
+
+# nombre en la API → (columna del dataset puntuado, tipo, bordes de los intervalos)
+DIMENSIONS = {
+    "gender": ("Gender", "category", None),
+    "city": ("City", "category", None),
+    "profession": ("Profession", "category", None),
+    "degree": ("Degree", "category", None),
+    "sleep_duration": ("Sleep Duration", "category", None),
+    "dietary_habits": ("Dietary Habits", "category", None),
+    "financial_stress": ("Financial Stress", "category", None),
+    "family_history": ("Family History of Mental Illness", "category", None),
+    "risk_level": ("risk_level", "risk", None),
+    "academic_pressure": ("Academic Pressure", "discrete", None),
+    "work_pressure": ("Work Pressure", "discrete", None),
+    "study_satisfaction": ("Study Satisfaction", "discrete", None),
+    "job_satisfaction": ("Job Satisfaction", "discrete", None),
+    "age": ("Age", "bins", (18, 21, 24, 27, 30, 35, np.inf)),
+    "cgpa": ("CGPA", "bins", (0, 5, 6, 7, 8, 9, np.inf)),
+    "work_study_hours": ("Work/Study Hours", "bins", (0, 3, 6, 9, np.inf)),
+}
+METRICS = ("count", "risk_counts", "mean_probability", "depression_rate")
+
+MAX_DIMENSIONS = 3
+# Límite de grupos posibles de un cruce (producto de las cardinalidades)
+MAX_GROUPS = 100_000
+
+
+class QueryError(ValueError):
+    """Consulta inválida (dimensión o métrica desconocida, cruce demasiado grande)."""
+
+
+def parse_list(value: str) -> list:
+    """"degree, sleep_duration" → ["degree", "sleep_duration"] (sin vacíos)."""
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def validate(dimensions: list, metrics: list) -> tuple:
+    """Dimensiones y métricas normalizadas (métricas en el orden de METRICS)."""
+    unknown = [d for d in dimensions if d not in DIMENSIONS]
+    if unknown:
+        raise QueryError(f"Dimensiones desconocidas: {unknown}. Disponibles: {sorted(DIMENSIONS)}")
+    if len(set(dimensions)) != len(dimensions):
+        raise QueryError("Dimensiones repetidas")
+    if len(dimensions) > MAX_DIMENSIONS:
+        raise QueryError(f"Máximo {MAX_DIMENSIONS} dimensiones por consulta")
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise QueryError(f"Métricas desconocidas: {unknown}. Disponibles: {list(METRICS)}")
+    return tuple(dimensions), tuple(m for m in METRICS if m in metrics or not metrics)
+
+
+def _bin_labels(edges: tuple) -> list:
+    labels = [f"{lo:g}-{hi:g}" for lo, hi in zip(edges[:-1], edges[1:])]
+    # El último intervalo es abierto (borde np.inf)
+    labels[-1] = f"{edges[-2]:g}+"
+    return labels
+
+
+def _label(value):
+    value = value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _metric_columns(df: pd.DataFrame) -> tuple:
+    """(probabilidad, código de riesgo, etiquetada, etiqueta real o 0) por fila."""
+    probability = df["probability"].to_numpy(dtype=np.float64)
+    risk = pd.Categorical(df["risk_level"], categories=RISK_LEVELS).codes.astype(np.intp)
+    depression = pd.to_numeric(df["Depression_actual"], errors="coerce").to_numpy(dtype=np.float64)
+    labeled = ~np.isnan(depression)
+    return probability, risk, labeled, np.where(labeled, depression, 0.0)
+
+
+def _frame_codes(df: pd.DataFrame, dimension: str, risk: np.ndarray) -> tuple:
+    """(códigos, etiquetas) de una dimensión sobre las filas de `df`."""
+    column, kind, edges = DIMENSIONS[dimension]
+    values = df[column]
+    if kind == "risk":
+        return risk, list(RISK_LEVELS)
+    if kind == "bins":
+        numeric = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+        codes = np.searchsorted(np.asarray(edges, dtype=np.float64), numeric, side="right") - 1
+        codes[(codes >= len(edges) - 1) | np.isnan(numeric)] = -1
+        return codes.astype(np.intp), _bin_labels(edges)
+    if kind == "discrete":
+        values = pd.to_numeric(values, errors="coerce")
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # El cache binario ya trae las categóricas codificadas: sin factorize
+        return values.cat.codes.to_numpy().astype(np.intp), [_label(v) for v in values.cat.categories]
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes.astype(np.intp), [_label(v) for v in uniques]
+
+
+def _merge_codes(first: tuple, second: tuple) -> tuple:
+    """
+    Códigos de dos tramos de filas consecutivos en un solo arreglo. Las
+    etiquetas del primero se conservan y las nuevas del segundo van al
+    final (como union_categoricals), así sus códigos no cambian.
+    """
+    (codes, labels), (more, more_labels) = first, second
+    if more_labels != labels:
+        position = {label: i for i, label in enumerate(labels)}
+        labels = list(labels)
+        for label in more_labels:
+            if label not in position:
+                position[label] = len(labels)
+                labels.append(label)
+        # El -1 (valor faltante) toma el último elemento: sigue siendo -1
+        mapping = np.array([position[label] for label in more_labels] + [-1], dtype=np.intp)
+        more = mapping[more]
+    return np.concatenate([codes, more]), labels
+
+
+class QueryEngine:
+    """
+    Códigos por dimensión y columnas de métricas de un dataset puntuado.
+
+    `append` agrega filas sin recodificar las anteriores: el motor nuevo
+    conserva el de la base (con sus códigos ya calculados) y codifica solo
+    las filas agregadas; cada dimensión se arma uniendo ambos códigos.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.size = len(df)
+        self.probability, self.risk, self.labeled, self.depression = _metric_columns(df)
+        self.all_risk_known = bool((self.risk >= 0).all())
+        self.base = None    # motor de las filas originales (None si es este)
+        self._added = None  # dimensión → (códigos, etiquetas) de las filas agregadas
+        self._codes = {}    # dimensión → (códigos, etiquetas)
+        self._lock = threading.Lock()
+
+    def append(self, df: pd.DataFrame) -> "QueryEngine":
+        """Nuevo motor con las filas de `df` al final; no modifica la instancia."""
+        new = copy.copy(self)
+        probability, risk, labeled, depression = _metric_columns(df)
+        new.df = None
+        new.size = self.size + len(df)
+        new.probability = np.concatenate([self.probability, probability])
+        new.risk = np.concatenate([self.risk, risk])
+        new.labeled = np.concatenate([self.labeled, labeled])
+        new.depression = np.concatenate([self.depression, depression])
+        new.all_risk_known = self.all_risk_known and bool((risk >= 0).all())
+        new.base = self.base or self
+        added = {dimension: _frame_codes(df, dimension, risk) for dimension in DIMENSIONS}
+        if self._added is not None:
+            added = {dimension: _merge_codes(self._added[dimension], added[dimension]) for dimension in DIMENSIONS}
+        new._added = added
+        new._codes = {}
+        new._lock = threading.Lock()
+        return new
+
+    def codes(self, dimension: str) -> tuple:
+        """(códigos int por fila, etiquetas) de una dimensión; se calcula una vez."""
+        cached = self._codes.get(dimension)
+        if cached is None:
+            with self._lock:
+                cached = self._codes.get(dimension)
+                if cached is None:
+                    if self.base is None:
+                        cached = _frame_codes(self.df, dimension, self.risk)
+                    else:
+                        cached = _merge_codes(self.base.codes(dimension), self._added[dimension])
+                    self._codes[dimension] = cached
+        return cached
+
+    def run(self, dimensions: tuple, metrics: tuple, min_count: int = 1) -> dict:
+        """
+        Ejecuta la consulta → {"dimensions", "metrics", "total", "groups"}.
+        Los grupos salen en el orden de las etiquetas y solo los que tienen
+        al menos `min_count` filas.
+        """
+        group = np.zeros(self.size, dtype=np.intp)
+        valid = np.ones(self.size, dtype=bool)
+        labels = []
+        n_groups = 1
+        for dimension in dimensions:
+            codes, dim_labels = self.codes(dimension)
+            n_groups *= max(len(dim_labels), 1)
+            if n_groups > MAX_GROUPS:
+                raise QueryError(f"El cruce tiene más de {MAX_GROUPS} grupos posibles")
+            group = group * max(len(dim_labels), 1) + np.maximum(codes, 0)
+            valid &= codes >= 0
+            labels.append(dim_labels)
+
+        # Sin valores faltantes (lo habitual) se evita copiar cada columna
+        rows = slice(None) if valid.all() else valid
+        group = group[rows]
+        counts = np.bincount(group, minlength=n_groups)
+        selected = np.flatnonzero(counts >= max(min_count, 1))
+        # Los resultados se pasan a listas solo para los grupos seleccionados
+        results = {}
+        if "risk_counts" in metrics:
+            risk, risk_group = self.risk[rows], group
+            if not self.all_risk_known:
+                known = risk >= 0
+                risk, risk_group = risk[known], group[known]
+            results["risk_counts"] = np.bincount(
+                risk_group * len(RISK_LEVELS) + risk, minlength=n_groups * len(RISK_LEVELS)
+            ).reshape(n_groups, len(RISK_LEVELS))[selected].tolist()
+        if "mean_probability" in metrics:
+            results["probability_sum"] = np.bincount(
+                group, weights=self.probability[rows], minlength=n_groups
+            )[selected].tolist()
+        if "depression_rate" in metrics:
+            results["depression_sum"] = np.bincount(
+                group, weights=self.depression[rows], minlength=n_groups
+            )[selected].tolist()
+            results["labeled"] = np.bincount(group, weights=self.labeled[rows], minlength=n_groups)[selected].tolist()
+
+        groups = []
+        for i, (g, count) in enumerate(zip(selected.tolist(), counts[selected].tolist())):
+            row = {}
+            rest = g
+            for dimension, dim_labels in zip(reversed(dimensions), reversed(labels)):
+                rest, code = divmod(rest, len(dim_labels))
+                row[dimension] = dim_labels[code]
+            row = {dimension: row[dimension] for dimension in dimensions}
+            if "count" in metrics:
+                row["count"] = count
+            if "risk_counts" in metrics:
+                row.update(zip(RISK_LEVELS, results["risk_counts"][i]))
+            if "mean_probability" in metrics:
+                row["mean_probability"] = round(results["probability_sum"][i] / count, 1)
+            if "depression_rate" in metrics:
+                labeled = int(results["labeled"][i])
+                row["depression_rate"] = round(results["depression_sum"][i] / labeled * 100, 1) if labeled else None
+            groups.append(row)
+
+        return {
+            "dimensions": list(dimensions),
+            "metrics": list(metrics),
+            "total": int(valid.sum()),
+            "groups": groups,
+        }
@@ -0,0 +1,14 @@
+"""
+benchmarks — Suite de rendimiento reproducible y sin conexión.
+
+Módulos:
+    synth_data   — Genera datasets sintéticos a 1x, 10x, 100x el CSV original
+    bench_model  — Micro-benchmarks de predict_single, predict_batch y del
+                   dataset puntuado (_get_predicted_dataset)
+    load_driver  — Generador de carga HTTP: throughput y p50/p95/p99 por endpoint
+    run          — Ejecuta todo y guarda los resultados en JSON; compara corridas
+
+Uso (desde src/backend):
+    python -m benchmarks.run --scales 1 10
+    python -m benchmarks.run --compare benchmarks/results/a.json benchmarks/results/b.json
+"""
@@ -0,0 +1,106 @@
+"""
+bench_model.py — Micro-benchmarks del modelo y del dataset puntuado.
+
+Mide, para un CSV dado:
+    - carga del dataset: CSV → cache columnar (frío) y desde el cache (tibio)
+    - _get_predicted_dataset: puntuar + indexar + publicar (frío) y
+      adjuntarse a lo ya publicado, como haría otro worker (tibio)
+    - predict_batch sobre el dataset completo
+    - predict_single por llamada, con el cache de predicciones vacío y lleno
+    - predict_many con lotes del tamaño del micro-batcher
+
+Se ejecuta en un proceso aparte por cada escala (run.py), porque main lee
+DATA_PATH y SHARED_DATASET_DIR al importarse.
+
+Uso:
+    python -m benchmarks.bench_model --data benchmarks/data/student_depression_x10.csv
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.load_driver import latency_summary
+
+
+def _timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def _repeat(fn, repeat: int) -> dict:
+    times = [_timed(fn) for _ in range(repeat)]
+    return {"repeat": repeat, "min_ms": round(min(times), 3), "median_ms": round(sorted(times)[len(times) // 2], 3)}
+
+
+def run(data_path: Path, single_samples: int = 2000, repeat: int = 3) -> dict:
+    data_path = Path(data_path).resolve()
+    work_dir = Path(tempfile.mkdtemp(prefix="bench-"))
+    os.environ["DATA_PATH"] = str(data_path)
+    os.environ["SHARED_DATASET_DIR"] = str(work_dir / "shared")
+    os.environ["INGEST_LOG_PATH"] = str(work_dir / "ingest.ndjson")
+
+    import main
+    import model_service
+    from dataset_cache import cache_dir_for, load_dataset
+
+    try:
+        results = {"rows": None}
+        model_service.get_model()
+
+        # ── dataset: CSV → cache columnar, y lectura desde el cache ──
+        shutil.rmtree(cache_dir_for(data_path), ignore_errors=True)
+        results["load_dataset_cold_ms"] = round(_timed(main._load_dataset), 3)
+        results["load_dataset_warm"] = _repeat(lambda: load_dataset(data_path), repeat)
+        df = main._load_dataset()
+        results["rows"] = len(df)
+
+        # ── dataset puntuado: primer worker (puntúa y publica) y siguientes (adjuntan) ──
+        results["predicted_dataset_cold_ms"] = round(_timed(main._get_predicted_dataset), 3)
+
+        def attach():
+            main._scored.clear()
+            main._get_predicted_dataset()
+
+        results["predicted_dataset_attach"] = _repeat(attach, repeat)
+        results["analytics_snapshot_ms"] = round(_timed(main._get_analytics_snapshot), 3)
+
+        # ── predict_batch sobre todo el dataset ──
+        X = df.drop(columns=["id", "Depression", "Have you ever had suicidal thoughts ?"])
+        results["predict_batch"] = _repeat(lambda: model_service.predict_batch(X), repeat)
+
+        # ── predict_single: cache vacío (misses) y luego las mismas filas (hits) ──
+        records = X.sample(n=min(single_samples, len(X)), random_state=0)[model_service.MODEL_B_COLUMNS]
+        records = records.astype({"Financial Stress": str}).to_dict("records")
+        entry = model_service.get_active_model()
+        model_service._prediction_cache.reset(entry.version)
+        for phase in ("predict_single_miss", "predict_single_hit"):
+            samples = [_timed(lambda r=r: model_service.predict_single(r)) for r in records]
+            results[phase] = latency_summary(samples)
+        results["prediction_cache"] = model_service.get_prediction_cache_stats()
+
+        # ── predict_many con lotes como los del micro-batcher ──
+        model_service._prediction_cache.reset(entry.version)
+        batch_size = main.PREDICT_BATCH_MAX_SIZE
+        batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+        samples = [_timed(lambda b=b: model_service.predict_many(b)) for b in batches]
+        results["predict_many"] = {"batch_size": batch_size, **latency_summary(samples)}
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks del modelo")
+    parser.add_argument("--data", required=True)
+    parser.add_argument("--single-samples", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="imprimir el JSON compacto en la última línea")
+    args = parser.parse_args()
+    output = run(args.data, args.single_samples, args.repeat)
+    print(json.dumps(output) if args.json else json.dumps(output, indent=2))
@@ -0,0 +1,170 @@
+"""
+load_driver.py — Generador de carga HTTP contra un servidor local.
+
+Cada endpoint se ejercita durante `duration` segundos con `concurrency`
+hilos, cada uno con su propia conexión keep-alive (http.client, sin
+dependencias externas). Se reporta throughput y latencias p50/p95/p99.
+
+Uso (con la API ya levantada):
+    python -m benchmarks.load_driver --url http://127.0.0.1:8000 --duration 10
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import CSV_DTYPES, clean_frame
+
+# Columnas del formulario de /api/predict (StudentInput)
+PREDICT_COLUMNS = [
+    "Gender", "Age", "City", "Profession", "Academic Pressure", "Work Pressure", "CGPA",
+    "Study Satisfaction", "Job Satisfaction", "Sleep Duration", "Dietary Habits", "Degree",
+    "Work/Study Hours", "Financial Stress", "Family History of Mental Illness",
+]
+
+
+def latency_summary(samples_ms: list) -> dict:
+    """Percentiles de una lista de latencias en milisegundos."""
+    if not samples_ms:
+        return {"count": 0}
+    values = np.asarray(samples_ms, dtype=float)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(len(values)),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def predict_bodies(data_path, sample: int = 5000, seed: int = 0) -> list:
+    """Cuerpos JSON para /api/predict tomados de filas del dataset (variados, para no medir solo hits del cache)."""
+    df = clean_frame(pd.read_csv(data_path, nrows=max(sample * 4, 1000), dtype=CSV_DTYPES))
+    df = df.sample(n=min(sample, len(df)), random_state=seed)
+    return [json.dumps(r).encode("utf-8") for r in df[PREDICT_COLUMNS].to_dict("records")]
+
+
+def default_scenarios(data_path, total_rows: int) -> list:
+    """
+    Escenarios por endpoint: (nombre, método, generador de (ruta, cuerpo)).
+    Las rutas varían (páginas, búsquedas) para no medir una sola respuesta.
+    """
+    bodies = predict_bodies(data_path)
+    pages = max(1, total_rows // 50)
+
+    def predict(rng):
+        return "/api/predict", rng.choice(bodies)
+
+    def students(rng):
+        return f"/api/students?page={rng.randint(1, pages)}", None
+
+    def students_search(rng):
+        return f"/api/students?search={rng.randint(1, 999)}&risk_filter={rng.choice(['all', 'low', 'medium', 'high'])}", None
+
+    return [
+        ("POST /api/predict", "POST", predict),
+        ("GET /api/students", "GET", students),
+        ("GET /api/students?search", "GET", students_search),
+        ("GET /api/analytics", "GET", lambda rng: ("/api/analytics", None)),
+        ("GET /api/dataset/columns", "GET", lambda rng: ("/api/dataset/columns", None)),
+    ]
+
+
+def run_endpoint(base_url: str, method: str, make_request, concurrency: int, duration: float, seed: int = 0) -> dict:
+    """Ejercita un endpoint con `concurrency` hilos durante `duration` segundos."""
+    parts = urlsplit(base_url)
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    statuses = [{} for _ in range(concurrency)]
+    start_barrier = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def worker(i: int):
+        rng = random.Random(seed + i)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        start_barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            path, body = make_request(rng)
+            t0 = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+                errors[i] += 1
+                continue
+            latencies[i].append((time.perf_counter() - t0) * 1000)
+            statuses[i][status] = statuses[i].get(status, 0) + 1
+            if status >= 400:
+                errors[i] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    deadline[0] = time.perf_counter() + duration
+    t_start = time.perf_counter()
+    start_barrier.wait()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t_start
+
+    samples = [x for worker_samples in latencies for x in worker_samples]
+    status_counts = {}
+    for worker_statuses in statuses:
+        for status, count in worker_statuses.items():
+            status_counts[str(status)] = status_counts.get(str(status), 0) + count
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": len(samples),
+        "errors": sum(errors),
+        "status": status_counts,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "latency": latency_summary(samples),
+    }
+
+
+def run(base_url: str, data_path, total_rows: int, concurrency: int = 8, duration: float = 10.0, only: list = None) -> dict:
+    """Corre todos los escenarios (o los de `only`) y retorna {endpoint: resultados}."""
+    results = {}
+    for name, method, make_request in default_scenarios(data_path, total_rows):
+        if only and name not in only:
+            continue
+        # Una petición previa para no medir la construcción de caches perezosos
+        path, body = make_request(random.Random(0))
+        run_endpoint(base_url, method, lambda rng: (path, body), concurrency=1, duration=0.2)
+        results[name] = run_endpoint(base_url, method, make_request, concurrency, duration)
+        r = results[name]
+        print(
+            f"[load_driver] {name:<28} {r['throughput_rps']:>9.1f} req/s  "
+            f"p50 {r['latency'].get('p50_ms', 0):>8.2f} ms  p95 {r['latency'].get('p95_ms', 0):>8.2f} ms  "
+            f"p99 {r['latency'].get('p99_ms', 0):>8.2f} ms  errores {r['errors']}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    from benchmarks.synth_data import SOURCE_PATH
+
+    parser = argparse.ArgumentParser(description="Carga HTTP contra una API local")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--data", default=str(SOURCE_PATH), help="CSV del que se toman los cuerpos de /api/predict")
+    parser.add_argument("--rows", type=int, default=27901, help="filas del dataset servido (para elegir páginas)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.url, args.data, args.rows, args.concurrency, args.duration), indent=2))
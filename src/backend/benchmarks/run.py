@@ -0,0 +1,175 @@
+"""
+run.py — Ejecuta la suite de benchmarks y guarda los resultados en JSON.
+
+Para cada escala: genera (o reutiliza) el dataset sintético, corre los
+micro-benchmarks en un proceso aparte, levanta la API con uvicorn sobre
+ese dataset y la somete a carga con load_driver. Los resultados (más la
+versión del código y del entorno) se escriben en benchmarks/results/.
+
+Uso (desde src/backend):
+    python -m benchmarks.run --scales 1 10 --duration 10
+    python -m benchmarks.run --compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import load_driver, synth_data
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _environment() -> dict:
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def _run_model_benchmarks(data_path: Path, repeat: int) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_model", "--data", str(data_path), "--repeat", str(repeat), "--json"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"bench_model falló:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _start_server(data_path: Path, port: int, work_dir: Path, timeout: float = 600) -> subprocess.Popen:
+    """Levanta uvicorn sobre `data_path` y espera a que /api/health responda 200."""
+    env = dict(
+        os.environ,
+        DATA_PATH=str(data_path),
+        SHARED_DATASET_DIR=str(work_dir / "shared"),
+        INGEST_LOG_PATH=str(work_dir / "ingest.ndjson"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn terminó antes de estar listo")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=2) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"La API no estuvo lista en {timeout} s")
+
+
+def run(scales: list, concurrency: int, duration: float, repeat: int, port: int,
+        skip_model: bool = False, skip_http: bool = False) -> dict:
+    results = {"environment": _environment(), "config": {
+        "scales": scales, "concurrency": concurrency, "duration_s": duration, "repeat": repeat,
+    }, "scales": {}}
+
+    for scale in scales:
+        data_path = synth_data.generate(scale)
+        print(f"[bench] Escala {scale}x ({data_path.name})")
+        scale_results = {}
+        if not skip_model:
+            scale_results["model"] = _run_model_benchmarks(data_path, repeat)
+        if not skip_http:
+            work_dir = Path(tempfile.mkdtemp(prefix="bench-http-"))
+            server = _start_server(data_path, port, work_dir)
+            try:
+                rows = int(json.loads(urllib.request.urlopen(
+                    f"http://127.0.0.1:{port}/api/students?page_size=1").read())["stats"]["total"])
+                scale_results["http"] = load_driver.run(
+                    f"http://127.0.0.1:{port}", data_path, rows, concurrency=concurrency, duration=duration
+                )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+                shutil.rmtree(work_dir, ignore_errors=True)
+        results["scales"][str(scale)] = scale_results
+    return results
+
+
+# ──────────────────────────────────────────────
+# Comparación de corridas
+# ──────────────────────────────────────────────
+# Métricas donde "más es mejor"; el resto son tiempos (menos es mejor)
+_HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def _flatten(prefix: str, value, out: dict):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else str(key), item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+
+
+def compare(path_a: Path, path_b: Path, threshold: float = 10.0) -> list:
+    """Métricas de tiempo y throughput de dos corridas; marca cambios mayores a `threshold` %."""
+    a, b = {}, {}
+    _flatten("", json.loads(Path(path_a).read_text())["scales"], a)
+    _flatten("", json.loads(Path(path_b).read_text())["scales"], b)
+    rows = []
+    for key in sorted(set(a) & set(b)):
+        if not (key.endswith("_ms") or key.endswith(_HIGHER_IS_BETTER)) or not a[key]:
+            continue
+        change = (b[key] - a[key]) / a[key] * 100
+        better = change > 0 if key.endswith(_HIGHER_IS_BETTER) else change < 0
+        flag = "" if abs(change) < threshold else ("mejora" if better else "REGRESIÓN")
+        rows.append((key, a[key], b[key], change, flag))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de la API")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10], help="escalas del dataset (p. ej. 1 10 100)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos de carga por endpoint")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--skip-model", action="store_true")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--output", help="archivo de resultados (por defecto benchmarks/results/<fecha>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"), help="comparar dos archivos de resultados")
+    args = parser.parse_args()
+
+    if args.compare:
+        for key, before, after, change, flag in compare(*args.compare):
+            print(f"{key:<70} {before:>12.3f} {after:>12.3f} {change:>+8.1f}%  {flag}")
+        sys.exit(0)
+
+    output = run(args.scales, args.concurrency, args.duration, args.repeat, args.port, args.skip_model, args.skip_http)
+    path = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(output, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"[bench] Resultados en {path}")
@@ -0,0 +1,82 @@
+"""
+synth_data.py — Datasets sintéticos con las distribuciones de student_depression.csv.
+
+Cada fila sintética parte de una fila real tomada al azar (bootstrap, que
+conserva las relaciones entre columnas) y, con probabilidad `mix`, cada
+columna se reemplaza por un valor tomado de la distribución marginal de esa
+columna. Así las distribuciones por columna se mantienen y las filas no son
+copias exactas. Los ids son nuevos y únicos. La generación es determinista
+para una misma semilla.
+
+Uso:
+    python -m benchmarks.synth_data --scales 1 10 100
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import CSV_DTYPES
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SOURCE_PATH = BACKEND_DIR.parent.parent / "data" / "student_depression.csv"
+OUTPUT_DIR = Path(__file__).resolve().parent / "data"
+
+# Filas generadas por bloque (acota la memoria a 100x)
+BLOCK_ROWS = 200_000
+
+
+def synth_path(scale: int, output_dir: Path = OUTPUT_DIR) -> Path:
+    return Path(output_dir) / f"student_depression_x{scale}.csv"
+
+
+def generate(
+    scale: int,
+    source: Path = SOURCE_PATH,
+    output_dir: Path = OUTPUT_DIR,
+    seed: int = 42,
+    mix: float = 0.2,
+    force: bool = False,
+) -> Path:
+    """Escribe (si no existe) el dataset sintético de `scale` veces el original y retorna su ruta."""
+    path = synth_path(scale, output_dir)
+    if path.exists() and not force:
+        return path
+
+    # Sin limpieza: el CSV sintético conserva el formato original (comilla en Sleep Duration)
+    original = pd.read_csv(source, dtype=CSV_DTYPES)
+    n_rows = len(original) * scale
+    rng = np.random.default_rng(seed)
+    columns = [c for c in original.columns if c != "id"]
+    values = {c: original[c].to_numpy() for c in columns}
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    next_id = int(original["id"].max()) + 1
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, n_rows, BLOCK_ROWS):
+            size = min(BLOCK_ROWS, n_rows - start)
+            base_rows = rng.integers(0, len(original), size)
+            block = {"id": np.arange(next_id + start, next_id + start + size)}
+            for col in columns:
+                column = values[col][base_rows]
+                swap = rng.random(size) < mix
+                column[swap] = values[col][rng.integers(0, len(original), int(swap.sum()))]
+                block[col] = column
+            pd.DataFrame(block, columns=original.columns).to_csv(f, index=False, header=start == 0)
+    tmp.replace(path)
+    print(f"[synth_data] {n_rows} registros → {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera datasets sintéticos para benchmarks")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", type=float, default=0.2, help="probabilidad de remuestrear cada celda")
+    parser.add_argument("--force", action="store_true", help="regenerar aunque ya exista")
+    args = parser.parse_args()
+    for scale in args.scales:
+        generate(scale, seed=args.seed, mix=args.mix, force=args.force)
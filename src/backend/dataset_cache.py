@@ -0,0 +1,218 @@
+"""
+dataset_cache.py — Cache binario y columnar del dataset.
+
+Parsear el CSV (y limpiar 'Sleep Duration') en cada arranque del contenedor
+y en cada reentrenamiento es innecesario. Este módulo escribe junto al CSV
+una carpeta `<nombre>.cache/` con:
+    - `v-*/`: un `.npy` por columna numérica (se carga con memory map) y
+      códigos enteros `.npy` para las columnas de texto, que se cargan
+      como `pd.Categorical` (codificación por diccionario)
+    - `manifest.json` con la huella del CSV (mtime + tamaño), el
+      vocabulario de cada columna de texto y la subcarpeta `v-*` vigente
+
+Si el CSV cambia, la huella deja de coincidir y el cache se regenera.
+
+Uso (paso de preprocesamiento, p. ej. en el Dockerfile):
+    python dataset_cache.py [ruta/al/dataset.csv]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Cambiar si cambia la limpieza, el formato del cache o las columnas que
+# agrega predict_batch (el dataset puntuado compartido usa el mismo formato)
+CACHE_FORMAT_VERSION = 3
+
+
+# Columnas categóricas que pandas podría inferir como número (Financial Stress
+# toma "1.0"…"5.0" y "?"); en archivos grandes la inferencia por bloques las
+# dejaría con tipos mezclados.
+CSV_DTYPES = {"Financial Stress": str, "Sleep Duration": str}
+
+
+def read_csv_clean(csv_path: Path) -> pd.DataFrame:
+    """Lee el CSV y aplica la limpieza estándar (comilla final en Sleep Duration)."""
+    return clean_frame(pd.read_csv(csv_path, dtype=CSV_DTYPES))
+
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Limpieza estándar sobre un DataFrame ya leído (p. ej. un bloque de un CSV subido)."""
+    if "Sleep Duration" in df.columns:
+        df["Sleep Duration"] = df["Sleep Duration"].str.replace("'", "", regex=False)
+    return df
+
+
+def cache_dir_for(csv_path: Path) -> Path:
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + ".cache")
+
+
+def csv_fingerprint(csv_path: Path) -> dict:
+    st = Path(csv_path).stat()
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def load_dataset(csv_path: Path) -> pd.DataFrame:
+    """
+    Retorna el dataset limpio, desde el cache binario si está vigente.
+
+    Si el cache no existe o está desactualizado se reconstruye; si no se
+    puede escribir (sistema de archivos de solo lectura) se usa el CSV.
+    """
+    csv_path = Path(csv_path)
+    cache_dir = cache_dir_for(csv_path)
+    fingerprint = csv_fingerprint(csv_path)
+
+    cached = read_frame(cache_dir, fingerprint)
+    if cached is not None:
+        return cached[0]
+
+    df = read_csv_clean(csv_path)
+    try:
+        write_frame(df, cache_dir, fingerprint)
+        print(f"[dataset_cache] Cache binario escrito en {cache_dir}")
+        cached = read_frame(cache_dir, fingerprint)
+        if cached is not None:
+            return cached[0]
+    except OSError as e:
+        print(f"[dataset_cache] No se pudo escribir el cache ({e}); se usa el CSV")
+    return df
+
+
+def write_frame(df: pd.DataFrame, cache_dir: Path, source: dict, arrays: dict = None) -> None:
+    """
+    Escribe un DataFrame (y arreglos numpy adicionales, p. ej. índices) en
+    formato columnar.
+
+    Los archivos van a una subcarpeta nueva `v-*/` dentro de `cache_dir` y
+    se publican reemplazando `manifest.json` (que apunta a esa subcarpeta)
+    con un rename atómico. Quien lee sin lock ve el manifiesto anterior
+    completo o el nuevo completo, nunca una carpeta ausente o a medio
+    escribir. La versión anterior se borra después; los memory maps ya
+    abiertos sobre ella siguen siendo válidos.
+
+    `source` identifica la versión de los datos; read_frame solo acepta
+    el cache si coincide.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    data_dir = Path(tempfile.mkdtemp(prefix="v-", dir=cache_dir))
+    manifest_tmp = None
+    try:
+        columns = []
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            entry = {"name": col, "file": f"{i}.npy"}
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                entry["kind"] = "numeric"
+                np.save(data_dir / entry["file"], series.to_numpy())
+            else:
+                categorical = pd.Categorical(series)
+                categories = categorical.categories
+                entry["kind"] = "category"
+                entry["categories"] = [str(c) for c in categories]
+                # Los códigos se guardan con el dtype que pandas elige según la
+                # cantidad de categorías (int8, int16, ...): al leerlos,
+                # from_codes los usa tal cual, sin convertirlos ni copiarlos
+                np.save(data_dir / entry["file"], categorical.codes)
+            columns.append(entry)
+
+        extra = {}
+        for name, values in (arrays or {}).items():
+            extra[name] = f"array_{len(extra)}.npy"
+            np.save(data_dir / extra[name], np.asarray(values))
+
+        manifest = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "source": source,
+            "data": data_dir.name,
+            "rows": len(df),
+            "columns": columns,
+            "arrays": extra,
+        }
+        fd, manifest_tmp = tempfile.mkstemp(prefix="manifest.", suffix=".tmp", dir=cache_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        previous = _read_manifest(cache_dir)
+        os.replace(manifest_tmp, cache_dir / "manifest.json")
+        manifest_tmp = None
+    except BaseException:
+        shutil.rmtree(data_dir, ignore_errors=True)
+        if manifest_tmp is not None:
+            Path(manifest_tmp).unlink(missing_ok=True)
+        raise
+
+    # Solo se borra la versión que se acaba de reemplazar: otra escritura
+    # concurrente podría estar llenando su propia subcarpeta
+    stale = (previous or {}).get("data")
+    if stale and stale != data_dir.name:
+        shutil.rmtree(cache_dir / stale, ignore_errors=True)
+    # Archivos del formato anterior (columnas sueltas en cache_dir)
+    for path in cache_dir.glob("*.npy"):
+        path.unlink(missing_ok=True)
+
+
+def _read_manifest(cache_dir: Path):
+    try:
+        with open(Path(cache_dir) / "manifest.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_frame(cache_dir: Path, source: dict):
+    """
+    Retorna (DataFrame, arreglos adicionales) con las columnas numéricas, los
+    códigos de las categóricas y los arreglos abiertos como memory map (sin
+    copia), o None si el cache no existe o no corresponde a `source`.
+    """
+    # Si una escritura concurrente publica otra versión y borra la que se
+    # estaba abriendo, se vuelve a leer el manifiesto
+    for _ in range(3):
+        manifest = _read_manifest(cache_dir)
+        if manifest is None:
+            return None
+        if manifest.get("format_version") != CACHE_FORMAT_VERSION or manifest.get("source") != source:
+            return None
+        try:
+            return _open_version(Path(cache_dir) / manifest["data"], manifest)
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError, KeyError):
+            return None
+    return None
+
+
+def _open_version(data_dir: Path, manifest: dict) -> tuple:
+    data = {}
+    arrays = {}
+    for entry in manifest["columns"]:
+        values = np.load(data_dir / entry["file"], mmap_mode="r")
+        if entry["kind"] == "category":
+            data[entry["name"]] = pd.Categorical.from_codes(
+                values, categories=pd.Index(entry["categories"], dtype=object)
+            )
+        else:
+            data[entry["name"]] = values
+    for name, file in manifest.get("arrays", {}).items():
+        arrays[name] = np.load(data_dir / file, mmap_mode="r")
+    return pd.DataFrame(data, copy=False), arrays
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        path = Path(sys.argv[1])
+    else:
+        base = Path(__file__).resolve().parent
+        docker_path = base / "data" / "student_depression.csv"
+        path = docker_path if docker_path.exists() else base.parent.parent / "data" / "student_depression.csv"
+    df = read_csv_clean(path)
+    write_frame(df, cache_dir_for(path), csv_fingerprint(path))
+    print(f"[dataset_cache] {len(df)} registros → {cache_dir_for(path)}")
@@ -0,0 +1,64 @@
+"""
+ingest_log.py — Log de solo-anexado con los registros ingeridos.
+
+POST /api/students/ingest agrega estudiantes sin reescribir el CSV: cada
+registro se anexa como una línea JSON a `<dataset>.ingest.ndjson`. Al
+arrancar (o cuando otro worker anexó registros) solo se leen y puntúan las
+líneas posteriores al último offset aplicado, sin volver a puntuar el
+dataset completo.
+
+Si los registros se incorporan al CSV, el log debe eliminarse para no
+duplicarlos.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from shared_dataset import file_lock
+
+
+class IngestLog:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def size(self) -> int:
+        """Bytes escritos en el log (0 si aún no existe)."""
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def lock(self):
+        """Lock entre procesos para leer-asignar-anexar de forma consistente."""
+        return file_lock(self.path.with_name(self.path.name + ".lock"))
+
+    def read_from(self, offset: int) -> tuple:
+        """
+        Registros a partir del byte `offset` → (registros, nuevo offset).
+
+        Solo se consumen líneas completas: una escritura en curso de otro
+        proceso se leerá en la siguiente llamada.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        end = data.rfind(b"\n") + 1
+        records = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        return records, offset + end
+
+    def append(self, records: list) -> None:
+        """Anexa los registros al final del archivo (O_APPEND) y hace fsync."""
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,131 @@
+"""
+linear_artifact.py — Formato compacto para modelos lineales (sin scikit-learn).
+
+Un pipeline StandardScaler + OneHotEncoder + LogisticRegression se reduce a
+medias, escalas y pesos de las numéricas, el vocabulario y los pesos de
+cada categórica, y el intercepto (ver LinearScorer en model_service.py).
+Este módulo guarda eso en `models/<nombre>.linear.json`:
+
+    {
+      "format": "riesgo-linear", "format_version": 1,
+      "name": ..., "input_columns": [...], "classes": [0, 1],
+      "numeric": [{"column", "mean", "scale", "weight"}, ...],
+      "categorical": [{"column", "categories": [...], "weights": [...]}, ...],
+      "intercept": ..., "source": {...},
+      "checksum": "sha256:..."
+    }
+
+Los floats se escriben con repr (ida y vuelta exacta), así que el modelo
+cargado da las mismas probabilidades que el pipeline. El checksum cubre
+todo el documento salvo el propio campo; read() lo verifica.
+
+Cargarlo solo requiere json/hashlib: el servidor no importa sklearn, scipy
+ni joblib, y no depende de las versiones con que se entrenó.
+
+Uso (exportar artefactos .joblib ya existentes):
+    python linear_artifact.py [models/logistic_b.joblib ...]
+"""
+
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+FORMAT = "riesgo-linear"
+FORMAT_VERSION = 1
+SUFFIX = ".linear.json"
+
+
+def artifact_path(models_dir: Path, name: str) -> Path:
+    return Path(models_dir) / f"{name}{SUFFIX}"
+
+
+def artifact_name(path: Path) -> str:
+    """models/logistic_b.linear.json → logistic_b"""
+    return Path(path).name[: -len(SUFFIX)]
+
+
+def _checksum(payload: dict) -> str:
+    body = {k: v for k, v in payload.items() if k != "checksum"}
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return "sha256:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def write(path: Path, name: str, input_columns: list, num_terms: list, cat_weights: dict,
+          intercept: float, classes: list = (0, 1), source: dict = None) -> Path:
+    """
+    Escribe el artefacto. `num_terms` es [(columna, media, escala, peso), ...]
+    y `cat_weights` {columna: {categoría: peso}}, igual que en LinearScorer.
+    """
+    payload = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "name": name,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "input_columns": [str(c) for c in input_columns],
+        "classes": [int(c) for c in classes],
+        "numeric": [
+            {"column": col, "mean": float(mean), "scale": float(scale), "weight": float(weight)}
+            for col, mean, scale, weight in num_terms
+        ],
+        # Listas paralelas (no un dict) para conservar el tipo de cada categoría
+        "categorical": [
+            {
+                "column": col,
+                "categories": [c.item() if hasattr(c, "item") else c for c in weights],
+                "weights": [float(w) for w in weights.values()],
+            }
+            for col, weights in cat_weights.items()
+        ],
+        "intercept": float(intercept),
+        "source": source or {},
+    }
+    payload["checksum"] = _checksum(payload)
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=1, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+    return path
+
+
+def read(path: Path) -> dict:
+    """
+    Lee y valida el artefacto → dict con num_terms, cat_weights, intercept,
+    input_columns, classes y el documento original en "payload".
+    """
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    if payload.get("format") != FORMAT:
+        raise ValueError(f"{path}: no es un artefacto {FORMAT}")
+    if payload.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"{path}: versión de formato {payload.get('format_version')} no soportada (se espera {FORMAT_VERSION})"
+        )
+    if payload.get("checksum") != _checksum(payload):
+        raise ValueError(f"{path}: el checksum no coincide (artefacto corrupto o editado)")
+    return {
+        "num_terms": [(t["column"], t["mean"], t["scale"], t["weight"]) for t in payload["numeric"]],
+        "cat_weights": {
+            t["column"]: dict(zip(t["categories"], t["weights"])) for t in payload["categorical"]
+        },
+        "intercept": payload["intercept"],
+        "input_columns": payload["input_columns"],
+        "classes": payload["classes"],
+        "payload": payload,
+    }
+
+
+if __name__ == "__main__":
+    import joblib
+
+    from model_service import MODELS_DIR, export_linear_artifact
+
+    paths = [Path(p) for p in sys.argv[1:]] or sorted(MODELS_DIR.glob("*.joblib"))
+    for joblib_path in paths:
+        out = export_linear_artifact(
+            joblib.load(joblib_path), joblib_path.with_name(joblib_path.stem + SUFFIX), source_path=joblib_path
+        )
+        if out is None:
+            print(f"[linear_artifact] {joblib_path.name}: no es un pipeline lineal soportado; se omite")
+        else:
+            print(f"[linear_artifact] {joblib_path.name} → {out.name} ({out.stat().st_size / 1024:.1f} KB)")
@@ -3,22 +3,70 @@ main.py — API FastAPI para el Sistema Predictivo de Riesgo Depresivo.
 
 Endpoints:
     POST /api/predict       — Predicción individual de riesgo
-    GET  /api/students      — Lista de estudiantes con riesgo precalculado
-    GET  /api/analytics     — Estadísticas agregadas del dataset
-    GET  /api/health        — Health check
+    POST /api/predict/batch — Predicción por lotes (JSON array o NDJSON → NDJSON)
+    POST /api/predict/file  — Predicción sobre un CSV subido (CSV → CSV en streaming)
+    GET  /api/predict/batcher — Métricas del micro-batcher de /api/predict
+    GET  /api/predict/cache — Métricas del cache LRU de predicciones
+    GET  /api/models        — Modelos disponibles y modelo activo
+    POST /api/models/{name}/activate — Precalienta y activa otro modelo sin reiniciar
+    GET  /api/jobs          — Jobs de re-puntuación en curso y recientes
+    GET  /api/jobs/{id}     — Avance de un job (bloques y filas puntuadas)
+    POST /api/jobs/rescore  — Re-puntúa el dataset completo en segundo plano
+    GET  /api/students      — Lista de estudiantes con riesgo precalculado (orden, cursor, cache + gzip + ETag)
+    POST /api/students/ingest — Agrega estudiantes nuevos (solo se puntúan esas filas)
+    GET  /api/analytics     — Estadísticas agregadas del dataset (cache + gzip + ETag)
+    GET  /api/analytics/query — Group-by genérico: dimensiones y métricas a elección (cache + gzip + ETag)
+    GET  /api/analytics/thresholds — What-if de los umbrales de riesgo (conteos, precision/recall)
+    GET  /api/dataset/columns — Valores de las categóricas para el formulario (cache + gzip + ETag)
+    GET  /api/health        — Readiness: 200 solo cuando el warmup terminó
+    GET  /api/health/live   — Liveness: el proceso responde
+    GET  /api/metrics       — Métricas en formato Prometheus (latencia por etapa, errores, caches)
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import Response, ORJSONResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional
+from contextlib import asynccontextmanager
+import csv
+import io
+import os
+import threading
+import time
+from collections import Counter
 import pandas as pd
 import numpy as np
+from pandas.api.types import union_categoricals
 from pathlib import Path
 
-from model_service import predict_single, predict_batch, MODEL_B_COLUMNS, get_model
+from model_service import (
+    predict_many, predict_batch, decode_factor_flags, MODEL_B_COLUMNS, MODEL_B_NUMERIC_COLUMNS, ModelEntry,
+    get_model, get_active_model, get_registry, get_prediction_cache_stats, RISK_THRESHOLDS,
+)
+from streaming import (
+    DuplexStreamingResponse, RecordParseError, RequestBody,
+    iter_json_records, iter_multipart_file, iter_line_blocks, last_line_end,
+)
+from rescoring import Job, JobManager, score_frame, score_in_chunks
+from student_index import (
+    StudentIndex, SegmentedIndex, SORT_FIELDS, SORT_ORDERS, INDEX_FORMAT_VERSION, encode_cursor, decode_cursor,
+)
+from analytics import AnalyticsAggregates
+from analytics_query import QueryEngine, QueryError, parse_list, validate as validate_query, DIMENSIONS
+from thresholds import ThresholdAnalysis, validate as validate_thresholds
+from ingest_log import IngestLog
+from serializers import dumps, student_records
+from response_cache import ResponseCache, EncodedBody, encoded_response
+from static_bundle import StaticBundle
+from dataset_cache import load_dataset, clean_frame, CSV_DTYPES
+from micro_batcher import MicroBatcher, QueueFullError, BATCH_SIZE_BUCKETS, QUEUE_DELAY_BUCKETS_MS
+from metrics import (
+    METRICS_ENABLED, MetricsMiddleware, timer, observe_stage, register_collector, render,
+    sample, histogram_lines,
+)
+from shared_dataset import load_or_build, shared_path
 
 # ──────────────────────────────────────────────
 # Configuración
@@ -27,15 +75,115 @@ BASE_DIR = Path(__file__).resolve().parent
 PROJECT_DIR = BASE_DIR.parent.parent
 STATIC_DIR = BASE_DIR / "static"
 
-# En Docker, el dataset se copia a /app/data/; en local, está en ../../data/
+# Registros por bloque en /api/predict/batch (acota la memoria por petición)
+BATCH_CHUNK_SIZE = 1000
+
+# Bytes por bloque en /api/predict/file (cada bloque se lee y puntúa por separado)
+FILE_BLOCK_BYTES = int(os.environ.get("PREDICT_FILE_BLOCK_BYTES", str(1024 * 1024)))
+
+# Columnas agregadas al CSV de /api/predict/file
+FILE_SCORE_COLUMNS = ["probability", "prediction", "risk_level", "risk_label", "contributing_factors", "error"]
+
+# Si se define, POST /api/models/{name}/activate exige el header X-Admin-Token
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Micro-batching de /api/predict (configurable por variables de entorno)
+PREDICT_BATCH_MAX_SIZE = int(os.environ.get("PREDICT_BATCH_MAX_SIZE", "64"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.environ.get("PREDICT_BATCH_MAX_WAIT_MS", "2"))
+PREDICT_QUEUE_MAX = int(os.environ.get("PREDICT_QUEUE_MAX", "1024"))
+
+# En Docker, el dataset se copia a /app/data/; en local, está en ../../data/.
+# DATA_PATH permite apuntar a otro CSV (p. ej. los datasets sintéticos de benchmarks/)
 _data_docker = BASE_DIR / "data" / "student_depression.csv"
 _data_local = PROJECT_DIR / "data" / "student_depression.csv"
-DATA_PATH = _data_docker if _data_docker.exists() else _data_local
+if os.environ.get("DATA_PATH"):
+    DATA_PATH = Path(os.environ["DATA_PATH"])
+else:
+    DATA_PATH = _data_docker if _data_docker.exists() else _data_local
+
+# Log de registros ingeridos (POST /api/students/ingest). En producción
+# debe apuntar a un volumen persistente.
+INGEST_LOG_PATH = Path(os.environ.get(
+    "INGEST_LOG_PATH", str(DATA_PATH.with_name(DATA_PATH.stem + ".ingest.ndjson"))
+))
+INGEST_MAX_RECORDS = int(os.environ.get("INGEST_MAX_RECORDS", "5000"))
+# Filas ingeridas que se mantienen aparte (delta) antes de fusionarlas con el
+# dataset puntuado; hasta entonces cada ingesta solo copia el delta
+INGEST_COMPACT_ROWS = int(os.environ.get("INGEST_COMPACT_ROWS", "20000"))
+
+# Cache de respuestas codificadas de los GET de solo lectura (0 lo desactiva)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# ──────────────────────────────────────────────
+# Calentamiento (warmup) al arrancar
+# ──────────────────────────────────────────────
+# Se carga el modelo, se puntúa el dataset y se construyen los caches en un
+# hilo de fondo; /api/health no reporta "ok" hasta que termina, para que el
+# balanceador no envíe tráfico a una instancia fría.
+_warmup = {
+    "status": "pending",  # pending | running | ready | error
+    "current_step": None,
+    "steps": {},  # paso → segundos
+    "started_at": None,
+    "finished_at": None,
+    "error": None,
+    "job": None,  # job de re-puntuación del paso predicted_dataset
+}
+
+
+def _run_warmup():
+    _warmup["status"] = "running"
+    _warmup["started_at"] = time.time()
+    steps = [
+        ("model", get_model),
+        ("dataset", _load_dataset),
+        ("predicted_dataset", _warmup_scored),
+        ("analytics", _get_analytics_snapshot),
+        ("dataset_columns", _get_dataset_columns_body),
+        ("dummy_prediction", _warmup_prediction),
+    ]
+    try:
+        for name, step in steps:
+            _warmup["current_step"] = name
+            t0 = time.perf_counter()
+            step()
+            _warmup["steps"][name] = round(time.perf_counter() - t0, 4)
+        _warmup["status"] = "ready"
+    except Exception as e:
+        _warmup["status"] = "error"
+        _warmup["error"] = str(e)
+        print(f"[main] Error en warmup ({_warmup['current_step']}): {e}")
+    finally:
+        _warmup["current_step"] = None
+        _warmup["finished_at"] = time.time()
+
+
+def _warmup_scored():
+    """Puntúa el dataset con el modelo activo como job (avance en /api/jobs/{id})."""
+    job = _start_rescore(get_active_model())
+    _warmup["job"] = job.id
+    _wait_job(job)
+
+
+def _warmup_prediction():
+    """Predicción de prueba con el primer registro del dataset."""
+    row = _load_dataset().iloc[0]
+    predict_many([{col: row[col] for col in MODEL_B_COLUMNS}])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=_run_warmup, name="warmup", daemon=True).start()
+    yield
+    await _predict_batcher.stop()
+
 
 app = FastAPI(
     title="Sistema Predictivo de Riesgo Depresivo",
     description="API para predicción de riesgo de depresión en estudiantes universitarios",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -46,34 +194,341 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # ──────────────────────────────────────────────
 # Cache del dataset
 # ──────────────────────────────────────────────
 _df_cache = None
-_df_predicted_cache = None
+_df_cache_key = None
+_dataset_lock = threading.Lock()
+
+# Dataset puntuado por versión: (huella del CSV, versión del modelo) →
+# {"key", "df", "delta", "index", "aggregates", "analytics", "query",
+# "thresholds", "log_offset"}.
+# "df" es el dataset puntuado publicado (compartido entre workers con
+# memory map) y no se modifica; las filas ingeridas van en "delta", a
+# continuación, e "index" (SegmentedIndex) cubre ambos segmentos. Cuando
+# el delta llega a INGEST_COMPACT_ROWS filas se fusiona con la base.
+# Normalmente solo hay una entrada (la del modelo activo); durante un
+# cambio de modelo convive con la del nuevo, y durante la re-puntuación
+# de un CSV nuevo, con la del anterior. Cada ingesta reemplaza el dict
+# completo, así quien lo lee ve df, índice y agregados de la misma versión.
+_scored = {}
+_scored_locks = {}
+_scored_lock = threading.Lock()
+
+_ingest_log = IngestLog(INGEST_LOG_PATH)
+_ingest_lock = threading.Lock()
+
+_response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES)
+
+
+def _dataset_fingerprint() -> str:
+    """Huella barata del CSV (mtime + tamaño) para invalidar los caches."""
+    if not DATA_PATH.exists():
+        raise FileNotFoundError(f"Dataset no encontrado en {DATA_PATH}")
+    st = DATA_PATH.stat()
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
 
 
 def _load_dataset() -> pd.DataFrame:
-    global _df_cache
-    if _df_cache is None:
-        if not DATA_PATH.exists():
-            raise FileNotFoundError(f"Dataset no encontrado en {DATA_PATH}")
-        _df_cache = pd.read_csv(DATA_PATH)
-        if "Sleep Duration" in _df_cache.columns:
-            _df_cache["Sleep Duration"] = _df_cache["Sleep Duration"].str.replace("'", "", regex=False)
+    global _df_cache, _df_cache_key
+    key = _dataset_fingerprint()
+    if _df_cache is None or _df_cache_key != key:
+        with _dataset_lock:
+            if _df_cache is None or _df_cache_key != key:
+                _df_cache, _df_cache_key = load_dataset(DATA_PATH), key
     return _df_cache
 
 
-def _get_predicted_dataset() -> pd.DataFrame:
-    global _df_predicted_cache
-    if _df_predicted_cache is None:
-        df = _load_dataset().copy()
-        cols_to_drop = ["id", "Depression", "Have you ever had suicidal thoughts ?"]
-        X = df.drop(columns=[c for c in cols_to_drop if c in df.columns])
-        _df_predicted_cache = predict_batch(X)
-        _df_predicted_cache["id"] = df["id"]
-        _df_predicted_cache["Depression_actual"] = df["Depression"]
-    return _df_predicted_cache
+def _get_scored(entry: ModelEntry = None) -> dict:
+    """
+    Dataset puntuado + índice para un modelo (por defecto, el activo).
+
+    Si el CSV cambió y hay un dataset puntuado anterior del mismo modelo,
+    se sigue sirviendo ese mientras un job re-puntúa el nuevo en segundo
+    plano. Sin dataset anterior (o si el job falló) se puntúa aquí mismo.
+    """
+    entry = entry or get_active_model()
+    key = (_dataset_fingerprint(), entry.version)
+    scored = _scored.get(key)
+    if scored is not None and scored["log_offset"] >= _ingest_log.size():
+        return scored
+    if scored is None:
+        previous = _previous_scored(entry)
+        if previous is not None:
+            job = _start_rescore(entry, key, retry=False)
+            if job.status != "error":
+                return _refresh_scored(previous, entry)
+    return _build_scored(entry, key)
+
+
+def _build_scored(entry: ModelEntry, key: tuple, job: Job = None, force: bool = False) -> dict:
+    """
+    Puntúa (o reutiliza) el dataset de `key` y lo publica en _scored de una
+    vez. Con `force` se puntúa de nuevo fuera del lock, así las ingestas
+    siguen aplicándose al dataset publicado mientras tanto.
+    """
+    built = _score_snapshot(entry, key, job, force=True) if force else None
+    with _scored_lock:
+        build_lock = _scored_locks.setdefault(key, threading.Lock())
+    with build_lock:
+        scored = built or _scored.get(key)
+        if scored is None:
+            scored = _score_snapshot(entry, key, job)
+        # Registros ingeridos (por este u otro worker) aún no aplicados
+        scored = _apply_ingested(scored, entry)
+        with _scored_lock:
+            _scored[key] = scored
+            _prune_scored(keep_versions={entry.version, get_active_model().version})
+    return scored
+
+
+def _score_snapshot(entry: ModelEntry, key: tuple, job: Job = None, force: bool = False) -> dict:
+    df = _load_dataset()
+    # Compartido entre workers: solo el primero puntúa el dataset
+    with timer("scored_dataset_build"):
+        predicted, arrays = load_or_build(
+            shared_path(f"scored-{entry.name}", DATA_PATH),
+            {"dataset": key[0], "model": key[1], "index": INDEX_FORMAT_VERSION},
+            lambda: _score_dataset(df, entry, job),
+            force=force,
+        )
+    if job is not None:
+        job.phase = "publishing"
+    return {
+        "key": key,
+        "df": predicted,
+        "delta": None,
+        "index": SegmentedIndex(StudentIndex.from_arrays(arrays)),
+        "aggregates": None,
+        "analytics": None,
+        "query": None,
+        "thresholds": None,
+        "log_offset": 0,
+    }
+
+
+def _refresh_scored(scored: dict, entry: ModelEntry) -> dict:
+    """Aplica los registros ingeridos pendientes a un dataset ya puntuado."""
+    if scored["log_offset"] >= _ingest_log.size():
+        return scored
+    key = scored["key"]
+    with _scored_lock:
+        build_lock = _scored_locks.setdefault(key, threading.Lock())
+    with build_lock:
+        scored = _apply_ingested(_scored.get(key, scored), entry)
+        with _scored_lock:
+            if key in _scored:
+                _scored[key] = scored
+    return scored
+
+
+def _previous_scored(entry: ModelEntry):
+    """Dataset puntuado del mismo modelo sobre una versión anterior del CSV, o None."""
+    with _scored_lock:
+        previous = [s for k, s in _scored.items() if k[1] == entry.version]
+    return previous[-1] if previous else None
+
+
+def _apply_ingested(scored: dict, entry: ModelEntry) -> dict:
+    """
+    Puntúa solo los registros nuevos del log y retorna el dict actualizado.
+    La base no se copia: las filas nuevas se agregan al delta y a su índice.
+    """
+    records, offset = _ingest_log.read_from(scored["log_offset"])
+    if not records:
+        return {**scored, "log_offset": offset}
+
+    with timer("ingest_apply"):
+        raw = pd.DataFrame(records, columns=["id", *MODEL_B_COLUMNS, "Depression"])
+        added = score_frame(raw, entry)
+        start = scored["index"].size
+        aggregates, query, thresholds = scored["aggregates"], scored["query"], scored["thresholds"]
+        base, delta = scored["df"], scored["delta"]
+        delta = added.reset_index(drop=True) if delta is None else pd.concat([delta, added], ignore_index=True)
+        if len(delta) >= INGEST_COMPACT_ROWS:
+            # Compactación en bloque: la base pasa a ser memoria del proceso
+            with timer("ingest_compact"):
+                base = _concat_segments(base, delta)
+                index = SegmentedIndex(scored["index"].base.append(delta))
+                delta = query = thresholds = None
+        else:
+            index = scored["index"].append(added)
+            query = query.append(added) if query is not None else None
+            thresholds = thresholds.append(query) if thresholds is not None else None
+        return {
+            "key": scored["key"],
+            "df": base,
+            "delta": delta,
+            "index": index,
+            "aggregates": aggregates.add(added, offset=start) if aggregates is not None else None,
+            "analytics": None,
+            "query": query,
+            "thresholds": thresholds,
+            "log_offset": offset,
+        }
+
+
+def _concat_segments(base: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Base + delta en un solo DataFrame; las columnas categóricas de la base lo siguen siendo."""
+    columns = {}
+    for col in base.columns:
+        if isinstance(base[col].dtype, pd.CategoricalDtype):
+            try:
+                columns[col] = union_categoricals([base[col].array, pd.Categorical(delta[col])])
+                continue
+            except TypeError:
+                pass
+        columns[col] = pd.concat([base[col], delta[col]], ignore_index=True).array
+    return pd.DataFrame(columns, copy=False)
+
+
+def _scored_rows(scored: dict, positions) -> pd.DataFrame:
+    """Filas del dataset puntuado por posición (de la base o del delta), en ese orden."""
+    base, delta = scored["df"], scored["delta"]
+    positions = np.asarray(positions, dtype=np.intp)
+    in_delta = positions >= len(base)
+    if delta is None or not in_delta.any():
+        return base.iloc[positions]
+    if in_delta.all():
+        return delta.iloc[positions - len(base)]
+    parts = pd.concat(
+        [base.iloc[positions[~in_delta]], delta.iloc[positions[in_delta] - len(base)]], ignore_index=True
+    )
+    order = np.concatenate([np.flatnonzero(~in_delta), np.flatnonzero(in_delta)])
+    return parts.iloc[np.argsort(order, kind="stable")]
+
+
+def _scored_frame(scored: dict) -> pd.DataFrame:
+    """Dataset puntuado completo; con delta, la unión se arma aquí (al leer)."""
+    if scored["delta"] is None:
+        return scored["df"]
+    return _concat_segments(scored["df"], scored["delta"])
+
+
+def _prune_scored(keep_versions: set):
+    """
+    Libera datasets puntuados de otras versiones de modelo, y los de un CSV
+    anterior una vez que el del CSV actual está publicado.
+    """
+    fingerprint = _dataset_fingerprint()
+    current = {key[1] for key in _scored if key[0] == fingerprint}
+    for key in list(_scored):
+        if key[1] not in keep_versions or (key[0] != fingerprint and key[1] in current):
+            del _scored[key]
+            _scored_locks.pop(key, None)
+
+
+def _get_predicted_dataset(entry: ModelEntry = None) -> pd.DataFrame:
+    return _scored_frame(_get_scored(entry))
+
+
+def _scored_version(entry: ModelEntry, scored: dict) -> tuple:
+    """Versión de los datos servidos: CSV, modelo y registros ingeridos aplicados."""
+    return (scored["key"][0], entry.version, scored["log_offset"])
+
+
+def _score_dataset(df: pd.DataFrame, entry: ModelEntry, job: Job = None) -> tuple:
+    """Puntúa el dataset completo por bloques y construye su índice → (DataFrame, arreglos)."""
+    predicted = score_in_chunks(df, entry, job)
+    if job is not None:
+        job.phase = "indexing"
+    return predicted, StudentIndex(predicted).to_arrays()
+
+
+# ──────────────────────────────────────────────
+# Jobs de re-puntuación
+# ──────────────────────────────────────────────
+# Puntuar el dataset completo corre en un job (ver rescoring.py): por
+# bloques, en paralelo si el dataset es grande, con avance en /api/jobs/{id}.
+_jobs = JobManager()
+
+
+def _start_rescore(entry: ModelEntry, key: tuple = None, force: bool = False, retry: bool = True) -> Job:
+    """
+    Lanza (o reutiliza, si ya hay uno en curso) el job que puntúa el dataset
+    actual con `entry`. `force` vuelve a puntuar aunque ya esté publicado;
+    con retry=False, si el último job de esa versión falló se retorna ese
+    sin reintentar (lo usa _get_scored para no relanzarlo en cada petición).
+    """
+    key = key or (_dataset_fingerprint(), entry.version)
+    params = {"model": entry.name, "model_version": key[1], "dataset": key[0]}
+    latest = _jobs.latest("rescore", params)
+    if latest is not None and latest.status == "error" and not retry:
+        return latest
+    return _jobs.submit("rescore", params, lambda job: _build_scored(entry, key, job, force=force))
+
+
+def _wait_job(job: Job) -> Job:
+    """Espera a que termine un job; si falló, propaga el error."""
+    job.wait()
+    if job.status == "error":
+        raise RuntimeError(f"Re-puntuación fallida (job {job.id}): {job.error}")
+    return job
+
+
+# ──────────────────────────────────────────────
+# Snapshot de analíticas
+# ──────────────────────────────────────────────
+# Se materializa una vez por versión (dataset, modelo, registros ingeridos)
+# y se sirve ya serializado y comprimido (EncodedBody), con ETag para que
+# los sondeos del dashboard reciban 304. Tras una ingesta se arma desde los
+# agregados incrementales.
+_analytics_lock = threading.Lock()
+
+
+def _get_analytics_snapshot(entry: ModelEntry = None) -> EncodedBody:
+    scored = _get_scored(entry)
+    snapshot = scored["analytics"]
+    if snapshot is None:
+        with _analytics_lock:
+            snapshot = scored["analytics"]
+            if snapshot is None:
+                with timer("analytics_build"):
+                    aggregates = scored["aggregates"]
+                    if aggregates is None:
+                        aggregates = AnalyticsAggregates.from_frame(scored["df"])
+                        if scored["delta"] is not None:
+                            aggregates = aggregates.add(scored["delta"], offset=len(scored["df"]))
+                        scored["aggregates"] = aggregates
+                    payload = aggregates.payload(_scored_rows(scored, aggregates.alert_positions()))
+                    snapshot = EncodedBody(dumps(payload))
+                scored["analytics"] = snapshot
+    return snapshot
+
+
+def _get_query_engine(scored: dict) -> QueryEngine:
+    """Motor de /api/analytics/query de esta versión del dataset puntuado."""
+    engine = scored["query"]
+    if engine is None:
+        with _analytics_lock:
+            engine = scored["query"]
+            if engine is None:
+                engine = QueryEngine(scored["df"])
+                if scored["delta"] is not None:
+                    engine = engine.append(scored["delta"])
+                scored["query"] = engine
+    return engine
+
+
+def _get_threshold_analysis(scored: dict) -> ThresholdAnalysis:
+    """Arreglos de what-if de umbrales de esta versión del dataset puntuado."""
+    analysis = scored["thresholds"]
+    if analysis is None:
+        engine = _get_query_engine(scored)
+        with _analytics_lock:
+            analysis = scored["thresholds"]
+            if analysis is None:
+                # La base usa el orden por probabilidad de su índice
+                base = engine.base or engine
+                analysis = ThresholdAnalysis(base, scored["index"].base.sort_order["probability"])
+                if engine.base is not None:
+                    analysis = analysis.append(engine)
+                scored["thresholds"] = analysis
+    return analysis
 
 
 # ──────────────────────────────────────────────
@@ -99,6 +554,11 @@ class StudentInput(BaseModel):
     model_config = {"populate_by_name": True}
 
 
+class IngestRecord(StudentInput):
+    id: Optional[int] = None  # si falta se asigna el siguiente disponible
+    Depression: Optional[int] = None  # etiqueta real, si se conoce
+
+
 class PredictionResponse(BaseModel):
     probability: float
     prediction: int
@@ -112,47 +572,438 @@ class PredictionResponse(BaseModel):
 # ──────────────────────────────────────────────
 @app.get("/api/health")
 def health_check():
-    """Verifica que la API y el modelo estén funcionando."""
-    try:
-        get_model()
-        return {"status": "ok", "model_loaded": True}
-    except Exception as e:
-        return {"status": "error", "model_loaded": False, "detail": str(e)}
+    """
+    Readiness: 200 solo cuando el modelo y los caches están listos.
+
+    Mientras el warmup está en curso (o si falló) responde 503 con el
+    progreso y los tiempos de cada paso.
+    """
+    ready = _warmup["status"] == "ready"
+    body = {
+        "status": "ok" if ready else ("error" if _warmup["status"] == "error" else "warming_up"),
+        "model_loaded": "model" in _warmup["steps"],
+        "ready": ready,
+        "warmup": {
+            "status": _warmup["status"],
+            "current_step": _warmup["current_step"],
+            "steps": dict(_warmup["steps"]),
+            "job": _warmup["job"],
+            "total_seconds": (
+                round(_warmup["finished_at"] - _warmup["started_at"], 4)
+                if _warmup["finished_at"] and _warmup["started_at"] else None
+            ),
+        },
+    }
+    if _warmup["error"]:
+        body["detail"] = _warmup["error"]
+    return ORJSONResponse(body, status_code=200 if ready else 503)
+
+
+@app.get("/api/health/live")
+def liveness_check():
+    """Liveness: el proceso está vivo y atiende peticiones."""
+    return {"status": "alive"}
+
+
+def _to_model_input(student: StudentInput) -> dict:
+    """Convierte el schema de entrada al diccionario con las columnas del modelo B."""
+    return {
+        "Gender": student.Gender,
+        "Age": student.Age,
+        "City": student.City,
+        "Profession": student.Profession,
+        "Academic Pressure": student.Academic_Pressure,
+        "Work Pressure": student.Work_Pressure,
+        "CGPA": student.CGPA,
+        "Study Satisfaction": student.Study_Satisfaction,
+        "Job Satisfaction": student.Job_Satisfaction,
+        "Sleep Duration": student.Sleep_Duration,
+        "Dietary Habits": student.Dietary_Habits,
+        "Degree": student.Degree,
+        "Work/Study Hours": student.Work_Study_Hours,
+        "Financial Stress": str(student.Financial_Stress),
+        "Family History of Mental Illness": student.Family_History,
+    }
+
+
+def _predict_grouped(items: list) -> list:
+    """
+    Evalúa un lote del micro-batcher. Cada elemento es (modelo, registro):
+    si el lote cruza un cambio de modelo, cada petición usa el suyo.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for i, (entry, record) in enumerate(items):
+        groups.setdefault(id(entry), (entry, []))[1].append(i)
+    for entry, positions in groups.values():
+        for i, result in zip(positions, predict_many([items[i][1] for i in positions], entry)):
+            results[i] = result
+    return results
+
+
+_predict_batcher = MicroBatcher(
+    _predict_grouped,
+    max_batch_size=PREDICT_BATCH_MAX_SIZE,
+    max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS,
+    max_queue=PREDICT_QUEUE_MAX,
+)
 
 
 @app.post("/api/predict", response_model=PredictionResponse)
-def predict(student: StudentInput):
-    """Realiza una predicción de riesgo para un estudiante individual."""
+async def predict(student: StudentInput, request: Request):
+    """
+    Realiza una predicción de riesgo para un estudiante individual.
+
+    Las peticiones concurrentes se agrupan en el micro-batcher y se evalúan
+    juntas con predict_many.
+    """
+    request_start = request.scope.get("state", {}).get("request_start")
+    if request_start is not None:
+        # Lectura del cuerpo + JSON + validación de pydantic (antes de llegar aquí)
+        observe_stage("parse_validate", time.perf_counter() - request_start)
     try:
-        data = {
-            "Gender": student.Gender,
-            "Age": student.Age,
-            "City": student.City,
-            "Profession": student.Profession,
-            "Academic Pressure": student.Academic_Pressure,
-            "Work Pressure": student.Work_Pressure,
-            "CGPA": student.CGPA,
-            "Study Satisfaction": student.Study_Satisfaction,
-            "Job Satisfaction": student.Job_Satisfaction,
-            "Sleep Duration": student.Sleep_Duration,
-            "Dietary Habits": student.Dietary_Habits,
-            "Degree": student.Degree,
-            "Work/Study Hours": student.Work_Study_Hours,
-            "Financial Stress": str(student.Financial_Stress),
-            "Family History of Mental Illness": student.Family_History,
-        }
-        result = predict_single(data)
-        return result
+        entry = get_active_model()
+        result = await _predict_batcher.submit((entry, _to_model_input(student)))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    with timer("json_encode"):
+        body = dumps(result)
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/api/predict/batcher")
+def predict_batcher_metrics():
+    """Métricas del micro-batcher: tamaños de lote, espera en cola y rechazos."""
+    return _predict_batcher.metrics()
+
+
+@app.get("/api/predict/cache")
+def prediction_cache_stats():
+    """Métricas del cache LRU de predicciones: hits, misses, evictions y tamaño."""
+    return get_prediction_cache_stats()
+
+
+@app.get("/api/metrics")
+def prometheus_metrics():
+    """Métricas en formato de texto de Prometheus (desactivables con METRICS_ENABLED=0)."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Métricas deshabilitadas (METRICS_ENABLED=0)")
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+@register_collector
+def _prediction_cache_metrics() -> list:
+    stats = get_prediction_cache_stats()
+    lines = []
+    for name in ("hits", "misses", "evictions", "expirations"):
+        lines += sample(f"riesgo_prediction_cache_{name}_total", stats[name], "counter", f"Cache de predicciones: {name}")
+    lines += sample("riesgo_prediction_cache_entries", stats["entries"], documentation="Entradas en el cache de predicciones")
+    lines += sample("riesgo_prediction_cache_bytes", stats["bytes"], documentation="Bytes estimados del cache de predicciones")
+    return lines
+
+
+@register_collector
+def _response_cache_metrics() -> list:
+    stats = _response_cache.stats()
+    lines = []
+    for name in ("hits", "misses", "evictions"):
+        lines += sample(f"riesgo_response_cache_{name}_total", stats[name], "counter", f"Cache de respuestas: {name}")
+    lines += sample("riesgo_response_cache_entries", stats["entries"], documentation="Entradas en el cache de respuestas")
+    lines += sample("riesgo_response_cache_bytes", stats["bytes"], documentation="Bytes del cache de respuestas")
+    return lines
+
+
+@register_collector
+def _predict_batcher_metrics() -> list:
+    m = _predict_batcher.metrics()
+    lines = []
+    for name in ("requests", "rejected", "batches", "errors"):
+        lines += sample(f"riesgo_predict_batcher_{name}_total", m[name], "counter", f"Micro-batcher: {name}")
+    lines += sample("riesgo_predict_batcher_queue_depth", m["queue_depth"], documentation="Elementos en cola del micro-batcher")
+    delay_counts = list(m["queue_delay_ms"]["histogram"].values())
+    lines += histogram_lines(
+        "riesgo_predict_batcher_batch_size", "Tamaño de los lotes del micro-batcher",
+        BATCH_SIZE_BUCKETS, list(m["batch_size_histogram"].values()), sum(delay_counts),
+    )
+    lines += histogram_lines(
+        "riesgo_predict_batcher_queue_delay_seconds", "Espera en cola del micro-batcher",
+        tuple(b / 1000 for b in QUEUE_DELAY_BUCKETS_MS), delay_counts, m["queue_delay_ms"]["sum_ms"] / 1000,
+    )
+    return lines
+
+
+@register_collector
+def _app_state_metrics() -> list:
+    lines = sample("riesgo_ready", int(_warmup["status"] == "ready"), documentation="1 si el warmup terminó")
+    for model in get_registry().describe():
+        if model["active"]:
+            lines += sample("riesgo_model_info", 1, documentation="Modelo activo", model=model["name"], version=model["version"])
+    rows = [(version, scored["index"].size) for (_, version), scored in list(_scored.items())]
+    if rows:
+        lines += sample("riesgo_dataset_rows", rows[0][1], documentation="Filas del dataset puntuado", model_version=rows[0][0])
+        lines += [f'riesgo_dataset_rows{{model_version="{version}"}} {count}' for version, count in rows[1:]]
+    return lines
+
+
+@app.post("/api/predict/batch")
+async def predict_batch_endpoint(request: Request):
+    """
+    Predicción por lotes.
+
+    Acepta un JSON array o NDJSON (un StudentInput por línea) y responde en
+    NDJSON a medida que se puntúa cada bloque de BATCH_CHUNK_SIZE registros.
+    Cada línea de salida lleva el índice del registro de entrada; los
+    registros inválidos se reportan con "error" sin abortar el lote.
+    """
+
+    entry = get_active_model()
+
+    body = RequestBody(request)
+
+    async def generate():
+        pending = []  # [(índice, dict del modelo o None, mensaje de error o None)]
+
+        async def flush():
+            lines = await run_in_threadpool(_score_batch_chunk, list(pending), entry)
+            pending.clear()
+            return lines
+
+        async for index, obj in iter_json_records(body):
+            if isinstance(obj, RecordParseError):
+                pending.append((index, None, str(obj)))
+                if obj.fatal:
+                    break
+                continue
+            try:
+                student = StudentInput.model_validate(obj)
+                pending.append((index, _to_model_input(student), None))
+            except ValidationError as e:
+                pending.append((index, None, _format_validation_error(e)))
+
+            if len(pending) >= BATCH_CHUNK_SIZE:
+                yield await flush()
+
+        if pending:
+            yield await flush()
+
+    return DuplexStreamingResponse(generate(), body=body, media_type="application/x-ndjson")
+
+
+def _score_batch_chunk(pending: list, entry: ModelEntry) -> bytes:
+    """Puntúa un bloque con predict_batch y lo serializa como NDJSON en orden."""
+    valid = [(i, rec) for i, rec, error in pending if error is None]
+    results = {}
+    if valid:
+        X = pd.DataFrame([rec for _, rec in valid], columns=MODEL_B_COLUMNS)
+        scored = predict_batch(X, entry)
+        for (i, _), prob, pred, level, label, factors in zip(
+            valid,
+            scored["probability"].tolist(),
+            scored["prediction"].tolist(),
+            scored["risk_level"].tolist(),
+            scored["risk_label"].tolist(),
+            decode_factor_flags(scored["factor_flags"]),
+        ):
+            results[i] = {
+                "index": i,
+                "probability": prob,
+                "prediction": int(pred),
+                "risk_level": level,
+                "risk_label": label,
+                "contributing_factors": factors,
+            }
+
+    lines = []
+    for i, _, error in pending:
+        line = results[i] if error is None else {"index": i, "error": error}
+        lines.append(dumps(line))
+    return b"\n".join(lines) + b"\n"
+
+
+@app.post("/api/predict/file")
+async def predict_file(request: Request):
+    """
+    Predicción sobre un archivo CSV con el esquema de student_depression.csv.
+
+    Acepta el archivo como campo "file" de un multipart/form-data o como
+    cuerpo text/csv. Se lee en bloques de FILE_BLOCK_BYTES, cada bloque se
+    puntúa con predict_batch y el CSV resultante (columnas originales +
+    FILE_SCORE_COLUMNS) se envía en streaming mientras sigue la subida.
+    Las filas con valores numéricos faltantes o inválidos, con campos de
+    más, con bytes que no son UTF-8 o con comillas sin cerrar se devuelven
+    con la columna "error" en lugar de abortar el archivo; un bloque que no
+    se puede leer se reporta como una fila de error.
+    """
+    entry = get_active_model()
+    content_type = request.headers.get("content-type", "")
+    request_body = RequestBody(request)
+    body = request_body
+    if content_type.startswith("multipart/form-data"):
+        body = iter_multipart_file(body, content_type)
+    blocks = iter_line_blocks(body, FILE_BLOCK_BYTES)
+
+    # El encabezado se valida antes de responder, para poder retornar 4xx
+    try:
+        first = await blocks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=400, detail="Archivo vacío")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    header, _, rest = first.partition(b"\n")
+    header = header.rstrip(b"\r")
+    try:
+        columns = next(csv.reader([header.decode("utf-8-sig")]))
+    except (UnicodeDecodeError, StopIteration, csv.Error):
+        raise HTTPException(status_code=400, detail="Encabezado CSV inválido")
+    missing = [c for c in MODEL_B_COLUMNS if c not in columns]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Faltan columnas del modelo: {missing}")
+
+    async def generate():
+        include_header = True
+        block = rest
+        while True:
+            if block.strip():
+                try:
+                    scored = await run_in_threadpool(_score_csv_block, header + b"\n" + block, entry, include_header)
+                except (ValueError, csv.Error) as e:
+                    # Bloque que no se puede leer ni fila por fila: se reporta en
+                    # línea y el archivo sigue
+                    scored = _csv_error_row(columns, f"Bloque CSV inválido: {e}", include_header)
+                yield scored
+                include_header = False
+            try:
+                block = await blocks.__anext__()
+            except StopAsyncIteration:
+                break
+            except ValueError as e:
+                # Línea demasiado larga: el resto del flujo ya no se puede separar en filas
+                yield _csv_error_row(columns, str(e), include_header)
+                return
+        if include_header:
+            yield pd.DataFrame(columns=columns + FILE_SCORE_COLUMNS).to_csv(index=False).encode("utf-8")
+
+    return DuplexStreamingResponse(
+        generate(),
+        body=request_body,
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="predicciones.csv"'},
+    )
+
+
+def _read_csv_block(data: bytes) -> tuple:
+    """
+    Bloque CSV (encabezado + filas) → (DataFrame, {posición: error}).
+
+    Una fila con más campos que el encabezado, con bytes que no son UTF-8 o
+    con comillas sin cerrar no aborta el bloque: queda en su lugar, sin
+    valores, y se reporta con su error.
+    """
+    df = None
+    unclosed = data.count(b'"') % 2 == 1
+    if unclosed:
+        # Solo el último bloque puede terminar dentro de comillas (iter_line_blocks
+        # no corta ahí) y pandas descartaría esas filas sin avisar
+        data = data[:last_line_end(data)]
+    else:
+        try:
+            df, errors = pd.read_csv(io.BytesIO(data), dtype=CSV_DTYPES, encoding="utf-8-sig"), {}
+        except (pd.errors.ParserError, UnicodeDecodeError):
+            pass
+    # Con un campo de más en la primera fila pandas lo toma como índice
+    if df is None or not isinstance(df.index, pd.RangeIndex):
+        df, errors = _read_csv_rows(data)
+    if unclosed:
+        errors[len(df)] = "Comillas sin cerrar al final del archivo"
+        df = df.reindex(range(len(df) + 1))
+    return clean_frame(df), errors
+
+
+def _read_csv_rows(data: bytes) -> tuple:
+    """
+    Lectura fila por fila (módulo csv) de un bloque con filas mal formadas:
+    esas filas se vacían y se reportan. Las columnas quedan como texto, tal
+    como llegaron (las numéricas se convierten al puntuar).
+    """
+    rows = [row for row in csv.reader(io.StringIO(data.decode("utf-8-sig", errors="replace"))) if row]
+    columns, rows = rows[0], rows[1:]
+    errors = {}
+    for position, row in enumerate(rows):
+        if len(row) > len(columns):
+            errors[position] = f"Fila con {len(row)} campos; se esperaban {len(columns)}"
+        elif any("\ufffd" in field for field in row):
+            errors[position] = "Texto con bytes no UTF-8"
+        else:
+            continue
+        rows[position] = [""] * len(columns)
+    text = io.StringIO()
+    csv.writer(text).writerows([columns, *rows])
+    text.seek(0)
+    return pd.read_csv(text, dtype=str, skip_blank_lines=False), errors
+
+
+def _csv_error_row(columns: list, error: str, include_header: bool) -> bytes:
+    """Una fila CSV vacía con solo la columna "error" (para fallas de un bloque completo)."""
+    row = pd.DataFrame([{"error": error}], columns=columns + FILE_SCORE_COLUMNS)
+    return row.to_csv(index=False, header=include_header).encode("utf-8")
+
+
+def _score_csv_block(data: bytes, entry: ModelEntry, include_header: bool) -> bytes:
+    """Lee un bloque CSV (encabezado + filas), lo puntúa y lo serializa como CSV."""
+    df, bad_rows = _read_csv_block(data)
+
+    numeric = [c for c in MODEL_B_COLUMNS if c in MODEL_B_NUMERIC_COLUMNS]
+    X = df[MODEL_B_COLUMNS].copy()
+    for col in numeric:
+        X[col] = pd.to_numeric(X[col], errors="coerce")
+    invalid = X[numeric].isna().to_numpy()
+    valid = ~invalid.any(axis=1)
+    if bad_rows:
+        valid[list(bad_rows)] = False
+
+    out = df.copy()
+    out["probability"] = np.nan
+    out["prediction"] = pd.array([pd.NA] * len(df), dtype="Int64")
+    for col in ("risk_level", "risk_label", "contributing_factors", "error"):
+        out[col] = ""
+    if valid.any():
+        scored = predict_batch(X[valid], entry)
+        out.loc[valid, "probability"] = scored["probability"].to_numpy()
+        out.loc[valid, "prediction"] = scored["prediction"].to_numpy()
+        out.loc[valid, "risk_level"] = scored["risk_level"].to_numpy()
+        out.loc[valid, "risk_label"] = scored["risk_label"].to_numpy()
+        out.loc[valid, "contributing_factors"] = [
+            "; ".join(factors) for factors in decode_factor_flags(scored["factor_flags"])
+        ]
+    if not valid.all():
+        out.loc[~valid, "error"] = [
+            "Valores faltantes o no numéricos: " + ", ".join(np.array(numeric)[row])
+            for row in invalid[~valid]
+        ]
+    for position, error in bad_rows.items():
+        out.iloc[position, out.columns.get_loc("error")] = error
+    return out.to_csv(index=False, header=include_header).encode("utf-8")
+
+
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'registro'}: {err['msg']}"
+        for err in e.errors(include_url=False)
+    )
 
 
 @app.get("/api/students")
 def get_students(
+    request: Request,
     search: Optional[str] = None,
     risk_filter: Optional[str] = None,
     page: int = 1,
     page_size: int = 50,
+    sort_by: Optional[str] = None,
+    order: str = "asc",
+    cursor: Optional[str] = None,
 ):
     """
     Retorna la lista de estudiantes con su predicción de riesgo.
@@ -162,219 +1013,396 @@ def get_students(
         risk_filter: 'low', 'medium', 'high' o 'all'
         page: Número de página (1-indexed)
         page_size: Registros por página
+        sort_by: 'probability', 'cgpa', 'age' o 'id' (por defecto, orden del dataset)
+        order: 'asc' o 'desc'
+        cursor: `next_cursor` de la respuesta anterior; si se envía, se ignora `page`
+
+    Los órdenes están precalculados por dataset puntuado, así que cualquier
+    página (por número o por cursor) cuesta lo proporcional a page_size.
+    Cada página se serializa y comprime una vez por versión de datos y
+    modelo; las repeticiones se sirven desde el cache de respuestas o con 304.
     """
+    if sort_by is not None and sort_by not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by debe ser uno de {sorted(SORT_FIELDS)}")
+    if order not in SORT_ORDERS:
+        raise HTTPException(status_code=400, detail=f"order debe ser uno de {list(SORT_ORDERS)}")
+    if page < 1 or page_size < 1:
+        raise HTTPException(status_code=400, detail="page y page_size deben ser mayores que 0")
+    level = risk_filter if risk_filter and risk_filter != "all" else None
+    params = {"search": search or None, "risk_filter": level, "sort_by": sort_by, "order": order}
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, params)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        df = _get_predicted_dataset()
-
-        if search:
-            df = df[df["id"].astype(str).str.contains(search, case=False)]
-
-        if risk_filter and risk_filter != "all":
-            df = df[df["risk_level"] == risk_filter]
-
-        total = len(df)
-        start = (page - 1) * page_size
-        end = start + page_size
-        page_df = df.iloc[start:end]
-
-        students = []
-        for _, row in page_df.iterrows():
-            students.append({
-                "id": str(int(row["id"])) if pd.notna(row.get("id")) else "",
-                "gender": row.get("Gender", ""),
-                "age": float(row.get("Age", 0)),
-                "city": row.get("City", ""),
-                "profession": row.get("Profession", ""),
-                "degree": row.get("Degree", ""),
-                "cgpa": float(row.get("CGPA", 0)),
-                "sleep_duration": row.get("Sleep Duration", ""),
-                "academic_pressure": float(row.get("Academic Pressure", 0)),
-                "financial_stress": float(row.get("Financial Stress", 0)),
-                "dietary_habits": row.get("Dietary Habits", ""),
-                "family_history": row.get("Family History of Mental Illness", ""),
-                "work_study_hours": float(row.get("Work/Study Hours", 0)),
-                "probability": float(row.get("probability", 0)),
-                "risk_level": row.get("risk_level", "low"),
-                "risk_label": row.get("risk_label", ""),
-                "depression_actual": int(row.get("Depression_actual", 0)),
-            })
+        entry = get_active_model()
+        scored = _get_scored(entry)
+        key = ("students", *params.values(), after, None if after else page, page_size,
+               _scored_version(entry, scored))
+        encoded = _response_cache.get_or_build(
+            key, lambda: _students_body(scored, params, page, page_size, after)
+        )
+        return encoded_response(request, encoded)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _students_body(scored: dict, params: dict, page: int, page_size: int, after: Optional[tuple]) -> bytes:
+    with timer("students_build"):
+        result = scored["index"].page(
+            search=params["search"],
+            risk_level=params["risk_filter"],
+            sort_by=params["sort_by"],
+            descending=params["order"] == "desc",
+            page_size=page_size,
+            page=page,
+            after=after,
+        )
 
+        students = _student_payload(_scored_rows(scored, result["rows"]))
+
+        total, counts = result["total"], result["counts"]
         stats = {
             "total": total,
-            "high_risk": int((df["risk_level"] == "high").sum()),
-            "medium_risk": int((df["risk_level"] == "medium").sum()),
-            "low_risk": int((df["risk_level"] == "low").sum()),
+            "high_risk": counts["high"],
+            "medium_risk": counts["medium"],
+            "low_risk": counts["low"],
         }
 
-        return {
+        return dumps({
             "students": students,
             "stats": stats,
-            "page": page,
+            "page": None if after else page,
             "page_size": page_size,
             "total_pages": max(1, (total + page_size - 1) // page_size),
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            "sort_by": params["sort_by"],
+            "order": params["order"],
+            "next_cursor": encode_cursor(params, result["next"]) if result["next"] else None,
+        })
+
+
+def _student_payload(df: pd.DataFrame) -> list:
+    """Registros de estudiantes (StudentRecord) con sus factores contribuyentes."""
+    students = student_records(df)
+    for record, factors in zip(students, decode_factor_flags(df["factor_flags"])):
+        record["contributing_factors"] = factors
+    return students
+
+
+@app.post("/api/students/ingest")
+def ingest_students(records: list[IngestRecord], request: Request):
+    """
+    Agrega estudiantes nuevos al dataset en memoria.
+
+    Los registros se anexan al log de ingesta y solo esas filas se puntúan;
+    el índice de /api/students y los agregados de /api/analytics se
+    actualizan de forma incremental. Retorna los estudiantes agregados.
+    """
+    _require_admin(request)
+    if not records:
+        raise HTTPException(status_code=400, detail="No se recibieron registros")
+    if len(records) > INGEST_MAX_RECORDS:
+        raise HTTPException(
+            status_code=413, detail=f"Máximo {INGEST_MAX_RECORDS} registros por petición"
+        )
+
+    with _ingest_lock, _ingest_log.lock():
+        # Al día con lo que hayan anexado otros workers antes de asignar ids
+        index = _get_scored()["index"]
+        given = Counter(r.id for r in records if r.id is not None)
+        ids = list(given)
+        duplicated = {i for i, count in given.items() if count > 1}
+        duplicated.update(i for i, found in zip(ids, index.contains_ids(ids).tolist()) if found)
+        if duplicated:
+            raise HTTPException(
+                status_code=409, detail=f"ids ya existentes o repetidos: {sorted(duplicated)[:20]}"
+            )
+
+        next_id = max(int(index.max_id() or 0), max(ids, default=0)) + 1
+        rows = []
+        for record in records:
+            row = _to_model_input(record)
+            row["Sleep Duration"] = row["Sleep Duration"].replace("'", "")
+            if record.id is None:
+                row["id"], next_id = next_id, next_id + 1
+            else:
+                row["id"] = record.id
+            row["Depression"] = record.Depression
+            row["ingested_at"] = time.time()
+            rows.append(row)
+        _ingest_log.append(rows)
+
+        scored = _get_scored()
+
+    total = scored["index"].size
+    added = _scored_rows(scored, np.arange(total - len(rows), total))
+    return ORJSONResponse({
+        "ingested": len(rows),
+        "total_students": total,
+        "students": _student_payload(added),
+    })
 
 
 @app.get("/api/analytics")
-def get_analytics():
-    """Retorna estadísticas agregadas para el panel de análisis."""
+def get_analytics(request: Request):
+    """
+    Retorna estadísticas agregadas para el panel de análisis.
+
+    El resultado se calcula una sola vez por versión de dataset y modelo;
+    las peticiones siguientes se sirven desde memoria o con 304.
+    """
     try:
-        df = _get_predicted_dataset()
-        raw_df = _load_dataset()
-
-        # ── Riesgo por carrera (Degree) ──
-        risk_by_degree = []
-        for degree, group in df.groupby("Degree"):
-            total = len(group)
-            if total < 10:
-                continue
-            risk_by_degree.append({
-                "degree": degree,
-                "low": int((group["risk_level"] == "low").sum()),
-                "medium": int((group["risk_level"] == "medium").sum()),
-                "high": int((group["risk_level"] == "high").sum()),
-                "total": total,
-                "high_pct": round((group["risk_level"] == "high").sum() / total * 100, 1),
-            })
-        risk_by_degree.sort(key=lambda x: x["high_pct"], reverse=True)
-
-        # ── Distribución de riesgo general ──
-        risk_distribution = {
-            "low": int((df["risk_level"] == "low").sum()),
-            "medium": int((df["risk_level"] == "medium").sum()),
-            "high": int((df["risk_level"] == "high").sum()),
-        }
-        total_students = len(df)
+        return encoded_response(request, _get_analytics_snapshot())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # ── Promedio de probabilidad ──
-        avg_probability = round(float(df["probability"].mean()), 1)
 
-        # ── Factores contribuyentes (basado en datos reales) ──
-        factors = []
+@app.get("/api/analytics/query")
+def analytics_query(
+    request: Request,
+    dimensions: Optional[str] = None,
+    metrics: Optional[str] = None,
+    min_count: int = 1,
+):
+    """
+    Agregados por grupo sobre el dataset puntuado completo.
 
-        sleep_risk = raw_df[raw_df["Sleep Duration"].str.contains("Less than 5|less than 5", case=False, na=False)]
-        factors.append({
-            "name": "Sueño Insuficiente",
-            "value": len(sleep_risk),
-            "pct": round(len(sleep_risk) / total_students * 100, 1),
-        })
+    Query params:
+        dimensions: hasta 3, separadas por coma (p. ej. 'degree,sleep_duration');
+            sin dimensiones se obtiene el total
+        metrics: 'count', 'risk_counts', 'mean_probability', 'depression_rate'
+            (por defecto todas)
+        min_count: omite los grupos con menos filas
 
-        high_financial = raw_df[pd.to_numeric(raw_df["Financial Stress"], errors="coerce") >= 4]
-        factors.append({
-            "name": "Estrés Financiero Alto",
-            "value": len(high_financial),
-            "pct": round(len(high_financial) / total_students * 100, 1),
-        })
+    Cada combinación se calcula una vez por versión de datos y modelo (ver
+    analytics_query.py) y se sirve desde el cache de respuestas o con 304.
+    """
+    try:
+        dims, mets = validate_query(parse_list(dimensions), parse_list(metrics))
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        high_pressure = raw_df[raw_df["Academic Pressure"] >= 4]
-        factors.append({
-            "name": "Presión Académica Alta",
-            "value": len(high_pressure),
-            "pct": round(len(high_pressure) / total_students * 100, 1),
-        })
+    try:
+        entry = get_active_model()
+        scored = _get_scored(entry)
+        key = ("analytics_query", dims, mets, max(min_count, 1), _scored_version(entry, scored))
 
-        low_cgpa = raw_df[raw_df["CGPA"] < 4.0]
-        factors.append({
-            "name": "CGPA Bajo",
-            "value": len(low_cgpa),
-            "pct": round(len(low_cgpa) / total_students * 100, 1),
-        })
+        def build() -> bytes:
+            with timer("analytics_query"):
+                return dumps(_get_query_engine(scored).run(dims, mets, min_count))
 
-        factors.sort(key=lambda x: x["value"], reverse=True)
-
-        # ── Riesgo por presión académica ──
-        risk_by_pressure = []
-        for pressure, group in df.groupby("Academic Pressure"):
-            total = len(group)
-            risk_by_pressure.append({
-                "pressure": int(pressure),
-                "depression_rate": round(
-                    group["Depression_actual"].mean() * 100, 1
-                ),
-                "avg_probability": round(float(group["probability"].mean()), 1),
-                "count": total,
-            })
-
-        # ── Riesgo por sueño ──
-        risk_by_sleep = []
-        for sleep, group in df.groupby("Sleep Duration"):
-            total = len(group)
-            if total < 5:
-                continue
-            risk_by_sleep.append({
-                "sleep_duration": sleep,
-                "depression_rate": round(
-                    group["Depression_actual"].mean() * 100, 1
-                ),
-                "avg_probability": round(float(group["probability"].mean()), 1),
-                "count": total,
-            })
-
-        # ── Top estudiantes en riesgo ──
-        top_risk = df.nlargest(10, "probability")
-        alerts = []
-        for _, row in top_risk.iterrows():
-            main_factor = ""
-            if float(row.get("Academic Pressure", 0)) >= 4:
-                main_factor = "Alta presión académica"
-            elif float(row.get("Financial Stress", 0)) >= 4:
-                main_factor = "Alto estrés financiero"
-            elif "less than 5" in str(row.get("Sleep Duration", "")).lower():
-                main_factor = "Sueño insuficiente"
-            else:
-                main_factor = f"CGPA: {row.get('CGPA', 'N/A')}"
+        return encoded_response(request, _response_cache.get_or_build(key, build))
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            alerts.append({
-                "id": str(int(row["id"])) if pd.notna(row.get("id")) else "",
-                "degree": row.get("Degree", ""),
-                "probability": float(row["probability"]),
-                "risk_level": row["risk_level"],
-                "main_factor": main_factor,
-            })
 
-        return {
-            "total_students": total_students,
-            "avg_probability": avg_probability,
-            "risk_distribution": risk_distribution,
-            "risk_by_degree": risk_by_degree[:10],
-            "contributing_factors": factors,
-            "risk_by_pressure": risk_by_pressure,
-            "risk_by_sleep": risk_by_sleep,
-            "recent_alerts": alerts,
-        }
+@app.get("/api/analytics/thresholds")
+def analytics_thresholds(
+    medium: float = RISK_THRESHOLDS[0],
+    high: float = RISK_THRESHOLDS[1],
+    group_by: Optional[str] = None,
+    min_count: int = 1,
+):
+    """
+    What-if de los umbrales de riesgo: cómo cambiarían los conteos por
+    nivel y la precision/recall contra Depression_actual con otros cortes.
+
+    Query params:
+        medium: probabilidad (%) desde la que el riesgo es medio (por defecto 40)
+        high: probabilidad (%) desde la que el riesgo es alto (por defecto 70)
+        group_by: desglose por una dimensión de /api/analytics/query (p. ej. 'degree')
+        min_count: omite los grupos con menos filas
+
+    Se responde con búsquedas binarias sobre probabilidades ya ordenadas
+    (ver thresholds.py), sin re-puntuar ni recorrer el dataset; pensado
+    para consultarse en cada movimiento de un slider, por eso no pasa por
+    el cache de respuestas.
+    """
+    try:
+        validate_thresholds(medium, high)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if group_by is not None and group_by not in DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"group_by debe ser uno de {sorted(DIMENSIONS)}")
+
+    try:
+        scored = _get_scored()
+        with timer("analytics_thresholds"):
+            body = _get_threshold_analysis(scored).run(medium, high, group_by, min_count)
+        return ORJSONResponse(body)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/dataset/columns")
-def get_dataset_columns():
+def get_dataset_columns(request: Request):
     """Retorna los valores únicos de las columnas categóricas para el formulario."""
     try:
+        return encoded_response(request, _get_dataset_columns_body())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _get_dataset_columns_body() -> EncodedBody:
+    """Solo depende del CSV: se calcula una vez por huella del archivo."""
+
+    def build() -> bytes:
         df = _load_dataset()
-        return {
+        return dumps({
             "cities": sorted(df["City"].dropna().unique().tolist()),
             "professions": sorted(df["Profession"].dropna().unique().tolist()),
             "degrees": sorted(df["Degree"].dropna().unique().tolist()),
             "sleep_durations": sorted(df["Sleep Duration"].dropna().unique().tolist()),
             "dietary_habits": sorted(df["Dietary Habits"].dropna().unique().tolist()),
             "genders": sorted(df["Gender"].dropna().unique().tolist()),
-        }
+        })
+
+    return _response_cache.get_or_build(("dataset_columns", _dataset_fingerprint()), build)
+
+
+# ──────────────────────────────────────────────
+# Registro de modelos (administración)
+# ──────────────────────────────────────────────
+# Activar un modelo lo carga, puntúa el dataset y calcula sus analíticas
+# en segundo plano; solo entonces se cambia el puntero al modelo activo.
+_model_switch = {"status": "idle"}  # idle | running | done | error
+_model_switch_lock = threading.Lock()
+
+
+def _require_admin(request: Request):
+    if ADMIN_TOKEN and request.headers.get("x-admin-token") != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
+
+
+@app.get("/api/models")
+def list_models():
+    """Modelos disponibles en models/, cuál está activo y el último cambio de modelo."""
+    return {
+        "active": get_active_model().describe(),
+        "models": get_registry().describe(),
+        "switch": dict(_model_switch),
+    }
+
+
+@app.post("/api/models/{name}/activate", status_code=202)
+def activate_model(name: str, request: Request):
+    """
+    Precalienta un modelo en segundo plano y lo activa de forma atómica.
+
+    Las peticiones siguen atendiéndose con el modelo actual hasta el cambio.
+    El progreso se consulta en GET /api/models.
+    """
+    _require_admin(request)
+    if name not in get_registry().available():
+        raise HTTPException(status_code=404, detail=f"Modelo no encontrado: {name}")
+    with _model_switch_lock:
+        if _model_switch["status"] == "running":
+            raise HTTPException(status_code=409, detail="Ya hay un cambio de modelo en curso")
+        _model_switch.clear()
+        _model_switch.update({
+            "status": "running",
+            "target": name,
+            "current_step": None,
+            "steps": {},
+            "started_at": time.time(),
+        })
+    threading.Thread(target=_prewarm_and_activate, args=(name,), name="model-switch", daemon=True).start()
+    return dict(_model_switch)
+
+
+@app.get("/api/jobs")
+def list_jobs():
+    """Jobs de re-puntuación en curso y recientes (el más nuevo primero)."""
+    return {"jobs": _jobs.describe()}
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    """Estado y avance de un job: fase, bloques y filas puntuadas, error."""
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job no encontrado: {job_id}")
+    return job.describe()
+
+
+@app.post("/api/jobs/rescore", status_code=202)
+def rescore(request: Request):
+    """
+    Re-puntúa el dataset completo con el modelo activo en segundo plano.
+
+    Mientras corre, las peticiones se atienden con el dataset puntuado
+    actual; el nuevo se publica de una vez al terminar. Si ya hay un job
+    en curso para la misma versión, retorna ese.
+    """
+    _require_admin(request)
+    job = _start_rescore(get_active_model(), force=True)
+    return job.describe()
+
+
+def _prewarm_and_activate(name: str):
+    entry = None
+
+    def load():
+        nonlocal entry
+        entry = get_registry().load(name)
+        if not entry.servable:
+            faltantes = sorted(set(entry.input_columns) - set(MODEL_B_COLUMNS))
+            raise ValueError(f"El modelo '{name}' requiere variables que la API no recibe: {faltantes}")
+
+    def rescore():
+        job = _start_rescore(entry)
+        _model_switch["job"] = job.id
+        _wait_job(job)
+
+    def activate():
+        previous = get_registry().activate(entry)
+        with _scored_lock:
+            _prune_scored(keep_versions={entry.version})
+        _model_switch["previous"] = previous.name if previous else None
+
+    steps = [
+        ("load", load),
+        ("predicted_dataset", rescore),
+        ("analytics", lambda: _get_analytics_snapshot(entry)),
+        ("dummy_prediction", lambda: predict_many(
+            [{col: _load_dataset().iloc[0][col] for col in MODEL_B_COLUMNS}], entry
+        )),
+        ("activate", activate),
+    ]
+    try:
+        for step_name, step in steps:
+            _model_switch["current_step"] = step_name
+            t0 = time.perf_counter()
+            step()
+            _model_switch["steps"][step_name] = round(time.perf_counter() - t0, 4)
+        _model_switch["status"] = "done"
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        _model_switch["status"] = "error"
+        _model_switch["error"] = str(e)
+        print(f"[main] Error activando el modelo {name}: {e}")
+        get_registry().unload(name)
+    finally:
+        _model_switch["current_step"] = None
+        _model_switch["finished_at"] = time.time()
 
 
 # ──────────────────────────────────────────────
 # Servir frontend estático (producción)
 # ──────────────────────────────────────────────
+# El build se carga en memoria una vez (con variantes brotli/gzip); servir
+# un archivo no toca el disco. Ver static_bundle.py.
 if STATIC_DIR.exists():
-    app.mount("/assets", StaticFiles(directory=STATIC_DIR / "assets"), name="assets")
+    _static_bundle = StaticBundle.scan(STATIC_DIR)
 
-    @app.get("/{full_path:path}")
-    def serve_frontend(full_path: str):
+    @app.api_route("/{full_path:path}", methods=["GET", "HEAD"])
+    def serve_frontend(full_path: str, request: Request):
         """Sirve el frontend React. Cualquier ruta no-API devuelve index.html."""
-        file_path = STATIC_DIR / full_path
-        if file_path.exists() and file_path.is_file():
-            return FileResponse(file_path)
-        return FileResponse(STATIC_DIR / "index.html")
+        static_file = _static_bundle.lookup(full_path)
+        if static_file is None:
+            raise HTTPException(status_code=404, detail="Archivo no encontrado")
+        return _static_bundle.response(request, static_file)
@@ -0,0 +1,262 @@
+"""
+metrics.py — Instrumentación liviana y exposición en formato Prometheus.
+
+    - timer(stage): mide una etapa (validación, DataFrame, transform,
+      predict_proba, factores, JSON, construcción de caches, ...) y la
+      acumula en el histograma riesgo_stage_duration_seconds{stage=...}
+    - Counter / Gauge / Histogram con etiquetas, seguros entre hilos
+    - MetricsMiddleware: peticiones, errores y latencia por ruta
+    - register_collector(fn): métricas que se leen al momento del scrape
+      (cache de predicciones, micro-batcher, ...)
+
+Con METRICS_ENABLED=0, timer() retorna un context manager vacío compartido
+y el middleware no se instala: el costo es una llamada a función por etapa.
+Sin dependencias externas (no requiere prometheus_client).
+"""
+
+import bisect
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+
+# Límites superiores (segundos) de los histogramas de latencia
+DURATION_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_registry = []
+_collectors = []
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+# ──────────────────────────────────────────────
+# Métricas de la aplicación
+# ──────────────────────────────────────────────
+STAGE_DURATION = Histogram(
+    "riesgo_stage_duration_seconds", "Duración de cada etapa interna", ("stage",)
+)
+HTTP_REQUESTS = Counter(
+    "riesgo_http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+)
+HTTP_ERRORS = Counter(
+    "riesgo_http_errors_total", "Peticiones HTTP con error (5xx o excepción)", ("method", "route")
+)
+HTTP_DURATION = Histogram(
+    "riesgo_http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")
+)
+MODEL_LOAD_SECONDS = Gauge(
+    "riesgo_model_load_seconds", "Tiempo de carga del artefacto del modelo", ("model",)
+)
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_DURATION.observe(time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+def timer(stage: str):
+    """Context manager que mide la etapa `stage` (no hace nada si las métricas están apagadas)."""
+    return _Timer(stage) if METRICS_ENABLED else _NOOP
+
+
+def observe_stage(stage: str, seconds: float):
+    """Registra una duración ya medida (p. ej. entre el middleware y el handler)."""
+    if METRICS_ENABLED:
+        STAGE_DURATION.observe(seconds, stage=stage)
+
+
+def register_collector(fn):
+    """`fn()` → lista de líneas en formato Prometheus, evaluada en cada scrape."""
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            lines.extend(collector())
+        except Exception as e:  # una métrica rota no debe tumbar el scrape
+            lines.append(f"# collector {getattr(collector, '__name__', '?')} falló: {_escape(e)}")
+    return "\n".join(lines) + "\n"
+
+
+def sample(name: str, value, kind: str = "gauge", documentation: str = "", **labels) -> list:
+    """Líneas de una métrica simple para los collectors."""
+    names = tuple(labels)
+    return [
+        f"# HELP {name} {documentation or name}",
+        f"# TYPE {name} {kind}",
+        f"{name}{_format_labels(names, tuple(labels.values()))} {_format_value(value)}",
+    ]
+
+
+def histogram_lines(name: str, documentation: str, bounds: tuple, counts: list, total: float) -> list:
+    """Líneas de un histograma ya agregado (conteos por bucket, no acumulados)."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} histogram"]
+    cumulative = 0
+    for bound, count in zip(tuple(bounds) + (float("inf"),), counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+    lines.append(f"{name}_sum {_format_value(float(total))}")
+    lines.append(f"{name}_count {cumulative}")
+    return lines
+
+
+# ──────────────────────────────────────────────
+# Middleware ASGI
+# ──────────────────────────────────────────────
+class MetricsMiddleware:
+    """
+    Cuenta peticiones y errores y mide la latencia por ruta (la plantilla,
+    p. ej. /api/models/{name}/activate, no la URL concreta). Guarda el
+    instante de llegada en scope["state"]["request_start"] para que los
+    endpoints puedan medir la validación del cuerpo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        scope.setdefault("state", {})["request_start"] = start
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None)
+            if path is None or path == "/{full_path:path}":
+                path = "frontend" if route is not None else "unmatched"
+            method = scope.get("method", "")
+            HTTP_DURATION.observe(time.perf_counter() - start, method=method, route=path)
+            HTTP_REQUESTS.inc(method=method, route=path, status=status["code"])
+            if status["code"] >= 500:
+                HTTP_ERRORS.inc(method=method, route=path)
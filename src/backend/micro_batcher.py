@@ -0,0 +1,155 @@
+"""
+micro_batcher.py — Agrupa predicciones individuales concurrentes.
+
+Con muchas llamadas simultáneas a /api/predict, el costo fijo por llamada
+domina. El MicroBatcher encola cada petición, espera hasta `max_wait_ms`
+o hasta juntar `max_batch_size` elementos, evalúa el lote completo con una
+sola llamada vectorizada y resuelve el future de cada petición.
+"""
+
+import asyncio
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+# Límites superiores (inclusive) de los histogramas de métricas
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_DELAY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class QueueFullError(Exception):
+    """La cola del micro-batcher alcanzó su profundidad máxima."""
+
+
+class MicroBatcher:
+    """
+    Args:
+        fn: función síncrona lista → lista (mismo orden), p. ej. predict_many.
+        max_batch_size: elementos máximos por lote.
+        max_wait_ms: espera máxima para completar un lote desde el primer elemento.
+        max_queue: profundidad máxima de la cola; por encima se rechaza.
+    """
+
+    def __init__(self, fn, max_batch_size: int = 64, max_wait_ms: float = 2.0, max_queue: int = 1024):
+        self.fn = fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.max_queue = max(1, int(max_queue))
+        self._queue = None
+        self._worker = None
+        self._loop = None
+        self._stats = {
+            "requests": 0,
+            "rejected": 0,
+            "batches": 0,
+            "errors": 0,
+            "batch_size_hist": [0] * (len(BATCH_SIZE_BUCKETS) + 1),
+            "queue_delay_hist": [0] * (len(QUEUE_DELAY_BUCKETS_MS) + 1),
+            "queue_delay_sum_ms": 0.0,
+            "queue_delay_max_ms": 0.0,
+        }
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item):
+        """Encola un elemento y espera su resultado."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self._stats["rejected"] += 1
+            raise QueueFullError("Cola de predicción llena; reintente en unos instantes")
+        self._stats["requests"] += 1
+        return await future
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    # Sin esperar más: tomar lo que ya esté encolado
+                    while len(batch) < self.max_batch_size and not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            started = time.perf_counter()
+            self._record_batch(batch, started)
+            items = [item for item, _, _ in batch]
+            try:
+                results = await run_in_threadpool(self.fn, items)
+            except Exception as e:
+                self._stats["errors"] += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _record_batch(self, batch: list, started: float):
+        stats = self._stats
+        stats["batches"] += 1
+        stats["batch_size_hist"][_bucket(len(batch), BATCH_SIZE_BUCKETS)] += 1
+        for _, _, enqueued in batch:
+            delay_ms = (started - enqueued) * 1000
+            stats["queue_delay_hist"][_bucket(delay_ms, QUEUE_DELAY_BUCKETS_MS)] += 1
+            stats["queue_delay_sum_ms"] += delay_ms
+            stats["queue_delay_max_ms"] = max(stats["queue_delay_max_ms"], delay_ms)
+
+    def metrics(self) -> dict:
+        stats = self._stats
+        processed = sum(stats["queue_delay_hist"])
+        return {
+            "config": {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "max_queue": self.max_queue,
+            },
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "requests": stats["requests"],
+            "rejected": stats["rejected"],
+            "batches": stats["batches"],
+            "errors": stats["errors"],
+            "avg_batch_size": round(processed / stats["batches"], 2) if stats["batches"] else 0.0,
+            "batch_size_histogram": _histogram(BATCH_SIZE_BUCKETS, stats["batch_size_hist"]),
+            "queue_delay_ms": {
+                "avg": round(stats["queue_delay_sum_ms"] / processed, 3) if processed else 0.0,
+                "sum_ms": round(stats["queue_delay_sum_ms"], 3),
+                "max": round(stats["queue_delay_max_ms"], 3),
+                "histogram": _histogram(QUEUE_DELAY_BUCKETS_MS, stats["queue_delay_hist"]),
+            },
+        }
+
+
+def _bucket(value, bounds) -> int:
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+
+def _histogram(bounds, counts) -> dict:
+    labels = [f"<={b}" for b in bounds] + [f">{bounds[-1]}"]
+    return dict(zip(labels, counts))
@@ -2,7 +2,8 @@
 model_service.py — Módulo de carga y predicción del modelo.
 
 PUNTO DE INTEGRACIÓN CON MLFLOW:
-    Actualmente carga un modelo local (.joblib).
+    Actualmente carga un modelo local (.linear.json compacto si existe,
+    si no el pipeline .joblib).
     Cuando el compañero de MLflow entregue el modelo registrado,
     solo se necesita:
       1. Descomentar las líneas de MLflow
@@ -11,11 +12,19 @@ PUNTO DE INTEGRACIÓN CON MLFLOW:
 """
 
 import os
-import joblib
+import sys
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from metrics import timer, MODEL_LOAD_SECONDS
+import linear_artifact
+
 # ──────────────────────────────────────────────
 # Configuración de rutas
 # ──────────────────────────────────────────────
@@ -23,25 +32,186 @@ BASE_DIR = Path(__file__).resolve().parent
 MODEL_PATH = BASE_DIR / "models" / "logistic_b.joblib"
 
 # ──────────────────────────────────────────────
-# Carga del modelo
+# Registro de modelos
 # ──────────────────────────────────────────────
-_model = None
+# Todos los artefactos de models/ (.joblib o .linear.json) están
+# disponibles; uno es el activo. Cada petición toma una referencia al ModelEntry activo al empezar
+# y la usa hasta terminar, así que cambiar de modelo (un simple cambio de
+# puntero) nunca mezcla dos modelos dentro de la misma petición.
+MODELS_DIR = MODEL_PATH.parent
+DEFAULT_MODEL_NAME = os.environ.get("MODEL_NAME", MODEL_PATH.stem)
+# auto: el artefacto compacto (.linear.json) si existe, si no el .joblib;
+# joblib: siempre el pipeline de sklearn
+MODEL_ARTIFACT_FORMAT = os.environ.get("MODEL_ARTIFACT_FORMAT", "auto").lower()
+
+
+class ModelEntry:
+    """Un modelo cargado, con su evaluador compilado y su versión (hash)."""
+
+    def __init__(self, name: str, path: Path, model):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.format = "linear" if isinstance(model, LinearModel) else "joblib"
+        self.scorer = model.scorer if isinstance(model, LinearModel) else LinearScorer.from_pipeline(model)
+        self.version = _file_hash(path)
+        self.input_columns = [str(c) for c in getattr(model, "feature_names_in_", MODEL_B_COLUMNS)]
+        self.loaded_at = time.time()
+
+    @property
+    def servable(self) -> bool:
+        """True si el modelo solo necesita las 15 variables que recibe la API."""
+        return set(self.input_columns) <= set(MODEL_B_COLUMNS)
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "path": str(self.path),
+            "format": self.format,
+            "compiled_scorer": self.scorer is not None,
+            "input_columns": self.input_columns,
+            "servable": self.servable,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """Modelos disponibles en disco, cargados en memoria y el activo."""
+
+    def __init__(self, models_dir: Path, default_name: str):
+        self.models_dir = Path(models_dir)
+        self.default_name = default_name
+        self._loaded = {}  # nombre → ModelEntry
+        self._active = None
+        self._lock = threading.RLock()
+
+    def available(self) -> list:
+        if not self.models_dir.exists():
+            return []
+        names = {p.stem for p in self.models_dir.glob("*.joblib")}
+        names.update(linear_artifact.artifact_name(p) for p in self.models_dir.glob("*" + linear_artifact.SUFFIX))
+        return sorted(names)
+
+    def artifact_path(self, name: str) -> Path:
+        """Ruta del artefacto a cargar para `name` según MODEL_ARTIFACT_FORMAT."""
+        compact = linear_artifact.artifact_path(self.models_dir, name)
+        if MODEL_ARTIFACT_FORMAT != "joblib" and compact.exists():
+            return compact
+        return self.models_dir / f"{name}.joblib"
+
+    def load(self, name: str) -> ModelEntry:
+        """Carga (o reutiliza) un modelo por nombre, sin activarlo."""
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None:
+                return entry
+        if name not in self.available():
+            raise FileNotFoundError(
+                f"No se encontró el modelo '{name}' en {self.models_dir}. "
+                "Ejecuta primero: python train_model.py"
+            )
+        path = self.artifact_path(name)
+        t0 = time.perf_counter()
+        entry = ModelEntry(name, path, _load_model(path))
+        MODEL_LOAD_SECONDS.set(round(time.perf_counter() - t0, 6), model=name)
+        with self._lock:
+            return self._loaded.setdefault(name, entry)
+
+    def active(self) -> ModelEntry:
+        entry = self._active
+        if entry is None:
+            with self._lock:
+                if self._active is None:
+                    self.activate(self.load(self.default_name))
+                entry = self._active
+        return entry
+
+    def unload(self, name: str):
+        """Libera un modelo cargado que no está activo."""
+        with self._lock:
+            if self._active is None or self._active.name != name:
+                self._loaded.pop(name, None)
+
+    def activate(self, entry: ModelEntry) -> ModelEntry:
+        """
+        Cambia el modelo activo de forma atómica y libera los demás.
+
+        Las peticiones en curso conservan su referencia al modelo anterior.
+        """
+        if not entry.servable:
+            faltantes = sorted(set(entry.input_columns) - set(MODEL_B_COLUMNS))
+            raise ValueError(
+                f"El modelo '{entry.name}' requiere variables que la API no recibe: {faltantes}"
+            )
+        with self._lock:
+            previous = self._active
+            self._active = entry
+            self._loaded = {entry.name: entry}
+        _prediction_cache.reset(entry.version)
+        if previous is not None and previous is not entry:
+            print(f"[model_service] Modelo activo: {previous.name} → {entry.name}")
+        return previous
+
+    def describe(self) -> list:
+        with self._lock:
+            active = self._active
+            loaded = dict(self._loaded)
+        return [
+            {
+                "name": name,
+                "active": active is not None and active.name == name,
+                "loaded": name in loaded,
+                **({k: v for k, v in loaded[name].describe().items() if k != "name"} if name in loaded else {}),
+            }
+            for name in self.available()
+        ]
+
+
+def get_active_model() -> ModelEntry:
+    """Retorna el ModelEntry activo (carga el modelo por defecto la primera vez)."""
+    return _registry.active()
+
+
+def get_registry() -> ModelRegistry:
+    return _registry
 
 
 def get_model():
-    """Retorna el modelo cargado (singleton)."""
-    global _model
-    if _model is None:
-        _model = _load_model()
-    return _model
+    """Retorna el modelo activo (pipeline de sklearn o LinearModel)."""
+    return get_active_model().model
+
+
+def get_model_version() -> str:
+    """Hash (SHA-256 truncado) del artefacto del modelo activo."""
+    return get_active_model().version
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def get_scorer():
+    """
+    Retorna el evaluador lineal compilado del modelo activo.
+
+    Es None si el pipeline no tiene la forma esperada
+    (StandardScaler + OneHotEncoder + LogisticRegression).
+    """
+    return get_active_model().scorer
 
 
-def _load_model():
+def _load_model(path: Path = MODEL_PATH):
     """
     Carga el modelo desde disco o MLflow.
 
     ── OPCIÓN 1: Modelo local (activo por defecto) ──
-    Se carga el pipeline serializado con joblib.
+    Un .linear.json se carga como LinearModel (sin importar sklearn ni
+    joblib); un .joblib, como el pipeline serializado.
 
     ── OPCIÓN 2: Modelo desde MLflow (descomentar cuando esté listo) ──
     import mlflow
@@ -50,16 +220,200 @@ def _load_model():
     # model = mlflow.pyfunc.load_model("models:/<MODEL_NAME>/<VERSION>")
     return model
     """
-    if not MODEL_PATH.exists():
+    if not path.exists():
         raise FileNotFoundError(
-            f"No se encontró el modelo en {MODEL_PATH}. "
+            f"No se encontró el modelo en {path}. "
             "Ejecuta primero: python train_model.py"
         )
-    model = joblib.load(MODEL_PATH)
-    print(f"[model_service] Modelo cargado desde {MODEL_PATH}")
+    if path.name.endswith(linear_artifact.SUFFIX):
+        model = LinearModel.from_artifact(path)
+    else:
+        import joblib
+
+        model = joblib.load(path)
+    print(f"[model_service] Modelo cargado desde {path}")
     return model
 
 
+def export_linear_artifact(model, path: Path, source_path: Path = None):
+    """
+    Escribe el artefacto compacto de un pipeline lineal; retorna la ruta,
+    o None si el pipeline no se puede compilar (p. ej. xgboost).
+    """
+    scorer = LinearScorer.from_pipeline(model)
+    if scorer is None:
+        return None
+    path = Path(path)
+    source = {}
+    if source_path is not None:
+        source = {"file": Path(source_path).name, "sha256": _file_hash(Path(source_path))}
+    return linear_artifact.write(
+        path,
+        name=linear_artifact.artifact_name(path),
+        input_columns=[str(c) for c in getattr(model, "feature_names_in_", MODEL_B_COLUMNS)],
+        num_terms=scorer.num_terms,
+        cat_weights=scorer.cat_weights,
+        intercept=scorer.intercept,
+        classes=[int(c) for c in model.classes_],
+        source=source,
+    )
+
+
+# ──────────────────────────────────────────────
+# Evaluador lineal compilado
+# ──────────────────────────────────────────────
+class LinearScorer:
+    """
+    Versión "compilada" del pipeline para predicciones individuales.
+
+    Una regresión logística sobre StandardScaler + OneHotEncoder equivale a:
+        z = intercepto + Σ w_i · (x_i - media_i) / escala_i + Σ w[col][categoría]
+    así que basta guardar las medias, escalas y pesos numéricos, y un
+    diccionario categoría → peso por cada columna categórica. Una categoría
+    desconocida aporta 0, igual que handle_unknown="ignore".
+    """
+
+    def __init__(self, num_terms: list, cat_weights: dict, intercept: float):
+        # num_terms: [(columna, media, escala, peso), ...]
+        self.num_terms = num_terms
+        self.cat_weights = cat_weights
+        self.intercept = intercept
+
+    @classmethod
+    def from_pipeline(cls, model):
+        """Compila el pipeline; retorna None si no es un modelo lineal soportado."""
+        from sklearn.pipeline import Pipeline
+        from sklearn.compose import ColumnTransformer
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+        from sklearn.linear_model import LogisticRegression
+
+        if not isinstance(model, Pipeline) or len(model.steps) != 2:
+            return None
+        preprocessor, classifier = model.steps[0][1], model.steps[1][1]
+        if not isinstance(preprocessor, ColumnTransformer) or not isinstance(classifier, LogisticRegression):
+            return None
+        if classifier.coef_.shape[0] != 1 or list(classifier.classes_) != [0, 1]:
+            return None
+
+        coef = classifier.coef_[0]
+        offset = 0
+        num_terms = []
+        cat_weights = {}
+        for name, transformer, cols in preprocessor.transformers_:
+            if name == "remainder":
+                if transformer != "drop":
+                    return None
+                continue
+            if isinstance(transformer, StandardScaler):
+                means = transformer.mean_ if transformer.with_mean else np.zeros(len(cols))
+                scales = transformer.scale_ if transformer.with_std else np.ones(len(cols))
+                for i, col in enumerate(cols):
+                    num_terms.append((col, float(means[i]), float(scales[i]), float(coef[offset + i])))
+                offset += len(cols)
+            elif isinstance(transformer, OneHotEncoder):
+                if transformer.drop_idx_ is not None or transformer.handle_unknown != "ignore":
+                    return None
+                if getattr(transformer, "infrequent_categories_", None) is not None:
+                    return None
+                for col, categories in zip(cols, transformer.categories_):
+                    cat_weights[col] = {
+                        cat: float(coef[offset + j]) for j, cat in enumerate(categories)
+                    }
+                    offset += len(categories)
+            else:
+                return None
+
+        if offset != coef.shape[0]:
+            return None
+        return cls(num_terms, cat_weights, float(classifier.intercept_[0]))
+
+    def decision(self, row: dict) -> float:
+        """Valor de la función de decisión (logit) para un registro."""
+        z = self.intercept
+        for col, mean, scale, weight in self.num_terms:
+            z += (float(row[col]) - mean) / scale * weight
+        for col, weights in self.cat_weights.items():
+            z += weights.get(row[col], 0.0)
+        return z
+
+    def predict_many(self, rows: list) -> tuple:
+        """Versión vectorizada: retorna (probabilidades, predicciones) como arreglos."""
+        z = np.full(len(rows), self.intercept)
+        if self.num_terms:
+            X = np.array([[float(row[col]) for col, _, _, _ in self.num_terms] for row in rows], dtype=float)
+            means = np.array([t[1] for t in self.num_terms])
+            scales = np.array([t[2] for t in self.num_terms])
+            weights = np.array([t[3] for t in self.num_terms])
+            z += ((X - means) / scales) @ weights
+        for col, weights in self.cat_weights.items():
+            z += np.fromiter((weights.get(row[col], 0.0) for row in rows), dtype=float, count=len(rows))
+        return _sigmoid(z), (z > 0).astype(int)
+
+    def decision_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """Función de decisión para un DataFrame completo (columnas, no filas)."""
+        z = np.full(len(df), self.intercept)
+        if self.num_terms:
+            X = df[[t[0] for t in self.num_terms]].to_numpy(dtype=float)
+            means = np.array([t[1] for t in self.num_terms])
+            scales = np.array([t[2] for t in self.num_terms])
+            weights = np.array([t[3] for t in self.num_terms])
+            z += ((X - means) / scales) @ weights
+        for col, weights in self.cat_weights.items():
+            z += df[col].map(weights).astype(float).fillna(0.0).to_numpy()
+        return z
+
+    def predict(self, row: dict) -> tuple:
+        """Retorna (probabilidad en [0, 1], predicción 0/1) para un registro."""
+        z = self.decision(row)
+        # Sigmoide numéricamente estable
+        if z >= 0:
+            probability = 1.0 / (1.0 + math.exp(-z))
+        else:
+            e = math.exp(z)
+            probability = e / (1.0 + e)
+        return probability, int(z > 0)
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    """Sigmoide numéricamente estable, vectorizada."""
+    probabilities = np.empty_like(z)
+    pos = z >= 0
+    probabilities[pos] = 1.0 / (1.0 + np.exp(-z[pos]))
+    e = np.exp(z[~pos])
+    probabilities[~pos] = e / (1.0 + e)
+    return probabilities
+
+
+class LinearModel:
+    """
+    Modelo cargado desde un artefacto compacto (linear_artifact.py).
+
+    Expone lo que el resto del servicio usa de un pipeline de sklearn
+    (predict_proba sobre un DataFrame, classes_, feature_names_in_), más el
+    LinearScorer ya armado. No importa sklearn.
+    """
+
+    def __init__(self, scorer: LinearScorer, input_columns: list, classes: list):
+        self.scorer = scorer
+        self.feature_names_in_ = np.array(input_columns, dtype=object)
+        self.classes_ = np.array(classes)
+
+    @classmethod
+    def from_artifact(cls, path: Path) -> "LinearModel":
+        data = linear_artifact.read(path)
+        if data["classes"] != [0, 1]:
+            raise ValueError(f"{path}: solo se soportan modelos binarios con clases [0, 1]")
+        scorer = LinearScorer(data["num_terms"], data["cat_weights"], data["intercept"])
+        return cls(scorer, data["input_columns"], data["classes"])
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        p = _sigmoid(self.scorer.decision_frame(X))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
 # ──────────────────────────────────────────────
 # Columnas del Modelo B (15 variables, excluye ideación suicida)
 # ──────────────────────────────────────────────
@@ -81,33 +435,272 @@ MODEL_B_COLUMNS = [
     "Family History of Mental Illness",
 ]
 
+# Columnas que el modelo trata como numéricas (float); el resto son categóricas
+MODEL_B_NUMERIC_COLUMNS = {
+    "Age",
+    "Academic Pressure",
+    "Work Pressure",
+    "CGPA",
+    "Study Satisfaction",
+    "Job Satisfaction",
+    "Work/Study Hours",
+}
+
+
+# ──────────────────────────────────────────────
+# Cache LRU de predicciones
+# ──────────────────────────────────────────────
+class PredictionCache:
+    """
+    Cache LRU (con TTL opcional) de resultados de predict_single.
+
+    La clave es un hash de los 15 valores de MODEL_B_COLUMNS normalizados:
+    las numéricas como float (3, "3" y 3.0 son la misma entrada) y las
+    categóricas tal cual, porque el modelo distingue "Male" de "Male ".
+    El cache pertenece a una versión de modelo: al activar otro se vacía
+    (reset) y las peticiones que aún usan el modelo anterior no lo leen
+    ni lo escriben.
+    """
 
-def predict_single(student_data: dict) -> dict:
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: float = 0):
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl = float(ttl_seconds)
+        self._data = OrderedDict()  # clave → (resultado, tamaño, expira)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(student_data: dict) -> bytes:
+        parts = []
+        for col in MODEL_B_COLUMNS:
+            value = student_data[col]
+            if col in MODEL_B_NUMERIC_COLUMNS:
+                parts.append(float(value) + 0.0)
+            elif isinstance(value, str):
+                parts.append(value)
+            else:
+                parts.append((type(value).__name__, value))
+        return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key: bytes, version: str):
+        with self._lock:
+            if version != self._version:
+                self.misses += 1
+                return None
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            result, size, expires = entry
+            if expires and expires < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return _copy_result(result)
+
+    def put(self, key: bytes, version: str, result: dict):
+        if not self.enabled:
+            return
+        size = _approx_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            if key in self._data:
+                self._remove(key)
+            expires = time.monotonic() + self.ttl if self.ttl > 0 else 0
+            self._data[key] = (_copy_result(result), size, expires)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "model_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def reset(self, version: str):
+        """Vacía el cache y lo asigna a otra versión de modelo."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self._version = version
+
+    def _remove(self, key: bytes):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+
+def _copy_result(result: dict) -> dict:
+    copy = dict(result)
+    copy["contributing_factors"] = list(result["contributing_factors"])
+    return copy
+
+
+def _approx_size(result: dict) -> int:
+    """Tamaño aproximado en memoria de un resultado (dict + lista + textos)."""
+    size = sys.getsizeof(result) + 16 + 100  # + clave y nodo del OrderedDict
+    for value in result.values():
+        size += sys.getsizeof(value)
+    for factor in result["contributing_factors"]:
+        size += sys.getsizeof(factor)
+    return size
+
+
+_prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.environ.get("PREDICTION_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl_seconds=float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", "0")),
+)
+
+
+_registry = ModelRegistry(MODELS_DIR, DEFAULT_MODEL_NAME)
+
+
+def get_prediction_cache_stats() -> dict:
+    """Contadores del cache de predicciones (hits, misses, evictions, tamaño)."""
+    return _prediction_cache.stats()
+
+
+def predict_single(student_data: dict, entry: ModelEntry = None) -> dict:
     """
     Realiza una predicción para un solo estudiante.
 
     Args:
         student_data: diccionario con las variables del modelo B.
+        entry: modelo a usar (por defecto, el activo).
 
     Returns:
         dict con probability, risk_level, risk_label, contributing_factors.
     """
-    model = get_model()
-
-    df = pd.DataFrame([student_data])
+    entry = entry or get_active_model()
+    model = entry.model
 
     for col in MODEL_B_COLUMNS:
-        if col not in df.columns:
+        if col not in student_data:
             raise ValueError(f"Falta la columna requerida: {col}")
 
-    df = df[MODEL_B_COLUMNS]
+    cache = _prediction_cache if _prediction_cache.enabled else None
+    if cache is not None:
+        with timer("cache_lookup"):
+            key = cache.make_key(student_data)
+            cached = cache.get(key, entry.version)
+        if cached is not None:
+            return cached
+
+    scorer = entry.scorer
+    if scorer is not None:
+        with timer("compiled_score"):
+            probability, prediction = scorer.predict(student_data)
+        probability *= 100
+    else:
+        probabilities, predictions = _pipeline_predict(model, [student_data])
+        probability = float(probabilities[0]) * 100
+        prediction = int(predictions[0])
 
-    probability = float(model.predict_proba(df)[0][1]) * 100
-    prediction = int(model.predict(df)[0])
+    with timer("contributing_factors"):
+        factors = _get_contributing_factors(student_data, probability)
+    result = _build_result(student_data, probability, prediction, factors)
+    if cache is not None:
+        cache.put(key, entry.version, result)
+    return result
 
+
+def predict_many(records: list, entry: ModelEntry = None) -> list:
+    """
+    Igual que predict_single, pero para varios estudiantes en una sola
+    evaluación vectorizada (la usa el micro-batcher de /api/predict).
+    """
+    entry = entry or get_active_model()
+    model = entry.model
+
+    for student_data in records:
+        for col in MODEL_B_COLUMNS:
+            if col not in student_data:
+                raise ValueError(f"Falta la columna requerida: {col}")
+
+    results = [None] * len(records)
+    cache = _prediction_cache if _prediction_cache.enabled else None
+    keys = [None] * len(records)
+    if cache is not None:
+        with timer("cache_lookup"):
+            for i, student_data in enumerate(records):
+                keys[i] = cache.make_key(student_data)
+                results[i] = cache.get(keys[i], entry.version)
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+    pending = [records[i] for i in missing]
+
+    scorer = entry.scorer
+    if scorer is not None:
+        with timer("compiled_score"):
+            probabilities, predictions = scorer.predict_many(pending)
+    else:
+        probabilities, predictions = _pipeline_predict(model, pending)
+
+    with timer("contributing_factors"):
+        factors = [_get_contributing_factors(records[i], float(p) * 100) for i, p in zip(missing, probabilities)]
+    for i, p, y, f in zip(missing, probabilities, predictions, factors):
+        results[i] = _build_result(records[i], float(p) * 100, int(y), f)
+        if cache is not None:
+            cache.put(keys[i], entry.version, results[i])
+    return results
+
+
+def _pipeline_predict(model, records: list) -> tuple:
+    """Evalúa el pipeline de sklearn por etapas → (probabilidades de la clase 1, predicciones)."""
+    with timer("dataframe_build"):
+        df = pd.DataFrame(records)[MODEL_B_COLUMNS]
+    if hasattr(model, "steps") and len(model.steps) > 1:
+        with timer("pipeline_transform"):
+            X = model[:-1].transform(df)
+        estimator = model.steps[-1][1]
+    else:
+        X, estimator = df, model
+    with timer("predict_proba"):
+        proba = estimator.predict_proba(X)
+    return proba[:, 1], model.classes_[np.argmax(proba, axis=1)]
+
+
+def _build_result(student_data: dict, probability: float, prediction: int, factors: list = None) -> dict:
     risk_level, risk_label = _classify_risk(probability)
 
-    factors = _get_contributing_factors(student_data, probability)
+    if factors is None:
+        factors = _get_contributing_factors(student_data, probability)
 
     return {
         "probability": round(probability, 1),
@@ -118,48 +711,152 @@ def predict_single(student_data: dict) -> dict:
     }
 
 
-def predict_batch(df: pd.DataFrame) -> pd.DataFrame:
+def predict_batch(df: pd.DataFrame, entry: ModelEntry = None) -> pd.DataFrame:
     """
     Realiza predicciones para un DataFrame completo.
 
     Args:
         df: DataFrame con las columnas del modelo B.
+        entry: modelo a usar (por defecto, el activo).
 
     Returns:
         DataFrame original con columnas adicionales:
-        probability, prediction, risk_level, risk_label.
+        probability, prediction, risk_level, risk_label y factor_flags
+        (máscara de bits de CONTRIBUTING_FACTORS; ver decode_factor_flags).
     """
-    model = get_model()
+    entry = entry or get_active_model()
+    model = entry.model
 
     X = df[MODEL_B_COLUMNS].copy()
 
-    probabilities = model.predict_proba(X)[:, 1] * 100
-    predictions = model.predict(X)
+    with timer("batch_predict_proba"):
+        proba = model.predict_proba(X)
+    probabilities = proba[:, 1] * 100
+    # Misma regla que model.predict, sin volver a pasar por el pipeline
+    predictions = model.classes_[np.argmax(proba, axis=1)]
 
     df = df.copy()
     df["probability"] = np.round(probabilities, 1)
     df["prediction"] = predictions
-    df["risk_level"] = df["probability"].apply(lambda p: _classify_risk(p)[0])
-    df["risk_label"] = df["probability"].apply(lambda p: _classify_risk(p)[1])
+    with timer("batch_risk_factors"):
+        df["risk_level"], df["risk_label"] = classify_risk_array(df["probability"].to_numpy())
+        df["factor_flags"] = factor_flags(contributing_factor_matrix(df))
 
     return df
 
 
+# ──────────────────────────────────────────────
+# Niveles de riesgo
+# ──────────────────────────────────────────────
+# Límites inferiores (inclusive) de "medium" y "high", en %
+RISK_THRESHOLDS = (40, 70)
+RISK_LEVELS = ("low", "medium", "high")
+RISK_LABELS = ("RIESGO BAJO", "RIESGO MODERADO", "RIESGO ALTO")
+
+
 def _classify_risk(probability: float) -> tuple:
     """Clasifica el nivel de riesgo según la probabilidad."""
-    if probability >= 70:
-        return ("high", "RIESGO ALTO")
-    elif probability >= 40:
-        return ("medium", "RIESGO MODERADO")
-    else:
-        return ("low", "RIESGO BAJO")
+    # Cantidad de umbrales alcanzados: 0 → low, 1 → medium, 2 → high
+    code = sum(probability >= threshold for threshold in RISK_THRESHOLDS)
+    return (RISK_LEVELS[code], RISK_LABELS[code])
+
+
+def classify_risk_array(probabilities: np.ndarray) -> tuple:
+    """Versión vectorizada de _classify_risk → (niveles, etiquetas) como arreglos."""
+    codes = np.searchsorted(np.asarray(RISK_THRESHOLDS, dtype=float), probabilities, side="right")
+    return (
+        np.asarray(RISK_LEVELS, dtype=object)[codes],
+        np.asarray(RISK_LABELS, dtype=object)[codes],
+    )
+
+
+# ──────────────────────────────────────────────
+# Factores contribuyentes
+# ──────────────────────────────────────────────
+# El orden define el bit de cada factor en factor_flags y el orden en que
+# se listan (el mismo que usa _get_contributing_factors).
+CONTRIBUTING_FACTORS = (
+    "Promedio académico bajo (CGPA)",
+    "Sueño insuficiente (menos de 5 horas)",
+    "Sueño reducido (5-6 horas)",
+    "Alta presión académica",
+    "Alto estrés financiero",
+    "Excesivas horas de trabajo/estudio",
+    "Baja satisfacción con los estudios",
+    "Hábitos alimentarios poco saludables",
+    "Antecedentes familiares de enfermedad mental",
+)
+
+# Lista de factores para cada máscara posible (2^9 combinaciones)
+_FACTOR_COMBINATIONS = [
+    [name for bit, name in enumerate(CONTRIBUTING_FACTORS) if mask >> bit & 1]
+    for mask in range(1 << len(CONTRIBUTING_FACTORS))
+]
+
+
+def contributing_factor_matrix(df: pd.DataFrame) -> np.ndarray:
+    """
+    Matriz booleana (filas × CONTRIBUTING_FACTORS) con las mismas reglas
+    que _get_contributing_factors, evaluadas columna a columna.
+    """
+    n = len(df)
+
+    def numeric(col, default):
+        if col not in df.columns:
+            return np.full(n, float(default))
+        return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+    def text(col):
+        if col not in df.columns:
+            return pd.Series([""] * n, index=df.index)
+        return df[col].astype(str).str.lower()
+
+    sleep = text("Sleep Duration")
+    short_sleep = (
+        sleep.str.contains("less than 5", regex=False) | sleep.str.contains("< 5", regex=False)
+    ).to_numpy()
+    reduced_sleep = ~short_sleep & sleep.str.contains("5-6", regex=False).to_numpy()
+
+    columns = [
+        numeric("CGPA", 5) < 4.0,
+        short_sleep,
+        reduced_sleep,
+        numeric("Academic Pressure", 0) >= 4,
+        numeric("Financial Stress", 0) >= 4,
+        numeric("Work/Study Hours", 0) >= 8,
+        numeric("Study Satisfaction", 5) <= 2,
+        (text("Dietary Habits") == "unhealthy").to_numpy(),
+        (text("Family History of Mental Illness") == "yes").to_numpy(),
+    ]
+    return np.column_stack(columns) if n else np.zeros((0, len(CONTRIBUTING_FACTORS)), dtype=bool)
+
+
+def factor_flags(matrix: np.ndarray) -> np.ndarray:
+    """Comprime la matriz de factores a una máscara de bits por fila (uint16)."""
+    weights = (1 << np.arange(matrix.shape[1])).astype(np.uint16)
+    return (matrix.astype(np.uint16) * weights).sum(axis=1).astype(np.uint16)
+
+
+def decode_factor_flags(flags) -> list:
+    """Máscaras de bits → listas de factores (mismo formato que predict_single)."""
+    return [list(_FACTOR_COMBINATIONS[int(mask)]) for mask in flags]
+
+
+def _as_float(value, default: float) -> float:
+    """float() tolerante: valores no numéricos (p. ej. "?") se tratan como NaN."""
+    if value is None:
+        return float(default)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
 
 
 def _get_contributing_factors(data: dict, probability: float) -> list:
     """Identifica los factores que contribuyen al riesgo."""
     factors = []
 
-    cgpa = float(data.get("CGPA", 5))
+    cgpa = _as_float(data.get("CGPA", 5), 5)
     if cgpa < 4.0:
         factors.append("Promedio académico bajo (CGPA)")
 
@@ -169,19 +866,19 @@ def _get_contributing_factors(data: dict, probability: float) -> list:
     elif "5-6" in sleep:
         factors.append("Sueño reducido (5-6 horas)")
 
-    pressure = float(data.get("Academic Pressure", 0))
+    pressure = _as_float(data.get("Academic Pressure", 0), 0)
     if pressure >= 4:
         factors.append("Alta presión académica")
 
-    financial = float(data.get("Financial Stress", 0))
+    financial = _as_float(data.get("Financial Stress", 0), 0)
     if financial >= 4:
         factors.append("Alto estrés financiero")
 
-    work_hours = float(data.get("Work/Study Hours", 0))
+    work_hours = _as_float(data.get("Work/Study Hours", 0), 0)
     if work_hours >= 8:
         factors.append("Excesivas horas de trabajo/estudio")
 
-    study_sat = float(data.get("Study Satisfaction", 5))
+    study_sat = _as_float(data.get("Study Satisfaction", 5), 5)
     if study_sat <= 2:
         factors.append("Baja satisfacción con los estudios")
 
@@ -0,0 +1,272 @@
+"""
+out_of_core.py — Entrenamiento por bloques para datasets que no caben en memoria.
+
+El CSV se lee con pandas en bloques de `chunk_rows` filas; en memoria solo
+vive un bloque a la vez:
+    1. Primera pasada: vocabulario de cada columna categórica y media/varianza
+       acumuladas de las numéricas (StandardScaler.partial_fit), solo con las
+       filas de entrenamiento.
+    2. Segunda pasada: cada bloque se transforma con el preprocesador ya
+       fijado y se guarda en disco como matriz dispersa (train y test aparte).
+    3. Épocas de SGDClassifier(loss="log_loss").partial_fit sobre los bloques
+       de train en orden aleatorio y con las filas de cada bloque barajadas.
+    4. Evaluación sobre los bloques de test acumulando la matriz de confusión.
+
+El split train/test se decide por un hash del `id` de cada fila, así que no
+depende del tamaño de bloque ni del orden del archivo. El resultado es un
+Pipeline(ColumnTransformer, LogisticRegression) igual en forma al de
+train_model.py: los pesos del SGD se copian a una LogisticRegression (en
+binario, ambos calculan predict_proba como sigmoid(w·x + b)), así que
+model_service lo carga y lo compila con LinearScorer como a cualquier otro.
+"""
+
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import classification_report
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from dataset_cache import CSV_DTYPES, clean_frame
+
+TARGET = "Depression"
+DROP_COLUMNS = ("id", "Depression", "Have you ever had suicidal thoughts ?")
+CHUNK_ROWS = 50_000
+
+
+def _read_chunks(csv_path: Path, chunk_rows: int):
+    """Bloques limpios del CSV, con un id por fila (la posición si el CSV no trae id)."""
+    start = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, dtype=CSV_DTYPES):
+        chunk = clean_frame(chunk)
+        if "id" not in chunk.columns:
+            chunk["id"] = np.arange(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def is_test_row(ids, test_size: float) -> np.ndarray:
+    """Split determinista por id (hash multiplicativo de 32 bits)."""
+    h = (np.asarray(ids, dtype=np.uint64) * np.uint64(0x9E3779B1)) & np.uint64(0xFFFFFFFF)
+    return h < np.uint64(int(test_size * 2**32))
+
+
+# ──────────────────────────────────────────────
+# 1. Estadísticas (primera pasada)
+# ──────────────────────────────────────────────
+def learn_statistics(csv_path: Path, chunk_rows: int = CHUNK_ROWS, test_size: float = 0.2) -> dict:
+    """Columnas, vocabularios, scaler ajustado y conteos, leyendo el CSV por bloques."""
+    columns = num_cols = cat_cols = None
+    scaler = StandardScaler()
+    vocab = {}
+    counts = {"train": 0, "test": 0, "positives": 0}
+    for chunk in _read_chunks(csv_path, chunk_rows):
+        if num_cols is None:
+            X = chunk.drop(columns=[c for c in DROP_COLUMNS if c in chunk.columns])
+            columns = X.columns.tolist()
+            num_cols = X.select_dtypes(include=["int64", "float64"]).columns.tolist()
+            cat_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
+            vocab = {c: set() for c in cat_cols}
+        train = chunk[~is_test_row(chunk["id"], test_size)]
+        counts["test"] += len(chunk) - len(train)
+        counts["train"] += len(train)
+        counts["positives"] += int(train[TARGET].sum())
+        if len(train):
+            scaler.partial_fit(train[num_cols].to_numpy(dtype=np.float64))
+            for col in cat_cols:
+                vocab[col].update(train[col].dropna().astype(str).unique())
+    if not counts["train"]:
+        raise ValueError(f"No hay filas de entrenamiento en {csv_path}")
+    return {
+        "columns": columns,
+        "num_cols": num_cols,
+        "cat_cols": cat_cols,
+        "categories": {c: sorted(v) for c, v in vocab.items()},
+        "scaler": scaler,
+        **counts,
+    }
+
+
+def build_preprocessor(stats: dict, sample: pd.DataFrame) -> ColumnTransformer:
+    """
+    ColumnTransformer con el mismo diseño que train_model.py pero ajustado
+    con las estadísticas globales: se ajusta sobre un bloque de muestra (para
+    fijar columnas y nombres) y luego el scaler recibe la media/varianza de
+    todo el dataset; el OneHotEncoder usa el vocabulario completo.
+    """
+    num_cols, cat_cols = stats["num_cols"], stats["cat_cols"]
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), num_cols),
+            (
+                "cat",
+                OneHotEncoder(
+                    categories=[stats["categories"][c] for c in cat_cols],
+                    handle_unknown="ignore",
+                ),
+                cat_cols,
+            ),
+        ]
+    )
+    preprocessor.fit(_features(sample, stats))
+    fitted = preprocessor.named_transformers_["num"]
+    for attr in ("mean_", "var_", "scale_", "n_samples_seen_"):
+        setattr(fitted, attr, getattr(stats["scaler"], attr))
+    return preprocessor
+
+
+def _features(chunk: pd.DataFrame, stats: dict) -> pd.DataFrame:
+    X = chunk[stats["columns"]].copy()
+    X[stats["num_cols"]] = X[stats["num_cols"]].astype(np.float64)
+    X[stats["cat_cols"]] = X[stats["cat_cols"]].astype(str)
+    return X
+
+
+# ──────────────────────────────────────────────
+# 2. Bloques transformados en disco (segunda pasada)
+# ──────────────────────────────────────────────
+def spill_chunks(csv_path: Path, stats: dict, preprocessor, spill_dir: Path,
+                 chunk_rows: int = CHUNK_ROWS, test_size: float = 0.2) -> dict:
+    """Transforma cada bloque y lo guarda como CSR + etiquetas; retorna {"train": [...], "test": [...]}."""
+    spill_dir = Path(spill_dir)
+    spill_dir.mkdir(parents=True, exist_ok=True)
+    parts = {"train": [], "test": []}
+    for i, chunk in enumerate(_read_chunks(csv_path, chunk_rows)):
+        test = is_test_row(chunk["id"], test_size)
+        for split, mask in (("train", ~test), ("test", test)):
+            if not mask.any():
+                continue
+            rows = chunk[mask]
+            X = sp.csr_matrix(preprocessor.transform(_features(rows, stats)), dtype=np.float64)
+            base = spill_dir / f"{split}{i:06d}"
+            sp.save_npz(base.with_suffix(".npz"), X)
+            np.save(base.with_suffix(".npy"), rows[TARGET].to_numpy(dtype=np.int64))
+            parts[split].append(base)
+    return parts
+
+
+def _load_part(base: Path):
+    return sp.load_npz(base.with_suffix(".npz")), np.load(base.with_suffix(".npy"))
+
+
+# ──────────────────────────────────────────────
+# 3. Entrenamiento incremental
+# ──────────────────────────────────────────────
+def train_sgd(parts: list, n_train: int, C: float = 0.01, epochs: int = 5, seed: int = 42) -> SGDClassifier:
+    """
+    Épocas de partial_fit sobre bloques barajados. alpha = 1 / (C · n) da la
+    misma regularización L2 que LogisticRegression(C) sobre n filas.
+    """
+    rng = np.random.default_rng(seed)
+    clf = SGDClassifier(loss="log_loss", penalty="l2", alpha=1.0 / (C * n_train), random_state=seed)
+    classes = np.array([0, 1])
+    for epoch in range(1, epochs + 1):
+        t0 = time.perf_counter()
+        for i in rng.permutation(len(parts)):
+            X, y = _load_part(parts[i])
+            order = rng.permutation(len(y))
+            clf.partial_fit(X[order], y[order], classes=classes)
+        print(f"[out_of_core] Época {epoch}/{epochs}: {len(parts)} bloques en {time.perf_counter() - t0:.2f} s")
+    return clf
+
+
+def as_logistic_regression(sgd: SGDClassifier, C: float = 0.01) -> LogisticRegression:
+    """LogisticRegression con los pesos del SGD (mismo predict_proba en binario)."""
+    model = LogisticRegression(C=C, penalty="l2", solver="lbfgs", max_iter=1000)
+    model.classes_ = sgd.classes_
+    model.coef_ = sgd.coef_.copy()
+    model.intercept_ = sgd.intercept_.copy()
+    model.n_features_in_ = sgd.n_features_in_
+    model.n_iter_ = np.array([int(sgd.n_iter_)], dtype=np.int32)
+    return model
+
+
+# ──────────────────────────────────────────────
+# 4. Evaluación por bloques
+# ──────────────────────────────────────────────
+def evaluate(model, parts: list) -> np.ndarray:
+    """Matriz de confusión 2×2 [[tn, fp], [fn, tp]] acumulada bloque a bloque."""
+    cm = np.zeros((2, 2), dtype=np.int64)
+    for base in parts:
+        X, y = _load_part(base)
+        pred = model.predict(X).astype(np.int64)
+        cm += np.bincount(y * 2 + pred, minlength=4).reshape(2, 2)
+    return cm
+
+
+def confusion_report(cm: np.ndarray, target_names: list, digits: int = 2) -> str:
+    """Mismo formato que classification_report, calculado desde la matriz de confusión."""
+    y_true = np.array([0, 0, 1, 1])
+    y_pred = np.array([0, 1, 0, 1])
+    report = classification_report(
+        y_true, y_pred, sample_weight=cm.ravel(), target_names=target_names, output_dict=True, zero_division=0
+    )
+    width = max(len(n) for n in target_names + ["weighted avg"])
+    lines = [f"{'':>{width}s}  {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}", ""]
+    for name in target_names:
+        r = report[name]
+        lines.append(
+            f"{name:>{width}s}  {r['precision']:>9.{digits}f} {r['recall']:>9.{digits}f} "
+            f"{r['f1-score']:>9.{digits}f} {int(round(r['support'])):>9}"
+        )
+    lines.append("")
+    total = int(cm.sum())
+    lines.append(f"{'accuracy':>{width}s}  {'':>9} {'':>9} {report['accuracy']:>9.{digits}f} {total:>9}")
+    for name in ("macro avg", "weighted avg"):
+        r = report[name]
+        lines.append(
+            f"{name:>{width}s}  {r['precision']:>9.{digits}f} {r['recall']:>9.{digits}f} "
+            f"{r['f1-score']:>9.{digits}f} {total:>9}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def accuracy_f1(cm: np.ndarray) -> tuple:
+    tn, fp, fn, tp = (int(v) for v in cm.ravel())
+    total = tn + fp + fn + tp
+    accuracy = (tp + tn) / total if total else 0.0
+    f1 = 2 * tp / (2 * tp + fp + fn) if tp else 0.0
+    return accuracy, f1
+
+
+# ──────────────────────────────────────────────
+# Flujo completo
+# ──────────────────────────────────────────────
+def train_out_of_core(csv_path: Path, chunk_rows: int = CHUNK_ROWS, epochs: int = 5, C: float = 0.01,
+                      test_size: float = 0.2, spill_dir: Path = None, seed: int = 42):
+    """Entrena por bloques; retorna (pipeline, matriz de confusión del test)."""
+    t0 = time.perf_counter()
+    stats = learn_statistics(csv_path, chunk_rows, test_size)
+    print(
+        f"[out_of_core] Pasada 1: {stats['train']} filas de train, {stats['test']} de test "
+        f"({time.perf_counter() - t0:.2f} s)"
+    )
+    print(f"Numéricas ({len(stats['num_cols'])}): {stats['num_cols']}")
+    print(f"Categóricas ({len(stats['cat_cols'])}): {stats['cat_cols']}")
+
+    sample = next(_read_chunks(csv_path, min(chunk_rows, 1000)))
+    preprocessor = build_preprocessor(stats, sample)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="out-of-core-", dir=spill_dir))
+    try:
+        t1 = time.perf_counter()
+        parts = spill_chunks(csv_path, stats, preprocessor, work_dir, chunk_rows, test_size)
+        print(
+            f"[out_of_core] Pasada 2: {len(parts['train'])} bloques de train y {len(parts['test'])} de test "
+            f"en {work_dir} ({time.perf_counter() - t1:.2f} s)"
+        )
+        sgd = train_sgd(parts["train"], stats["train"], C=C, epochs=epochs, seed=seed)
+        classifier = as_logistic_regression(sgd, C)
+        cm = evaluate(classifier, parts["test"])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    model = Pipeline(steps=[("preprocessor", preprocessor), ("classifier", classifier)])
+    return model, cm
@@ -0,0 +1,212 @@
+"""
+rescoring.py — Re-puntuación del dataset completo como job en segundo plano.
+
+Puntuar todo el dataset (predict_batch) ya no ocurre dentro de la petición
+que lo necesita primero: main.py lanza un job que
+    1. parte el dataset en bloques de RESCORE_CHUNK_ROWS filas
+    2. los puntúa en un ProcessPoolExecutor (RESCORE_WORKERS procesos, cada
+       uno con su copia del modelo) o, con un solo worker o pocas filas,
+       en el mismo hilo del job
+    3. reporta el avance (bloques y filas) en GET /api/jobs/{id}
+    4. publica el resultado de una vez (ver main._build_scored)
+Mientras tanto las peticiones siguen usando el dataset puntuado anterior.
+
+Los workers se crean con "spawn": el servidor tiene hilos en marcha y un
+fork podría heredar locks tomados.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from model_service import ModelEntry, _load_model, predict_batch
+
+RESCORE_WORKERS = int(os.environ.get("RESCORE_WORKERS", str(min(4, os.cpu_count() or 1))))
+RESCORE_CHUNK_ROWS = int(os.environ.get("RESCORE_CHUNK_ROWS", "5000"))
+# Por debajo de este tamaño arrancar procesos cuesta más que puntuar
+RESCORE_PARALLEL_MIN_ROWS = int(os.environ.get("RESCORE_PARALLEL_MIN_ROWS", "50000"))
+# Jobs terminados que se conservan para consultarlos
+MAX_JOBS_KEPT = 50
+
+
+def score_frame(df: pd.DataFrame, entry: ModelEntry) -> pd.DataFrame:
+    """predict_batch sobre filas del dataset, conservando id y Depression_actual."""
+    cols_to_drop = ["id", "Depression", "Have you ever had suicidal thoughts ?"]
+    X = df.drop(columns=[c for c in cols_to_drop if c in df.columns])
+    predicted = predict_batch(X, entry)
+    predicted["id"] = df["id"]
+    predicted["Depression_actual"] = df["Depression"]
+    return predicted
+
+
+# ──────────────────────────────────────────────
+# Jobs
+# ──────────────────────────────────────────────
+class Job:
+    """Un job en segundo plano y su avance (lo que devuelve /api/jobs/{id})."""
+
+    def __init__(self, kind: str, params: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = "queued"  # queued | running | done | error
+        self.phase = None
+        self.rows_total = 0
+        self.rows_done = 0
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.workers = 0
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def describe(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "phase": self.phase,
+            "progress": round(self.rows_done / self.rows_total, 4) if self.rows_total else 0.0,
+            "rows_done": self.rows_done,
+            "rows_total": self.rows_total,
+            "chunks_done": self.chunks_done,
+            "chunks_total": self.chunks_total,
+            "workers": self.workers,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(end - self.started_at, 4) if self.started_at else None,
+        }
+
+
+class JobManager:
+    """Jobs en curso y recientes; cada uno corre en su propio hilo."""
+
+    def __init__(self, max_kept: int = MAX_JOBS_KEPT):
+        self.max_kept = max_kept
+        self._jobs = OrderedDict()  # id → Job
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, params: dict, run, dedupe: bool = True) -> Job:
+        """
+        Lanza `run(job)` en un hilo y retorna el Job. Con `dedupe`, si ya hay
+        uno en curso del mismo tipo y con los mismos parámetros, retorna ese.
+        """
+        with self._lock:
+            if dedupe:
+                for job in self._jobs.values():
+                    if job.kind == kind and job.params == params and job.status in ("queued", "running"):
+                        return job
+            job = Job(kind, params)
+            self._jobs[job.id] = job
+            finished = [j for j in self._jobs.values() if j.status in ("done", "error")]
+            for old in finished[: max(0, len(self._jobs) - self.max_kept)]:
+                del self._jobs[old.id]
+        threading.Thread(target=self._run, args=(job, run), name=f"job-{job.id}", daemon=True).start()
+        return job
+
+    def _run(self, job: Job, run):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            run(job)
+            job.status = "done"
+        except Exception as e:
+            job.status = "error"
+            job.error = str(e)
+            print(f"[rescoring] Error en el job {job.id} ({job.kind}): {e}")
+        finally:
+            job.phase = None
+            job.finished_at = time.time()
+            job._done.set()
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def latest(self, kind: str, params: dict):
+        """Último job de este tipo y parámetros (en curso o terminado), o None."""
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job.kind == kind and job.params == params:
+                    return job
+        return None
+
+    def describe(self) -> list:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.describe() for job in reversed(jobs)]
+
+
+# ──────────────────────────────────────────────
+# Puntuación por bloques
+# ──────────────────────────────────────────────
+_worker_entry = None
+
+
+def _init_worker(name: str, path: str, version: str):
+    global _worker_entry
+    _worker_entry = ModelEntry(name, Path(path), _load_model(Path(path)))
+    if _worker_entry.version != version:
+        raise RuntimeError(f"El artefacto de '{name}' cambió durante la re-puntuación")
+
+
+def _score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    return score_frame(chunk, _worker_entry)
+
+
+def score_in_chunks(df: pd.DataFrame, entry: ModelEntry, job: Job = None,
+                    chunk_rows: int = None, workers: int = None) -> pd.DataFrame:
+    """
+    score_frame sobre `df` por bloques; el resultado es idéntico a puntuarlo
+    de una vez (mismo orden e índice). Actualiza el avance de `job`.
+    """
+    chunk_rows = max(1, chunk_rows or RESCORE_CHUNK_ROWS)
+    workers = RESCORE_WORKERS if workers is None else workers
+    bounds = list(range(0, len(df), chunk_rows)) or [0]
+    chunks = [df.iloc[start:start + chunk_rows] for start in bounds]
+    parallel = workers > 1 and len(chunks) > 1 and len(df) >= RESCORE_PARALLEL_MIN_ROWS
+    if job is not None:
+        job.phase = "scoring"
+        job.rows_total, job.chunks_total = len(df), len(chunks)
+        job.workers = min(workers, len(chunks)) if parallel else 1
+
+    def advance(chunk: pd.DataFrame):
+        if job is not None:
+            job.chunks_done += 1
+            job.rows_done += len(chunk)
+
+    if not parallel:
+        results = []
+        for chunk in chunks:
+            results.append(score_frame(chunk, entry))
+            advance(chunk)
+        return pd.concat(results) if len(results) > 1 else results[0]
+
+    results = [None] * len(chunks)
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(entry.name, str(entry.path), entry.version),
+    ) as pool:
+        futures = {pool.submit(_score_chunk, chunk): i for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            advance(chunks[i])
+    return pd.concat(results)
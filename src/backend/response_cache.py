@@ -0,0 +1,153 @@
+"""
+response_cache.py — Cache de respuestas ya codificadas para los GET de solo lectura.
+
+Cada entrada guarda el cuerpo JSON listo para enviar, su versión gzip
+(si vale la pena comprimirlo) y un ETag fuerte. La clave la arma cada
+endpoint con sus parámetros ya validados más las versiones de las que
+depende (dataset, registros ingeridos, modelo), así que un cambio de datos
+o de modelo produce claves nuevas y las entradas viejas salen por LRU.
+
+encoded_response() resuelve la negociación:
+    - If-None-Match coincide → 304 sin cuerpo
+    - Accept-Encoding incluye gzip → cuerpo comprimido (Content-Encoding)
+    - si no → cuerpo sin comprimir
+Siempre con ETag, Cache-Control y Vary: Accept-Encoding.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Por debajo de este tamaño gzip no compensa (cabeceras + CPU)
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+class EncodedBody:
+    """Cuerpo serializado + variante gzip + ETag."""
+
+    __slots__ = ("body", "gzip", "etag", "media_type")
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.gzip = gzip.compress(body, GZIP_LEVEL, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + (len(self.gzip) if self.gzip is not None else 0) + 200
+
+
+class ResponseCache:
+    """LRU de EncodedBody acotado por entradas y por bytes."""
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self._data = OrderedDict()  # clave → EncodedBody
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get_or_build(self, key: tuple, build) -> EncodedBody:
+        """Retorna la entrada de `key`; si falta, `build()` → bytes se codifica y se guarda."""
+        if self.enabled:
+            with self._lock:
+                encoded = self._data.get(key)
+                if encoded is not None:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return encoded
+                self.misses += 1
+        encoded = EncodedBody(build())
+        self.put(key, encoded)
+        return encoded
+
+    def put(self, key: tuple, encoded: EncodedBody):
+        if not self.enabled or encoded.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._data[key] = encoded
+            self._bytes += encoded.size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, oldest = self._data.popitem(last=False)
+                self._bytes -= oldest.size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+def accepted_encodings(request: Request) -> dict:
+    """Codificaciones de Accept-Encoding → peso q (q=0 significa rechazada)."""
+    accepted = {}
+    for part in request.headers.get("accept-encoding", "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        coding, params = coding.strip(), params.strip()
+        if not coding:
+            continue
+        q = 1.0
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                pass
+        accepted[coding] = q
+    return accepted
+
+
+def accepts(accepted: dict, coding: str) -> bool:
+    return accepted.get(coding, accepted.get("*", 0.0)) > 0
+
+
+def _accepts_gzip(request: Request) -> bool:
+    return accepts(accepted_encodings(request), "gzip")
+
+
+def encoded_response(request: Request, encoded: EncodedBody, cache_control: str = "no-cache") -> Response:
+    """
+    Responde 304 si el cliente ya tiene esta versión; si no, el cuerpo (gzip
+    si lo acepta). La variante gzip lleva su propio ETag ("...-gz") porque
+    son bytes distintos; cualquiera de los dos valida la misma versión.
+    """
+    use_gzip = encoded.gzip is not None and _accepts_gzip(request)
+    etag = encoded.etag[:-1] + '-gz"' if use_gzip else encoded.etag
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    if encoded.etag in tags or encoded.etag[:-1] + '-gz"' in tags or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=encoded.gzip, media_type=encoded.media_type, headers=headers)
+    return Response(content=encoded.body, media_type=encoded.media_type, headers=headers)
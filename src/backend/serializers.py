@@ -0,0 +1,96 @@
+"""
+serializers.py — Serialización columnar de respuestas de la API.
+
+En lugar de recorrer filas con iterrows(), cada columna se renombra y se
+convierte una sola vez y los registros se arman en bloque. La codificación
+JSON usa orjson.
+"""
+
+import numpy as np
+import orjson
+import pandas as pd
+
+# (clave en la respuesta, columna del DataFrame, tipo)
+# Debe coincidir con el tipo StudentRecord de frontend/src/api/client.ts
+STUDENT_RECORD_FIELDS = [
+    ("id", "id", "id"),
+    ("gender", "Gender", "str"),
+    ("age", "Age", "float"),
+    ("city", "City", "str"),
+    ("profession", "Profession", "str"),
+    ("degree", "Degree", "str"),
+    ("cgpa", "CGPA", "float"),
+    ("sleep_duration", "Sleep Duration", "str"),
+    ("academic_pressure", "Academic Pressure", "float"),
+    ("financial_stress", "Financial Stress", "float"),
+    ("dietary_habits", "Dietary Habits", "str"),
+    ("family_history", "Family History of Mental Illness", "str"),
+    ("work_study_hours", "Work/Study Hours", "float"),
+    ("probability", "probability", "float"),
+    ("risk_level", "risk_level", "str"),
+    ("risk_label", "risk_label", "str"),
+    ("depression_actual", "Depression_actual", "int"),
+]
+
+ALERT_RECORD_FIELDS = [
+    ("id", "id", "id"),
+    ("degree", "Degree", "str"),
+    ("probability", "probability", "float"),
+    ("risk_level", "risk_level", "str"),
+]
+
+
+def dumps(payload) -> bytes:
+    """Codifica a JSON (acepta escalares numpy; NaN se emite como null)."""
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def id_strings(ids: pd.Series) -> list:
+    """ids como texto, igual que str(int(id)); vacío si falta."""
+    if pd.api.types.is_integer_dtype(ids):
+        return ids.astype(str).tolist()
+    numeric = pd.to_numeric(ids, errors="coerce")
+    return [str(int(v)) if v == v else "" for v in numeric.tolist()]
+
+
+def _column_values(df: pd.DataFrame, column: str, kind: str) -> list:
+    if kind == "id":
+        return id_strings(df[column])
+    if kind == "float":
+        # Valores no numéricos (p. ej. "?" en Financial Stress) salen como null
+        return pd.to_numeric(df[column], errors="coerce").astype(float).tolist()
+    if kind == "int":
+        values = df[column]
+        if values.isna().any():
+            # p. ej. Depression_actual de registros ingeridos sin etiqueta
+            return [int(v) if v == v else None for v in pd.to_numeric(values, errors="coerce").tolist()]
+        return values.astype(int).tolist()
+    return df[column].tolist()
+
+
+def to_records(df: pd.DataFrame, fields: list) -> list:
+    """Convierte un DataFrame a lista de dicts según `fields`, columna a columna."""
+    keys = [key for key, _, _ in fields]
+    columns = [_column_values(df, column, kind) for _, column, kind in fields]
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+
+def student_records(df: pd.DataFrame) -> list:
+    return to_records(df, STUDENT_RECORD_FIELDS)
+
+
+def alert_records(df: pd.DataFrame) -> list:
+    """Registros de alerta con el factor principal calculado de forma vectorizada."""
+    records = to_records(df, ALERT_RECORD_FIELDS)
+    pressure = pd.to_numeric(df["Academic Pressure"], errors="coerce").to_numpy()
+    financial = pd.to_numeric(df["Financial Stress"], errors="coerce").to_numpy()
+    short_sleep = df["Sleep Duration"].astype(str).str.lower().str.contains("less than 5", regex=False).to_numpy()
+    main_factor = np.select(
+        [pressure >= 4, financial >= 4, short_sleep],
+        ["Alta presión académica", "Alto estrés financiero", "Sueño insuficiente"],
+        default="",
+    )
+    cgpa_text = ("CGPA: " + df["CGPA"].astype(str)).tolist()
+    for record, factor, fallback in zip(records, main_factor.tolist(), cgpa_text):
+        record["main_factor"] = factor or fallback
+    return records
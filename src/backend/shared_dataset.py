@@ -0,0 +1,90 @@
+"""
+shared_dataset.py — Dataset puntuado compartido entre workers de uvicorn.
+
+Con `uvicorn --workers N` cada proceso tendría su propia copia del dataset
+puntuado y volvería a ejecutar predict_batch. Aquí el primer worker que lo
+necesita lo construye (con un lock de archivo para que los demás esperen)
+y lo publica en formato columnar en SHARED_DATASET_DIR, por defecto
+/dev/shm (memoria compartida). El resto de los workers lo abren con memory
+map: las columnas numéricas, los códigos de categorías y los arreglos del
+índice se comparten sin copia entre procesos.
+"""
+
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from dataset_cache import read_frame, write_frame
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos, el rename sigue siendo atómico
+    fcntl = None
+
+
+def _default_shared_dir() -> Path:
+    shm = Path("/dev/shm")
+    base = shm if shm.is_dir() and os.access(shm, os.W_OK) else Path(tempfile.gettempdir())
+    return base / "riesgo-depresivo"
+
+
+SHARED_DATASET_DIR = Path(os.environ.get("SHARED_DATASET_DIR", str(_default_shared_dir())))
+
+
+def shared_path(name: str, data_path: Path) -> Path:
+    """Carpeta compartida para `name`, distinta por cada archivo de datos."""
+    tag = hashlib.sha1(str(Path(data_path).resolve()).encode("utf-8")).hexdigest()[:8]
+    return SHARED_DATASET_DIR / f"{Path(data_path).stem}-{tag}.{name}"
+
+
+def load_or_build(directory: Path, source: dict, build, force: bool = False) -> tuple:
+    """
+    Retorna (DataFrame, arreglos) publicados en `directory` para `source`.
+
+    Si no existen (o son de otra versión), el primer proceso ejecuta
+    `build()` → (DataFrame, dict de arreglos) y lo publica; los demás
+    esperan el lock y luego se adjuntan a lo publicado. Si no se puede
+    escribir (p. ej. /dev/shm lleno) se usa el resultado en memoria local.
+    Con `force` se reconstruye y se vuelve a publicar aunque ya exista.
+    """
+    cached = None if force else read_frame(directory, source)
+    if cached is not None:
+        return cached
+
+    with file_lock(directory.with_name(directory.name + ".lock")):
+        cached = None if force else read_frame(directory, source)
+        if cached is not None:
+            return cached
+
+        df, arrays = build()
+        try:
+            write_frame(df, directory, source, arrays)
+        except OSError as e:
+            print(f"[shared_dataset] No se pudo publicar en {directory} ({e}); se usa memoria local")
+            return df, arrays
+        print(f"[shared_dataset] Dataset puntuado publicado en {directory}")
+        return read_frame(directory, source) or (df, arrays)
+
+
+@contextmanager
+def file_lock(lock_path: Path):
+    """Lock exclusivo entre procesos sobre `lock_path` (sin efecto si no hay fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    try:
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(lock_path, "a+")
+    except OSError:
+        yield
+        return
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+    finally:
+        try:
+            fcntl.flock(f, fcntl.LOCK_UN)
+        finally:
+            f.close()
@@ -0,0 +1,179 @@
+"""
+static_bundle.py — Frontend estático servido desde memoria, ya comprimido.
+
+Al arrancar se recorre una sola vez `static/` (el build de Vite) y cada
+archivo queda en memoria con:
+    - su Content-Type y un ETag (hash del contenido)
+    - variantes brotli y gzip: se usan los `.br` / `.gz` generados en el
+      build (python static_bundle.py static/, ver Dockerfile) y, si no
+      existen, se comprimen en el arranque; solo se guardan si pesan menos
+    - Cache-Control: los archivos de assets/ llevan hash en el nombre y se
+      marcan inmutables por un año; index.html y el resto se revalidan
+      con ETag (no-cache)
+
+Servir un archivo es una búsqueda en un dict: sin stat() ni lecturas de
+disco por petición. La variante se elige por Accept-Encoding (br > gzip).
+
+brotli es opcional: sin el módulo solo se generan variantes gzip.
+
+Uso (precomprimir en el build):
+    python static_bundle.py static/
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import sys
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from response_cache import accepted_encodings, accepts
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se sirve gzip
+    brotli = None
+
+# Tipos que vale la pena comprimir (imágenes y fuentes ya vienen comprimidas)
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml",
+                      "application/wasm", "application/manifest+json")
+COMPRESS_MIN_BYTES = 512
+ASSETS_PREFIX = "assets/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("application/javascript", ".mjs")
+mimetypes.add_type("image/svg+xml", ".svg")
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+def _content_type(path: Path) -> str:
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+def _compressible(media_type: str, size: int) -> bool:
+    return size >= COMPRESS_MIN_BYTES and media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=11)
+    return gzip.compress(body, 9, mtime=0)
+
+
+class StaticFile:
+    __slots__ = ("body", "media_type", "etag", "cache_control", "variants")
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str, variants: dict):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.cache_control = cache_control
+        self.variants = variants  # codificación → bytes
+
+
+class StaticBundle:
+    """Archivos del build en memoria, indexados por ruta relativa (posix)."""
+
+    def __init__(self, root: Path, files: dict):
+        self.root = Path(root)
+        self.files = files
+        self.index = files.get("index.html")
+
+    @classmethod
+    def scan(cls, root: Path) -> "StaticBundle":
+        root = Path(root)
+        files = {}
+        for path in sorted(root.rglob("*")):
+            if not path.is_file() or path.suffix in (".br", ".gz"):
+                continue
+            rel = path.relative_to(root).as_posix()
+            body = path.read_bytes()
+            media_type = _content_type(path)
+            variants = {}
+            if _compressible(media_type, len(body)):
+                for coding, suffix in ENCODINGS:
+                    precompressed = path.with_name(path.name + suffix)
+                    if precompressed.is_file():
+                        data = precompressed.read_bytes()
+                    elif coding == "br" and brotli is None:
+                        continue
+                    else:
+                        data = compress(body, coding)
+                    if len(data) < len(body):
+                        variants[coding] = data
+            cache_control = IMMUTABLE_CACHE_CONTROL if rel.startswith(ASSETS_PREFIX) else REVALIDATE_CACHE_CONTROL
+            files[rel] = StaticFile(body, media_type, cache_control, variants)
+        bundle = cls(root, files)
+        print(
+            f"[static_bundle] {len(files)} archivos en memoria ({bundle.size_bytes() / 1024:.0f} KB, "
+            f"brotli {'sí' if brotli is not None else 'no'})"
+        )
+        return bundle
+
+    def size_bytes(self) -> int:
+        return sum(len(f.body) + sum(len(v) for v in f.variants.values()) for f in self.files.values())
+
+    def lookup(self, path: str):
+        """
+        Archivo para una ruta del frontend: el archivo exacto, None si es un
+        asset inexistente (404) o index.html para las rutas del SPA.
+        """
+        found = self.files.get(path.lstrip("/"))
+        if found is not None:
+            return found
+        if path.lstrip("/").startswith(ASSETS_PREFIX):
+            return None
+        return self.index
+
+    def response(self, request: Request, static_file: StaticFile) -> Response:
+        """Respuesta con la mejor variante aceptada; 304 si el ETag coincide."""
+        coding = None
+        if static_file.variants:
+            accepted = accepted_encodings(request)
+            coding = next((c for c, _ in ENCODINGS if c in static_file.variants and accepts(accepted, c)), None)
+        etag = static_file.etag if coding is None else f'{static_file.etag[:-1]}-{coding}"'
+        headers = {"ETag": etag, "Cache-Control": static_file.cache_control}
+        if static_file.variants:
+            headers["Vary"] = "Accept-Encoding"
+        if_none_match = request.headers.get("if-none-match", "")
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if tags & {static_file.etag, *(f'{static_file.etag[:-1]}-{c}"' for c in static_file.variants)}:
+            return Response(status_code=304, headers=headers)
+        if coding is not None:
+            headers["Content-Encoding"] = coding
+            return Response(static_file.variants[coding], media_type=static_file.media_type, headers=headers)
+        return Response(static_file.body, media_type=static_file.media_type, headers=headers)
+
+
+def precompress(root: Path) -> int:
+    """Escribe `.br` y `.gz` junto a cada archivo comprimible del build; retorna cuántos escribió."""
+    written = 0
+    if brotli is None:
+        print("[static_bundle] brotli no está instalado; solo se genera gzip")
+    for path in sorted(Path(root).rglob("*")):
+        if not path.is_file() or path.suffix in (".br", ".gz"):
+            continue
+        body = path.read_bytes()
+        if not _compressible(_content_type(path), len(body)):
+            continue
+        for coding, suffix in ENCODINGS:
+            if coding == "br" and brotli is None:
+                continue
+            data = compress(body, coding)
+            if len(data) < len(body):
+                path.with_name(path.name + suffix).write_bytes(data)
+                written += 1
+    return written
+
+
+if __name__ == "__main__":
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent / "static"
+    print(f"[static_bundle] {precompress(target)} variantes comprimidas escritas en {target}")
@@ -0,0 +1,269 @@
+"""
+streaming.py — Utilidades para endpoints que leen y escriben en streaming.
+
+Permite recibir cuerpos grandes (JSON array, NDJSON o CSV, también dentro
+de un multipart/form-data) por partes y responder mientras la subida
+todavía está en curso, con memoria acotada.
+"""
+
+import json
+from functools import partial
+from typing import AsyncIterator
+
+import anyio
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+# Tamaño máximo de un registro individual dentro del cuerpo (bytes)
+MAX_RECORD_BYTES = 1024 * 1024
+
+
+class RequestBody:
+    """
+    `request.stream()` que avisa (evento `consumed`) cuando el cuerpo de la
+    petición se terminó de leer o se dejó de leer.
+    """
+
+    def __init__(self, request: Request):
+        self.request = request
+        self.consumed = anyio.Event()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self.request.stream():
+                yield chunk
+        finally:
+            self.consumed.set()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que permite seguir leyendo el cuerpo de la petición.
+
+    La versión de Starlette escucha `receive()` en paralelo para detectar
+    desconexiones, lo que le "roba" los fragmentos del cuerpo al generador.
+    Aquí, mientras se lee el cuerpo, es el propio generador el que consume
+    `request.stream()` (que ya lanza ClientDisconnect si el cliente se va);
+    una vez leído (`body.consumed`) se escucha `receive()` como en Starlette
+    y una desconexión cancela el envío de la respuesta.
+    """
+
+    def __init__(self, content, body: RequestBody = None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body = body
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self.body is None:
+            await self.stream_response(send)
+        else:
+            async with anyio.create_task_group() as task_group:
+
+                async def wrap(func):
+                    await func()
+                    task_group.cancel_scope.cancel()
+
+                task_group.start_soon(wrap, partial(self.stream_response, send))
+                await wrap(partial(self.listen_for_disconnect, receive))
+        if self.background is not None:
+            await self.background()
+
+    async def listen_for_disconnect(self, receive) -> None:
+        await self.body.consumed.wait()
+        await super().listen_for_disconnect(receive)
+
+
+class RecordParseError(Exception):
+    """Error de formato en un registro concreto del cuerpo."""
+
+    def __init__(self, index: int, message: str, fatal: bool = False):
+        super().__init__(message)
+        self.index = index
+        self.fatal = fatal
+
+
+async def iter_json_records(chunks: AsyncIterator[bytes]) -> AsyncIterator:
+    """
+    Decodifica incrementalmente un JSON array o un cuerpo NDJSON.
+
+    Produce tuplas (índice, objeto) o (índice, RecordParseError). En NDJSON
+    una línea inválida se reporta y se continúa con la siguiente; en un JSON
+    array un error de sintaxis es fatal porque no es posible resincronizar.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    mode = None  # "array" | "ndjson"
+    index = 0
+    pending = b""
+
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        # Evitar cortar un carácter UTF-8 multibyte entre fragmentos
+        data = pending + chunk
+        try:
+            text = data.decode("utf-8")
+            pending = b""
+        except UnicodeDecodeError as e:
+            if e.start < len(data) - 3:
+                yield index, RecordParseError(index, "El cuerpo no es UTF-8 válido", fatal=True)
+                return
+            text = data[:e.start].decode("utf-8")
+            pending = data[e.start:]
+        buffer += text
+
+        if mode is None:
+            stripped = buffer.lstrip()
+            if not stripped:
+                continue
+            mode = "array" if stripped[0] == "[" else "ndjson"
+            buffer = stripped[1:] if mode == "array" else stripped
+
+        if mode == "ndjson":
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                yield index, _loads_line(line, index)
+                index += 1
+        else:
+            pos = 0
+            while True:
+                pos = _skip_separators(buffer, pos)
+                if pos >= len(buffer) or buffer[pos] == "]":
+                    break
+                try:
+                    obj, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Registro incompleto: esperar al siguiente fragmento
+                    break
+                yield index, obj
+                index += 1
+                pos = end
+            buffer = buffer[pos:]
+
+        if len(buffer) > MAX_RECORD_BYTES:
+            yield index, RecordParseError(
+                index, f"Registro excede el tamaño máximo ({MAX_RECORD_BYTES} bytes)", fatal=True
+            )
+            return
+
+    # Fin del cuerpo: procesar lo que quede en el buffer
+    if mode == "ndjson":
+        line = buffer.strip()
+        if line:
+            yield index, _loads_line(line, index)
+    elif mode == "array":
+        pos = _skip_separators(buffer, 0)
+        if pos < len(buffer) and buffer[pos] != "]":
+            try:
+                obj, _ = decoder.raw_decode(buffer, pos)
+                yield index, obj
+            except json.JSONDecodeError as e:
+                yield index, RecordParseError(index, f"JSON inválido: {e.msg}", fatal=True)
+
+
+def _loads_line(line: str, index: int):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return RecordParseError(index, f"JSON inválido: {e.msg}")
+
+
+def _skip_separators(buffer: str, pos: int) -> int:
+    while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+        pos += 1
+    return pos
+
+
+async def iter_multipart_file(chunks: AsyncIterator[bytes], content_type: str, field: str = "file") -> AsyncIterator:
+    """
+    Bytes del campo `field` de un cuerpo multipart/form-data a medida que
+    llegan, sin volcar el archivo completo a disco como hace UploadFile.
+    """
+    _, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise ValueError("multipart/form-data sin boundary")
+
+    state = {"header": b"", "value": b"", "headers": {}, "target": False, "found": False}
+    out = []
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data, start, end):
+        state["header"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header"].lower()] = state["value"]
+        state["header"] = state["value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        state["target"] = not state["found"] and disposition.get(b"name") == field.encode("utf-8")
+        state["found"] = state["found"] or state["target"]
+
+    def on_part_data(data, start, end):
+        if state["target"]:
+            out.append(bytes(data[start:end]))
+
+    def on_part_end():
+        state["target"] = False
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    async for chunk in chunks:
+        parser.write(chunk)
+        for data in out:
+            yield data
+        out.clear()
+    parser.finalize()
+    for data in out:
+        yield data
+    if not state["found"]:
+        raise ValueError(f"El formulario no incluye el campo '{field}'")
+
+
+async def iter_line_blocks(chunks: AsyncIterator[bytes], block_bytes: int) -> AsyncIterator:
+    """
+    Reagrupa el flujo en bloques de ~`block_bytes` que terminan en un fin de
+    línea, sin cortar un campo CSV entre comillas que contenga saltos de línea.
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        if len(buffer) < block_bytes:
+            continue
+        cut = last_line_end(buffer)
+        if cut:
+            yield bytes(buffer[:cut])
+            del buffer[:cut]
+        elif len(buffer) > block_bytes + MAX_RECORD_BYTES:
+            raise ValueError(f"Línea excede el tamaño máximo ({MAX_RECORD_BYTES} bytes)")
+    if buffer:
+        yield bytes(buffer)
+
+
+def last_line_end(buffer: bytearray) -> int:
+    """Posición tras el último "\n" que no está dentro de comillas (0 si no hay)."""
+    quotes = buffer.count(b'"')
+    end = len(buffer)
+    while True:
+        pos = buffer.rfind(b"\n", 0, end)
+        if pos < 0:
+            return 0
+        if (quotes - buffer.count(b'"', pos)) % 2 == 0:
+            return pos + 1
+        end = pos
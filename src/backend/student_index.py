@@ -0,0 +1,487 @@
+"""
+student_index.py — Índices en memoria para filtrar y paginar /api/students.
+
+Se construyen una vez por cada dataset puntuado, de modo que una búsqueda
+o un filtro solo toca las filas que devuelve:
+    - ids como texto y un arreglo de sufijos ordenado (búsqueda por subcadena)
+    - posiciones de fila por nivel de riesgo
+    - conteos por nivel precalculados
+    - por cada campo ordenable, la permutación que ordena las filas
+      (argsort estable: empates por posición de fila), los valores ya
+      ordenados y el rango de cada fila
+
+Un listado ordenado y filtrado se arma intersectando el filtro con los
+rangos (np.sort de los rangos de las filas filtradas) y se guarda como
+"vista"; cualquier página de una vista es un searchsorted + un slice.
+La paginación por cursor (keyset) usa como clave (valor, fila), que no
+cambia con una ingesta porque las filas solo se agregan al final.
+
+Las filas ingeridas tienen su propio índice (segmento "delta", ver
+SegmentedIndex): una ingesta no copia ni reindexa el dataset publicado.
+"""
+
+import base64
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from serializers import id_strings
+
+RISK_LEVELS = ("low", "medium", "high")
+
+# Versión de los arreglos del índice (parte de la clave del dataset compartido)
+INDEX_FORMAT_VERSION = 2
+
+# sort_by de la API → columna del dataset puntuado
+SORT_FIELDS = {
+    "id": "id",
+    "probability": "probability",
+    "cgpa": "CGPA",
+    "age": "Age",
+}
+SORT_ORDERS = ("asc", "desc")
+
+# Vistas (filtro + orden) guardadas por índice
+MAX_VIEWS = 128
+
+
+class StudentIndex:
+    """Índices de un DataFrame puntuado (salida de predict_batch + id)."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+
+        # ── ids como texto (lo que ve el frontend) ──
+        self._build_suffix_index(id_strings(df["id"]))
+
+        # ── nivel de riesgo: código por fila, posiciones y conteos ──
+        levels = df["risk_level"].to_numpy(dtype=object)
+        self.risk_codes = np.full(self.size, -1, dtype=np.int8)
+        self.positions_by_level = {}
+        self.counts = {}
+        for code, level in enumerate(RISK_LEVELS):
+            positions = np.flatnonzero(levels == level)
+            self.risk_codes[positions] = code
+            self.positions_by_level[level] = positions
+            self.counts[level] = int(len(positions))
+
+        # ── orden precalculado por cada campo ordenable ──
+        self.sort_order, self.sort_values, self.sort_rank = {}, {}, {}
+        for field, column in SORT_FIELDS.items():
+            values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+            order = np.argsort(values, kind="stable")
+            self._set_sort(field, order, values[order])
+        self._init_views()
+
+    def to_arrays(self) -> dict:
+        return {
+            "risk_codes": self.risk_codes,
+            "suffixes": self._suffixes,
+            "suffix_rows": self._suffix_rows,
+            **{f"pos_{level}": self.positions_by_level[level] for level in RISK_LEVELS},
+            **{f"sort_order_{field}": self.sort_order[field] for field in SORT_FIELDS},
+            **{f"sort_values_{field}": self.sort_values[field] for field in SORT_FIELDS},
+            **{f"sort_rank_{field}": self.sort_rank[field] for field in SORT_FIELDS},
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict):
+        """Reconstruye el índice sin copiar (p. ej. desde arreglos con memory map)."""
+        index = cls.__new__(cls)
+        index.risk_codes = arrays["risk_codes"]
+        index.size = len(index.risk_codes)
+        index._suffixes = arrays["suffixes"]
+        index._suffix_rows = arrays["suffix_rows"]
+        index._width = index._suffixes.dtype.itemsize
+        index.positions_by_level = {level: arrays[f"pos_{level}"] for level in RISK_LEVELS}
+        index.counts = {level: int(len(pos)) for level, pos in index.positions_by_level.items()}
+        index.sort_order = {field: arrays[f"sort_order_{field}"] for field in SORT_FIELDS}
+        index.sort_values = {field: arrays[f"sort_values_{field}"] for field in SORT_FIELDS}
+        index.sort_rank = {field: arrays[f"sort_rank_{field}"] for field in SORT_FIELDS}
+        index._init_views()
+        return index
+
+    def append(self, df: pd.DataFrame):
+        """
+        Nuevo índice con las filas de `df` agregadas al final; el actual no
+        se modifica. Los sufijos nuevos se intercalan en el arreglo ordenado
+        con searchsorted, sin volver a ordenar todo.
+        """
+        added = StudentIndex(df)
+        offset = self.size
+        width = max(self._width, added._width)
+        old_suffixes = self._suffixes.astype(f"S{width}")
+        new_suffixes = added._suffixes.astype(f"S{width}")
+        at = np.searchsorted(old_suffixes, new_suffixes, side="right")
+
+        index = StudentIndex.__new__(StudentIndex)
+        index.size = offset + added.size
+        index._width = width
+        index._suffixes = np.insert(old_suffixes, at, new_suffixes)
+        index._suffix_rows = np.insert(self._suffix_rows, at, added._suffix_rows + offset)
+        index.risk_codes = np.concatenate([self.risk_codes, added.risk_codes])
+        index.positions_by_level = {
+            level: np.concatenate([self.positions_by_level[level], added.positions_by_level[level] + offset])
+            for level in RISK_LEVELS
+        }
+        index.counts = {level: self.counts[level] + added.counts[level] for level in RISK_LEVELS}
+        # Las filas nuevas tienen posiciones mayores: con side="right" quedan
+        # después de sus empates, igual que con un argsort estable completo
+        index.sort_order, index.sort_values, index.sort_rank = {}, {}, {}
+        for field in SORT_FIELDS:
+            at = np.searchsorted(self.sort_values[field], added.sort_values[field], side="right")
+            index._set_sort(
+                field,
+                np.insert(self.sort_order[field], at, added.sort_order[field] + offset),
+                np.insert(self.sort_values[field], at, added.sort_values[field]),
+            )
+        index._init_views()
+        return index
+
+    def _set_sort(self, field: str, order: np.ndarray, values: np.ndarray):
+        rank = np.empty(len(order), dtype=np.intp)
+        rank[order] = np.arange(len(order), dtype=np.intp)
+        self.sort_order[field] = order.astype(np.intp, copy=False)
+        self.sort_values[field] = values
+        self.sort_rank[field] = rank
+
+    def _init_views(self):
+        self._views = {}
+        self._views_lock = threading.Lock()
+
+    def _build_suffix_index(self, id_str: list):
+        """
+        Arreglo ordenado con todos los sufijos de cada id y su fila de origen.
+
+        Una subcadena de un id es prefijo de alguno de sus sufijos, así que la
+        búsqueda por subcadena se resuelve con dos búsquedas binarias.
+        """
+        encoded = np.array([s.lower() for s in id_str], dtype=bytes)
+        width = max(encoded.dtype.itemsize, 1)
+        self._width = width
+        matrix = np.zeros((len(encoded), width), dtype=np.uint8)
+        if len(encoded):
+            matrix[:, : encoded.dtype.itemsize] = encoded.view(np.uint8).reshape(len(encoded), -1)
+        lengths = (matrix != 0).sum(axis=1)
+
+        suffixes = [np.zeros(0, dtype=f"S{width}")]
+        rows = [np.zeros(0, dtype=np.intp)]
+        for k in range(width):
+            valid = np.flatnonzero(lengths > k)
+            if len(valid) == 0:
+                break
+            shifted = np.zeros((len(valid), width), dtype=np.uint8)
+            shifted[:, : width - k] = matrix[valid, k:]
+            suffixes.append(shifted.view(f"S{width}").ravel())
+            rows.append(valid)
+
+        suffixes = np.concatenate(suffixes)
+        rows = np.concatenate(rows)
+        order = np.argsort(suffixes, kind="stable")
+        self._suffixes = suffixes[order]
+        self._suffix_rows = rows[order]
+
+    def search(self, text: str) -> np.ndarray:
+        """Posiciones (ordenadas) de las filas cuyo id contiene `text`."""
+        query = text.lower().encode("utf-8")
+        if len(query) > self._width:
+            return np.zeros(0, dtype=np.intp)
+        lo = np.searchsorted(self._suffixes, query, side="left")
+        hi = np.searchsorted(self._suffixes, query + b"\xff", side="left")
+        return np.unique(self._suffix_rows[lo:hi])
+
+    def filter(self, search: str = None, risk_level: str = None) -> np.ndarray:
+        """
+        Posiciones de fila que cumplen la búsqueda y el filtro de riesgo,
+        en el orden original del dataset. None significa "todas las filas".
+        """
+        positions = None
+        if search:
+            positions = self.search(search)
+        if risk_level:
+            if risk_level not in RISK_LEVELS:
+                return np.zeros(0, dtype=np.intp)
+            if positions is None:
+                positions = self.positions_by_level[risk_level]
+            else:
+                positions = positions[self.risk_codes[positions] == RISK_LEVELS.index(risk_level)]
+        return positions
+
+    def level_counts(self, positions: np.ndarray = None) -> dict:
+        """Conteos por nivel de riesgo de un subconjunto (o del total)."""
+        if positions is None:
+            return dict(self.counts)
+        codes = self.risk_codes[positions]
+        bins = np.bincount(codes[codes >= 0], minlength=len(RISK_LEVELS))
+        return {level: int(bins[i]) for i, level in enumerate(RISK_LEVELS)}
+
+    def contains_ids(self, ids) -> np.ndarray:
+        """Por cada id de `ids`, si ya está en el índice (búsqueda binaria)."""
+        values = self.sort_values["id"]
+        ids = np.asarray(ids, dtype=np.float64)
+        at = np.minimum(np.searchsorted(values, ids, side="left"), max(len(values) - 1, 0))
+        return values[at] == ids if len(values) else np.zeros(len(ids), dtype=bool)
+
+    def max_id(self):
+        """Mayor id del índice, o None si no hay ids válidos."""
+        values = self.sort_values["id"]
+        # Los NaN (ids faltantes) quedan al final del orden
+        valid = int(np.searchsorted(values, np.nan, side="left"))
+        return float(values[valid - 1]) if valid else None
+
+    # ──────────────────────────────────────────────
+    # Listados ordenados y paginación por cursor
+    # ──────────────────────────────────────────────
+    def view(self, search: str = None, risk_level: str = None, sort_by: str = None) -> tuple:
+        """
+        Filas que cumplen el filtro en orden ascendente de `sort_by` (None:
+        orden del dataset) → (posiciones, rangos ascendentes, conteos por nivel).
+        Se calcula una vez por combinación y se reutiliza en todas sus páginas.
+        """
+        key = (search or None, risk_level or None, sort_by)
+        cached = self._views.get(key)
+        if cached is not None:
+            return cached
+
+        positions = self.filter(search=search, risk_level=risk_level)
+        counts = self.level_counts(positions)
+        if sort_by is None:
+            if positions is None:
+                positions = np.arange(self.size, dtype=np.intp)
+            ranks = positions
+        elif positions is None:
+            positions = self.sort_order[sort_by]
+            ranks = np.arange(self.size, dtype=np.intp)
+        else:
+            ranks = np.sort(self.sort_rank[sort_by][positions])
+            positions = self.sort_order[sort_by][ranks]
+
+        cached = (positions, ranks, counts)
+        with self._views_lock:
+            if len(self._views) >= MAX_VIEWS:
+                self._views.pop(next(iter(self._views)))
+            self._views[key] = cached
+        return cached
+
+    def page(self, search: str = None, risk_level: str = None, sort_by: str = None, descending: bool = False,
+             page_size: int = 50, page: int = 1, after: tuple = None) -> dict:
+        """
+        Una página del listado → {"rows", "total", "counts", "next"}.
+
+        Con `after` = (valor, fila) de la última fila ya vista se pagina por
+        keyset; si no, por número de página. "next" es la clave de la última
+        fila devuelta, o None si no hay más.
+        """
+        positions, ranks, counts = self.view(search, risk_level, sort_by)
+        total = len(positions)
+        if after is not None:
+            bound = self._key_rank(sort_by, after, side="left" if descending else "right")
+            cut = int(np.searchsorted(ranks, bound, side="left"))
+            start, end = (max(0, cut - page_size), cut) if descending else (cut, cut + page_size)
+        elif descending:
+            end = max(0, total - (page - 1) * page_size)
+            start = max(0, end - page_size)
+        else:
+            start = (page - 1) * page_size
+            end = start + page_size
+
+        rows = positions[start:end]
+        if descending:
+            rows = rows[::-1]
+        more = start > 0 if descending else end < total
+        return {
+            "rows": rows,
+            "total": total,
+            "counts": counts,
+            "next": self.sort_key(sort_by, int(rows[-1])) if more and len(rows) else None,
+        }
+
+    def sort_key(self, sort_by: str, row: int) -> tuple:
+        """Clave de keyset de una fila: (valor del campo, posición de fila)."""
+        if sort_by is None:
+            return (None, row)
+        return (float(self.sort_values[sort_by][self.sort_rank[sort_by][row]]), row)
+
+    def _key_rank(self, sort_by: str, key: tuple, side: str) -> int:
+        """
+        Cuántas filas van antes de la clave (side="left") o hasta ella
+        inclusive (side="right") en el orden ascendente de `sort_by`.
+        La fila de la clave puede ya no existir con ese valor: solo importa
+        dónde caería (valor, fila).
+        """
+        value, row = key
+        if sort_by is None:
+            return row + (1 if side == "right" else 0)
+        values, order = self.sort_values[sort_by], self.sort_order[sort_by]
+        lo = int(np.searchsorted(values, value, side="left"))
+        hi = int(np.searchsorted(values, value, side="right"))
+        # Dentro de un bloque de empates las filas están en orden ascendente
+        return lo + int(np.searchsorted(order[lo:hi], row, side=side))
+
+
+class SegmentedIndex:
+    """
+    Índice de un dataset puntuado en dos segmentos: la base (el dataset
+    puntuado publicado, inmutable) y las filas ingeridas después (delta),
+    cuyas posiciones siguen a las de la base. Cada segmento tiene su propio
+    StudentIndex, así que una ingesta solo reindexa el delta.
+
+    Las páginas se arman mezclando las vistas de ambos segmentos en el
+    orden (valor, fila): una búsqueda binaria ubica dónde empieza la
+    página en cada segmento y solo se mezclan esas filas, sin materializar
+    el listado combinado.
+    """
+
+    def __init__(self, base: StudentIndex, delta: StudentIndex = None):
+        self.base = base
+        self.delta = delta
+        self.offset = base.size
+        self.size = base.size + (delta.size if delta is not None else 0)
+        self.counts = {
+            level: base.counts[level] + (delta.counts[level] if delta is not None else 0)
+            for level in RISK_LEVELS
+        }
+        self._sort_orders = {}
+
+    def append(self, df: pd.DataFrame) -> "SegmentedIndex":
+        """Nuevo índice con las filas de `df` agregadas al delta; la base no se toca."""
+        delta = StudentIndex(df) if self.delta is None else self.delta.append(df)
+        return SegmentedIndex(self.base, delta)
+
+    def _segments(self) -> list:
+        """[(índice, posición de su primera fila)] de cada segmento."""
+        if self.delta is None:
+            return [(self.base, 0)]
+        return [(self.base, 0), (self.delta, self.offset)]
+
+    def contains_ids(self, ids) -> np.ndarray:
+        found = self.base.contains_ids(ids)
+        if self.delta is not None:
+            found |= self.delta.contains_ids(ids)
+        return found
+
+    def max_id(self):
+        ids = [i for i in (index.max_id() for index, _ in self._segments()) if i is not None]
+        return max(ids, default=None)
+
+    def search(self, text: str) -> np.ndarray:
+        """Posiciones (ordenadas) de las filas cuyo id contiene `text`."""
+        return np.concatenate([index.search(text) + offset for index, offset in self._segments()])
+
+    def sort_order(self, field: str) -> np.ndarray:
+        """
+        Permutación que ordena todas las filas por `field` (empates por
+        posición). Con delta se arma al pedirla, una vez por índice.
+        """
+        if self.delta is None:
+            return self.base.sort_order[field]
+        order = self._sort_orders.get(field)
+        if order is None:
+            at = np.searchsorted(self.base.sort_values[field], self.delta.sort_values[field], side="right")
+            order = self._sort_orders[field] = np.insert(
+                self.base.sort_order[field], at, self.delta.sort_order[field] + self.offset
+            )
+        return order
+
+    def page(self, search: str = None, risk_level: str = None, sort_by: str = None, descending: bool = False,
+             page_size: int = 50, page: int = 1, after: tuple = None) -> dict:
+        """Como StudentIndex.page, sobre las filas de ambos segmentos."""
+        if self.delta is None:
+            return self.base.page(search, risk_level, sort_by, descending, page_size, page, after)
+
+        views = [(index, offset, *index.view(search, risk_level, sort_by)) for index, offset in self._segments()]
+        total = sum(len(positions) for _, _, positions, _, _ in views)
+        counts = {level: sum(c[level] for _, _, _, _, c in views) for level in RISK_LEVELS}
+        if after is not None:
+            # Filas antes de la clave (o hasta ella) en el orden combinado
+            value, row = after
+            side = "left" if descending else "right"
+            cut = sum(
+                int(np.searchsorted(ranks, index._key_rank(sort_by, (value, row - offset), side), side="left"))
+                for index, offset, _, ranks, _ in views
+            )
+            start, end = (max(0, cut - page_size), cut) if descending else (cut, cut + page_size)
+        elif descending:
+            end = max(0, total - (page - 1) * page_size)
+            start = max(0, end - page_size)
+        else:
+            start = (page - 1) * page_size
+            end = start + page_size
+
+        rows = _merged_slice(views, sort_by, start, min(end, total))
+        if descending:
+            rows = rows[::-1]
+        more = start > 0 if descending else end < total
+        return {
+            "rows": rows,
+            "total": total,
+            "counts": counts,
+            "next": self.sort_key(sort_by, int(rows[-1])) if more and len(rows) else None,
+        }
+
+    def sort_key(self, sort_by: str, row: int) -> tuple:
+        """Clave de keyset de una fila (posición en el dataset completo)."""
+        index, offset = (self.delta, self.offset) if row >= self.offset else (self.base, 0)
+        return (index.sort_key(sort_by, row - offset)[0], row)
+
+
+def _view_keys(view: tuple, sort_by: str, lo: int, hi: int) -> tuple:
+    """(¿NaN?, valor, fila) de las filas lo:hi de la vista de un segmento."""
+    index, offset, positions, ranks, _ = view
+    rows = positions[lo:hi].astype(np.int64) + offset
+    if sort_by is None:
+        values = rows.astype(np.float64)
+    else:
+        values = index.sort_values[sort_by][ranks[lo:hi]]
+    missing = np.isnan(values)
+    return missing, np.where(missing, 0.0, values), rows
+
+
+def _merged_slice(views: list, sort_by: str, start: int, end: int) -> np.ndarray:
+    """Posiciones start:end del orden combinado de las vistas de dos segmentos."""
+    count = max(0, end - start)
+    first, second = views
+    n_first, n_second = len(first[2]), len(second[2])
+
+    def key(view, i):
+        missing, value, row = _view_keys(view, sort_by, i, i + 1)
+        return (bool(missing[0]), float(value[0]), int(row[0]))
+
+    # Cuántas de las `start` primeras filas combinadas vienen del primer
+    # segmento: búsqueda binaria (k-ésimo de dos arreglos ordenados)
+    lo, hi = max(0, start - n_second), min(start, n_first)
+    while lo < hi:
+        i = (lo + hi) // 2
+        if key(first, i) < key(second, start - i - 1):
+            lo = i + 1
+        else:
+            hi = i
+    parts = [_view_keys(first, sort_by, lo, lo + count), _view_keys(second, sort_by, start - lo, start - lo + count)]
+    missing, values, rows = (np.concatenate(column) for column in zip(*parts))
+    order = np.lexsort((rows, values, missing))[:count]
+    return rows[order].astype(np.intp)
+
+
+def encode_cursor(params: dict, key: tuple) -> str:
+    """Cursor opaco: los parámetros del listado + la clave (valor, fila)."""
+    raw = json.dumps({**params, "key": list(key)}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, params: dict) -> tuple:
+    """
+    Clave (valor, fila) del cursor. ValueError si está mal formado o fue
+    emitido para otro filtro u orden.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value, row = payload.pop("key")
+        key = (None if value is None else float(value), int(row))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise ValueError("Cursor inválido") from None
+    if payload != params or key[1] < 0:
+        raise ValueError("El cursor no corresponde a este filtro u orden")
+    return key
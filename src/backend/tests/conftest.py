@@ -0,0 +1,16 @@
+"""
+conftest.py — Configuración común de las pruebas del backend.
+
+Los módulos del backend se importan por nombre (como en main.py), así que
+la carpeta src/backend se agrega a sys.path.
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PROJECT_DIR = BACKEND_DIR.parent.parent
+DATA_PATH = PROJECT_DIR / "data" / "student_depression.csv"
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
@@ -0,0 +1,81 @@
+"""
+test_analytics_aggregates.py — AnalyticsAggregates.add por bloques da lo
+mismo que calcular los agregados de una vez sobre el dataset completo.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import AnalyticsAggregates
+from conftest import BACKEND_DIR, DATA_PATH
+from dataset_cache import read_csv_clean
+from model_service import ModelEntry, _load_model
+from rescoring import score_frame
+
+MODEL_PATH = BACKEND_DIR / "models" / "logistic_b.joblib"
+
+
+@pytest.fixture(scope="module")
+def scored():
+    entry = ModelEntry("logistic_b", MODEL_PATH, _load_model(MODEL_PATH))
+    return score_frame(read_csv_clean(DATA_PATH), entry).reset_index(drop=True)
+
+
+def build_incrementally(df: pd.DataFrame, head: int, chunk: int) -> AnalyticsAggregates:
+    aggregates = AnalyticsAggregates.from_frame(df.iloc[:head])
+    for start in range(head, len(df), chunk):
+        aggregates = aggregates.add(df.iloc[start:start + chunk], offset=start)
+    return aggregates
+
+
+def assert_same(incremental: AnalyticsAggregates, full: AnalyticsAggregates):
+    assert incremental.total == full.total
+    assert incremental.probability_sum == pytest.approx(full.probability_sum, rel=1e-12)
+    np.testing.assert_array_equal(incremental.risk_counts, full.risk_counts)
+    assert incremental.by_degree.keys() == full.by_degree.keys()
+    for degree, counts in full.by_degree.items():
+        np.testing.assert_array_equal(incremental.by_degree[degree], counts, err_msg=degree)
+    for name in ("by_pressure", "by_sleep"):
+        got, expected = getattr(incremental, name), getattr(full, name)
+        assert got.keys() == expected.keys()
+        for key, acc in expected.items():
+            assert got[key] == pytest.approx(acc, rel=1e-12), (name, key)
+    assert incremental.factor_counts == full.factor_counts
+    assert incremental.top == full.top
+
+
+@pytest.mark.parametrize("head, chunk", [(20000, 1000), (1, 4999), (27000, 7)])
+def test_add_matches_full_rebuild(scored, head, chunk):
+    assert_same(build_incrementally(scored, head, chunk), AnalyticsAggregates.from_frame(scored))
+
+
+def test_payload_matches_full_rebuild(scored):
+    incremental = build_incrementally(scored, 15000, 2500)
+    full = AnalyticsAggregates.from_frame(scored)
+    assert incremental.alert_positions() == full.alert_positions()
+    alerts = scored.iloc[full.alert_positions()]
+    assert incremental.payload(alerts) == full.payload(alerts)
+
+
+def test_top_alerts_ties_keep_earlier_rows(scored):
+    """A igualdad de probabilidad, la fila anterior va primero, como en una sola pasada."""
+    full = AnalyticsAggregates.from_frame(scored)
+    repeated = scored.iloc[full.alert_positions()]
+    grown = full.add(repeated, offset=len(scored))
+    rebuilt = AnalyticsAggregates.from_frame(pd.concat([scored, repeated], ignore_index=True))
+    assert grown.top == rebuilt.top
+    positions = grown.alert_positions()
+    for copy, original in zip(range(len(scored), len(scored) + len(repeated)), full.alert_positions()):
+        if copy in positions:
+            assert positions.index(original) < positions.index(copy)
+
+
+def test_add_does_not_modify_original(scored):
+    head = AnalyticsAggregates.from_frame(scored.iloc[:1000])
+    before = (head.total, head.risk_counts.copy(), dict(head.factor_counts), list(head.top))
+    head.add(scored.iloc[1000:2000], offset=1000)
+    assert head.total == before[0]
+    np.testing.assert_array_equal(head.risk_counts, before[1])
+    assert head.factor_counts == before[2]
+    assert head.top == before[3]
@@ -0,0 +1,78 @@
+"""
+test_analytics_query.py — QueryEngine.append (filas ingeridas) da los mismos
+grupos que un motor armado sobre el dataset completo.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_query import DIMENSIONS, METRICS, QueryEngine
+from conftest import BACKEND_DIR, DATA_PATH
+from dataset_cache import read_csv_clean
+from model_service import ModelEntry, _load_model
+from rescoring import score_frame
+
+MODEL_PATH = BACKEND_DIR / "models" / "logistic_b.joblib"
+BASE_ROWS = 20000
+
+
+@pytest.fixture(scope="module")
+def scored():
+    entry = ModelEntry("logistic_b", MODEL_PATH, _load_model(MODEL_PATH))
+    df = score_frame(read_csv_clean(DATA_PATH), entry).reset_index(drop=True)
+    # Filas ingeridas con valores que la base no tiene (y uno faltante)
+    df.loc[BASE_ROWS + 3, "City"] = "Atlantis"
+    df.loc[BASE_ROWS + 700, "Academic Pressure"] = 9.0
+    df.loc[BASE_ROWS + 5, "Degree"] = np.nan
+    return df
+
+
+@pytest.fixture(scope="module")
+def engines(scored):
+    # La base llega del cache binario con las categóricas codificadas
+    base = scored.iloc[:BASE_ROWS].copy()
+    for dimension, (column, kind, _) in DIMENSIONS.items():
+        if kind == "category":
+            base[column] = base[column].astype("category")
+    engine = QueryEngine(base)
+    engine.codes("degree")  # una dimensión ya calculada antes de ingerir
+    for start in range(BASE_ROWS, len(scored), 1500):
+        engine = engine.append(scored.iloc[start:start + 1500])
+    return engine, QueryEngine(scored)
+
+
+def by_group(result: dict) -> dict:
+    return {tuple(row[d] for d in result["dimensions"]): row for row in result["groups"]}
+
+
+@pytest.mark.parametrize("dimensions", [
+    (), ("degree",), ("city",), ("academic_pressure", "risk_level"), ("degree", "sleep_duration"),
+    ("age", "cgpa", "gender"),
+])
+def test_append_matches_full_engine(engines, dimensions):
+    appended, full = engines
+    got, expected = appended.run(dimensions, METRICS), full.run(dimensions, METRICS)
+    assert got["total"] == expected["total"]
+    assert by_group(got) == by_group(expected)
+
+
+def test_codes_keep_base_labels_first(engines, scored):
+    appended, _ = engines
+    codes, labels = appended.codes("city")
+    base_labels = appended.base.codes("city")[1]
+    assert labels[:len(base_labels)] == base_labels
+    assert labels.index("Atlantis") >= len(base_labels)
+    assert labels[codes[BASE_ROWS + 3]] == "Atlantis"
+    np.testing.assert_array_equal(codes[:BASE_ROWS], appended.base.codes("city")[0])
+    assert appended.codes("degree")[0][BASE_ROWS + 5] == -1
+    assert appended.size == len(scored)
+
+
+def test_append_does_not_modify_original(scored):
+    engine = QueryEngine(scored.iloc[:100])
+    before = engine.run(("degree",), METRICS)
+    grown = engine.append(scored.iloc[100:200])
+    assert engine.run(("degree",), METRICS) == before
+    assert engine.size == 100 and grown.size == 200
+    assert grown.base is engine and grown.append(scored.iloc[200:300]).base is engine
@@ -0,0 +1,91 @@
+"""
+test_cursor_pagination.py — Cursores de /api/students: codificación y
+recorrido por keyset (asc y desc, con empates) contra el orden de pandas.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from student_index import SORT_FIELDS, SegmentedIndex, StudentIndex, decode_cursor, encode_cursor
+from test_student_index import scored_frame
+
+PARAMS = {"search": None, "risk_level": "high", "sort_by": "probability", "order": "desc"}
+
+
+def test_cursor_round_trip():
+    for key in [(42.5, 7), (None, 0), (0.0, 123456)]:
+        assert decode_cursor(encode_cursor(PARAMS, key), PARAMS) == key
+
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!", encode_cursor(PARAMS, (1.0, 2))[:-3]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        decode_cursor(cursor, PARAMS)
+
+
+def test_cursor_for_other_listing():
+    cursor = encode_cursor(PARAMS, (1.0, 2))
+    with pytest.raises(ValueError, match="no corresponde"):
+        decode_cursor(cursor, {**PARAMS, "order": "asc"})
+    with pytest.raises(ValueError, match="no corresponde"):
+        decode_cursor(encode_cursor(PARAMS, (1.0, -1)), PARAMS)
+
+
+@pytest.fixture(scope="module")
+def df():
+    df = scored_frame(700, seed=3)
+    df.loc[::37, "Age"] = np.nan
+    return df
+
+
+def expected_rows(df: pd.DataFrame, sort_by: str, descending: bool, search: str = None) -> list:
+    """Orden de referencia: (valor, fila) ascendente, NaN al final; desc es el inverso."""
+    mask = np.ones(len(df), dtype=bool)
+    if search:
+        mask = df["id"].astype(str).str.contains(search, regex=False).to_numpy()
+    rows = np.flatnonzero(mask)
+    if sort_by is not None:
+        rows = rows[np.lexsort((rows, df[SORT_FIELDS[sort_by]].to_numpy(dtype=float)[rows]))]
+    return (rows[::-1] if descending else rows).tolist()
+
+
+def walk(index, page_size: int, **kwargs) -> list:
+    rows, after = [], None
+    while True:
+        result = index.page(page_size=page_size, after=after, **kwargs)
+        rows += result["rows"].tolist()
+        if result["next"] is None:
+            return rows
+        # Igual que la API: la clave viaja dentro del cursor
+        params = {"sort_by": kwargs.get("sort_by")}
+        after = decode_cursor(encode_cursor(params, result["next"]), params)
+
+
+def indexes(df):
+    yield StudentIndex(df)
+    yield SegmentedIndex(StudentIndex(df.iloc[:500])).append(df.iloc[500:].reset_index(drop=True))
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort_by", [None, "probability", "age"])
+@pytest.mark.parametrize("search", [None, "5"])
+def test_cursor_walk_matches_sort(df, sort_by, descending, search):
+    expected = expected_rows(df, sort_by, descending, search)
+    for index in indexes(df):
+        assert walk(index, 23, search=search, sort_by=sort_by, descending=descending) == expected
+        pages = []
+        for page in range(1, len(expected) // 23 + 2):
+            pages += index.page(search=search, sort_by=sort_by, descending=descending,
+                                page_size=23, page=page)["rows"].tolist()
+        assert pages == expected
+
+
+def test_cursor_survives_appended_rows(df):
+    """Las filas que entran después del cursor aparecen en su lugar del orden."""
+    index = StudentIndex(df.iloc[:400])
+    first = index.page(sort_by="probability", page_size=100)
+    grown = SegmentedIndex(index).append(df.iloc[400:].reset_index(drop=True))
+    rest = grown.page(sort_by="probability", page_size=len(df), after=first["next"])["rows"].tolist()
+    expected = expected_rows(df, "probability", False)
+    assert rest == expected[expected.index(first["rows"][-1]) + 1:]
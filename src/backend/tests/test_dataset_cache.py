@@ -0,0 +1,83 @@
+"""
+test_dataset_cache.py — Cache columnar: ida y vuelta y publicación atómica.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from dataset_cache import read_frame, write_frame
+
+SOURCE = {"mtime_ns": 1, "size": 2}
+
+
+def _frame(rows: int = 1000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "CGPA": rng.uniform(5, 10, rows),
+        "City": rng.choice(["Pune", "Delhi", "Agra"], rows),
+    })
+
+
+def _backed_by_memmap(values: np.ndarray) -> bool:
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = values.base
+    return False
+
+
+def test_round_trip(tmp_path):
+    df = _frame()
+    write_frame(df, tmp_path / "x.cache", SOURCE, {"order": np.arange(len(df))[::-1]})
+    read, arrays = read_frame(tmp_path / "x.cache", SOURCE)
+    pdt.assert_frame_equal(read.assign(City=read["City"].astype(object)), df)
+    np.testing.assert_array_equal(arrays["order"], np.arange(len(df))[::-1])
+    assert read_frame(tmp_path / "x.cache", {"mtime_ns": 1, "size": 3}) is None
+
+
+def test_categorical_codes_are_memory_mapped(tmp_path):
+    df = _frame().assign(Many=[f"c{i % 300}" for i in range(1000)])
+    write_frame(df, tmp_path / "x.cache", SOURCE)
+    read, _ = read_frame(tmp_path / "x.cache", SOURCE)
+    for col, dtype in (("City", np.int8), ("Many", np.int16)):
+        codes = read[col].array.codes
+        assert codes.dtype == dtype
+        assert _backed_by_memmap(codes)
+
+
+def test_rewrite_keeps_only_current_version(tmp_path):
+    cache_dir = tmp_path / "x.cache"
+    for _ in range(3):
+        write_frame(_frame(), cache_dir, SOURCE)
+    assert sorted(p.name.split("-")[0] for p in cache_dir.iterdir()) == ["manifest.json", "v"]
+    assert read_frame(cache_dir, SOURCE) is not None
+
+
+def test_readers_never_see_missing_cache(tmp_path):
+    cache_dir = tmp_path / "x.cache"
+    df = _frame(50_000)
+    write_frame(df, cache_dir, SOURCE)
+    stop = threading.Event()
+    failures = []
+
+    def reader():
+        while not stop.is_set():
+            cached = read_frame(cache_dir, SOURCE)
+            if cached is None or len(cached[0]) != len(df):
+                failures.append(cached)
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for t in threads:
+        t.start()
+    try:
+        for _ in range(20):
+            write_frame(df, cache_dir, SOURCE)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    assert not failures
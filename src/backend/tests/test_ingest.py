@@ -0,0 +1,158 @@
+"""
+test_ingest.py — POST /api/students/ingest: rechazo de peticiones
+inválidas o con ids duplicados, asignación de ids y el índice segmentado
+(base + delta) frente a un índice del dataset completo.
+
+El servidor trabaja sobre una copia reducida del CSV en un directorio
+temporal, con su propio log de ingesta y sin ADMIN_TOKEN.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import shared_dataset
+from conftest import DATA_PATH
+from ingest_log import IngestLog
+from response_cache import ResponseCache
+from student_index import RISK_LEVELS, SORT_FIELDS, SegmentedIndex, StudentIndex
+from test_student_index import scored_frame
+
+DATASET_ROWS = 2000
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("ingest")
+    data_path = tmp / "student_depression.csv"
+    with open(DATA_PATH, encoding="utf-8") as src:
+        data_path.write_text("".join(line for _, line in zip(range(DATASET_ROWS + 1), src)), encoding="utf-8")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(main, "DATA_PATH", data_path)
+        mp.setattr(main, "ADMIN_TOKEN", None)
+        mp.setattr(main, "_ingest_log", IngestLog(tmp / "student_depression.ingest.ndjson"))
+        mp.setattr(main, "_scored", {})
+        mp.setattr(main, "_df_cache", None)
+        mp.setattr(main, "_df_cache_key", None)
+        mp.setattr(main, "_response_cache", ResponseCache(main.RESPONSE_CACHE_MAX_ENTRIES, main.RESPONSE_CACHE_MAX_BYTES))
+        mp.setattr(shared_dataset, "SHARED_DATASET_DIR", tmp / "shared")
+        # Sin `with`: el warmup del lifespan no corre
+        yield TestClient(main.app)
+
+
+@pytest.fixture(scope="module")
+def records(client):
+    dataset = main._load_dataset()
+    return dataset.iloc[:5][main.MODEL_B_COLUMNS].astype(object).to_dict("records")
+
+
+def ingest(client, records):
+    return client.post("/api/students/ingest", json=records)
+
+
+def existing_id() -> int:
+    return int(main._load_dataset()["id"].iloc[10])
+
+
+def test_empty_request(client):
+    assert ingest(client, []).status_code == 400
+
+
+def test_too_many_records(client, records, monkeypatch):
+    monkeypatch.setattr(main, "INGEST_MAX_RECORDS", 2)
+    assert ingest(client, records[:3]).status_code == 413
+
+
+def test_invalid_record(client, records):
+    assert ingest(client, [{**records[0], "Age": "veinte"}]).status_code == 422
+    missing = {k: v for k, v in records[0].items() if k != "CGPA"}
+    assert ingest(client, [missing]).status_code == 422
+
+
+@pytest.mark.parametrize("ids", [[900001, 900001], ["existing"], [None, "existing"]])
+def test_duplicate_ids_rejected(client, records, ids):
+    ids = [existing_id() if i == "existing" else i for i in ids]
+    size = main._ingest_log.size()
+    response = ingest(client, [{**records[0], "id": i} for i in ids])
+    assert response.status_code == 409
+    assert str([i for i in ids if i is not None][0]) in response.json()["detail"]
+    assert main._ingest_log.size() == size
+
+
+def test_ingest_assigns_sequential_ids(client, records):
+    before = main._get_scored()["index"]
+    total, max_id = before.size, int(before.max_id())
+    response = ingest(client, records[:3])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ingested"] == 3
+    assert body["total_students"] == total + 3
+    assert [s["id"] for s in body["students"]] == [str(max_id + i) for i in (1, 2, 3)]
+    assert all(s["risk_level"] in RISK_LEVELS for s in body["students"])
+    # Un id ya ingerido cuenta como existente
+    assert ingest(client, [{**records[0], "id": max_id + 2}]).status_code == 409
+
+
+def test_explicit_id_moves_next_id(client, records):
+    max_id = int(main._get_scored()["index"].max_id())
+    response = ingest(client, [{**records[0], "id": max_id + 100}, records[1]])
+    assert response.status_code == 200
+    assert [s["id"] for s in response.json()["students"]] == [str(max_id + 100), str(max_id + 101)]
+
+
+def test_duplicates_detected_after_compaction(client, records, monkeypatch):
+    monkeypatch.setattr(main, "INGEST_COMPACT_ROWS", 4)
+    response = ingest(client, records[:4])
+    assert response.status_code == 200
+    scored = main._get_scored()
+    assert scored["delta"] is None
+    assert scored["index"].size == len(scored["df"])
+    for student in response.json()["students"][::3]:
+        assert ingest(client, [{**records[0], "id": int(student["id"])}]).status_code == 409
+    assert ingest(client, [{**records[0], "id": existing_id()}]).status_code == 409
+
+
+# ──────────────────────────────────────────────
+# Índice segmentado
+# ──────────────────────────────────────────────
+@pytest.fixture(scope="module")
+def segments():
+    base = scored_frame(500, seed=5)
+    deltas = [scored_frame(n, first_id=50_000 + 1000 * i, seed=6 + i) for i, n in enumerate([1, 40, 75])]
+    base.loc[::41, "CGPA"] = np.nan
+    deltas[2].loc[::9, "CGPA"] = np.nan
+    index = SegmentedIndex(StudentIndex(base))
+    for delta in deltas:
+        index = index.append(delta)
+    return index, StudentIndex(pd.concat([base, *deltas], ignore_index=True))
+
+
+def test_segmented_lookups_match_full_index(segments):
+    index, full = segments
+    assert index.size == full.size
+    assert index.max_id() == full.max_id()
+    ids = [50_000, 51_003, 3, 8, 999_999]
+    np.testing.assert_array_equal(index.contains_ids(ids), full.contains_ids(ids))
+    for text in ["5", "510", "77"]:
+        np.testing.assert_array_equal(index.search(text), full.search(text))
+    for field in SORT_FIELDS:
+        np.testing.assert_array_equal(index.sort_order(field), full.sort_order[field], err_msg=field)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort_by", [None, *sorted(SORT_FIELDS)])
+def test_segmented_pages_match_full_index(segments, sort_by, descending):
+    index, full = segments
+    for kwargs in [{}, {"search": "1"}, {"risk_level": "medium"}]:
+        for page in (1, 4, 20):
+            got = index.page(sort_by=sort_by, descending=descending, page_size=30, page=page, **kwargs)
+            expected = full.page(sort_by=sort_by, descending=descending, page_size=30, page=page, **kwargs)
+            np.testing.assert_array_equal(got["rows"], expected["rows"])
+            assert (got["total"], got["counts"]) == (expected["total"], expected["counts"])
+            assert str(got["next"]) == str(expected["next"])
+            if expected["next"] is not None:
+                after = index.page(sort_by=sort_by, descending=descending, page_size=30, after=got["next"], **kwargs)
+                following = full.page(sort_by=sort_by, descending=descending, page_size=30, after=expected["next"], **kwargs)
+                np.testing.assert_array_equal(after["rows"], following["rows"])
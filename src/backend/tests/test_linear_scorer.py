@@ -0,0 +1,64 @@
+"""
+test_linear_scorer.py — El evaluador lineal compilado reproduce el pipeline.
+
+Sobre todas las filas de student_depression.csv, LinearScorer (compilado
+del .joblib) y LinearModel (cargado del .linear.json) deben dar las mismas
+probabilidades que pipeline.predict_proba y las mismas clases que
+pipeline.predict.
+"""
+
+import joblib
+import numpy as np
+import pytest
+
+from conftest import BACKEND_DIR, DATA_PATH
+from dataset_cache import read_csv_clean
+from linear_artifact import SUFFIX as LINEAR_SUFFIX
+from model_service import MODEL_B_COLUMNS, LinearModel, LinearScorer
+
+MODEL_PATH = BACKEND_DIR / "models" / "logistic_b.joblib"
+TOLERANCE = 1e-9
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return read_csv_clean(DATA_PATH)[MODEL_B_COLUMNS]
+
+
+@pytest.fixture(scope="module")
+def expected(pipeline, dataset):
+    return pipeline.predict_proba(dataset)[:, 1], pipeline.predict(dataset)
+
+
+@pytest.fixture(scope="module")
+def scorer(pipeline):
+    scorer = LinearScorer.from_pipeline(pipeline)
+    assert scorer is not None
+    return scorer
+
+
+def test_predict_many_matches_pipeline(scorer, dataset, expected):
+    probabilities, predictions = scorer.predict_many(dataset.to_dict("records"))
+    np.testing.assert_allclose(probabilities, expected[0], rtol=0, atol=TOLERANCE)
+    np.testing.assert_array_equal(predictions, expected[1])
+
+
+def test_predict_matches_pipeline(scorer, dataset, expected):
+    results = [scorer.predict(row) for row in dataset.to_dict("records")]
+    probabilities = np.array([p for p, _ in results])
+    predictions = np.array([c for _, c in results])
+    np.testing.assert_allclose(probabilities, expected[0], rtol=0, atol=TOLERANCE)
+    np.testing.assert_array_equal(predictions, expected[1])
+
+
+def test_linear_model_matches_pipeline(dataset, expected):
+    model = LinearModel.from_artifact(MODEL_PATH.with_name(MODEL_PATH.stem + LINEAR_SUFFIX))
+    probabilities = model.predict_proba(dataset)
+    np.testing.assert_allclose(probabilities[:, 1], expected[0], rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0, rtol=0, atol=TOLERANCE)
+    np.testing.assert_array_equal(model.predict(dataset), expected[1])
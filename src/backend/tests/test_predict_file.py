@@ -0,0 +1,104 @@
+"""
+test_predict_file.py — POST /api/predict/file con filas o bloques inválidos:
+la respuesta sigue siendo un CSV completo y el problema va en "error".
+"""
+
+import csv
+import io
+
+import anyio
+import httpx
+import pytest
+
+import main
+import streaming
+from conftest import DATA_PATH
+
+HEADERS = {"content-type": "text/csv"}
+
+
+@pytest.fixture(scope="module")
+def lines():
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return [next(f).rstrip("\n") for _ in range(21)]
+
+
+def read_rows(text: str) -> list:
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def post_chunks(chunks: list) -> httpx.Response:
+    """Envía el cuerpo en varios mensajes (TestClient lo entrega de una vez)."""
+    async def run():
+        async def body():
+            for chunk in chunks:
+                yield chunk
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/predict/file", content=body(), headers=HEADERS)
+
+    return anyio.run(run)
+
+
+def test_row_with_extra_fields(lines):
+    body = lines[:6]
+    body[3] += ",x,y"
+    response = post_chunks(["\n".join(body).encode() + b"\n"])
+    assert response.status_code == 200
+    rows = read_rows(response.text)
+    assert len(rows) == 5
+    assert rows[2]["error"] == "Fila con 20 campos; se esperaban 18"
+    assert rows[2]["probability"] == ""
+    assert [r["id"] for i, r in enumerate(rows) if i != 2] == [line.split(",")[0] for line in body[1:] if "x,y" not in line]
+    assert all(r["error"] == "" and r["probability"] for i, r in enumerate(rows) if i != 2)
+
+
+def test_row_with_invalid_utf8(lines, monkeypatch):
+    monkeypatch.setattr(main, "FILE_BLOCK_BYTES", 200)
+    response = post_chunks([
+        "\n".join(lines[:11]).encode() + b"\n",
+        b"\xff\xfe,no utf-8\n",
+        "\n".join(lines[11:]).encode() + b"\n",
+    ])
+    assert response.status_code == 200
+    rows = read_rows(response.text)
+    assert [r["error"] for r in rows if r["error"]] == ["Texto con bytes no UTF-8"]
+    assert rows[10]["error"] and rows[10]["probability"] == ""
+    assert [r["id"] for r in rows if not r["error"]] == [line.split(",")[0] for line in lines[1:]]
+
+
+def test_extra_field_in_first_row(lines):
+    """pandas tomaría el campo de más como índice y correría las columnas."""
+    body = [lines[0], lines[1] + ",x", *lines[2:4]]
+    rows = read_rows(post_chunks(["\n".join(body).encode() + b"\n"]).text)
+    assert [r["error"] for r in rows] == ["Fila con 19 campos; se esperaban 18", "", ""]
+    assert [r["id"] for r in rows[1:]] == [line.split(",")[0] for line in lines[2:4]]
+
+
+def test_unclosed_quote_at_end(lines):
+    body = "\n".join(lines[:4]).encode() + b'\n"sin cerrar,' + b"x," * 20 + b"\n"
+    rows = read_rows(post_chunks([body]).text)
+    assert [r["id"] for r in rows[:3]] == [line.split(",")[0] for line in lines[1:4]]
+    assert rows[-1]["error"] == "Comillas sin cerrar al final del archivo"
+
+
+def test_unreadable_block_is_reported_inline(lines, monkeypatch):
+    monkeypatch.setattr(main, "FILE_BLOCK_BYTES", 200)
+    # Un campo mayor al límite del módulo csv en un bloque que se lee fila por fila
+    unreadable = b"1," + b"x" * 200_000 + b"," * 20 + b"\n"
+    response = post_chunks(["\n".join(lines[:11]).encode() + b"\n", unreadable, "\n".join(lines[11:]).encode() + b"\n"])
+    assert response.status_code == 200
+    rows = read_rows(response.text)
+    assert [r["error"][:19] for r in rows if r["error"]] == ["Bloque CSV inválido"]
+    assert [r["id"] for r in rows if not r["error"]] == [line.split(",")[0] for line in lines[1:]]
+
+
+def test_line_too_long_after_streaming_started(lines, monkeypatch):
+    monkeypatch.setattr(main, "FILE_BLOCK_BYTES", 200)
+    monkeypatch.setattr(streaming, "MAX_RECORD_BYTES", 100)
+    response = post_chunks(["\n".join(lines[:11]).encode() + b"\n", *[b"x" * 150] * 4])
+    assert response.status_code == 200
+    rows = read_rows(response.text)
+    assert [r["id"] for r in rows[:-1]] == [line.split(",")[0] for line in lines[1:11]]
+    assert rows[-1]["error"] == "Línea excede el tamaño máximo (100 bytes)"
@@ -0,0 +1,27 @@
+"""
+test_risk_levels.py — Niveles de riesgo derivados de RISK_THRESHOLDS.
+"""
+
+import numpy as np
+
+import model_service
+from model_service import RISK_THRESHOLDS, _classify_risk, classify_risk_array
+
+
+def test_scalar_matches_array():
+    probabilities = np.round(np.linspace(0, 100, 1001), 1)
+    levels, labels = classify_risk_array(probabilities)
+    assert [_classify_risk(p) for p in probabilities.tolist()] == list(zip(levels, labels))
+
+
+def test_boundaries():
+    medium, high = RISK_THRESHOLDS
+    assert _classify_risk(medium - 0.1)[0] == "low"
+    assert _classify_risk(medium)[0] == "medium"
+    assert _classify_risk(high)[0] == "high"
+
+
+def test_follows_thresholds(monkeypatch):
+    monkeypatch.setattr(model_service, "RISK_THRESHOLDS", (10, 20))
+    assert _classify_risk(15) == ("medium", "RIESGO MODERADO")
+    assert _classify_risk(25) == ("high", "RIESGO ALTO")
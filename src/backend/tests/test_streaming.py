@@ -0,0 +1,70 @@
+"""
+test_streaming.py — DuplexStreamingResponse: cuerpo en streaming y desconexiones.
+"""
+
+import time
+
+import anyio
+from starlette.requests import Request
+
+from streaming import DuplexStreamingResponse, RequestBody, iter_json_records
+
+SCOPE = {"type": "http", "method": "POST", "path": "/", "headers": [], "query_string": b""}
+
+
+def _run(messages: list, make_content):
+    """Ejecuta la respuesta con `receive` que entrega `messages` y luego se bloquea."""
+    sent = []
+
+    async def main():
+        queue = list(messages)
+
+        async def receive():
+            if queue:
+                return queue.pop(0)
+            await anyio.sleep_forever()
+
+        async def send(message):
+            sent.append(message)
+
+        body = RequestBody(Request(SCOPE, receive))
+        response = DuplexStreamingResponse(make_content(body), body=body, media_type="text/plain")
+        with anyio.fail_after(5):
+            await response(SCOPE, receive, send)
+
+    anyio.run(main)
+    return sent
+
+
+def test_reads_body_while_streaming():
+    messages = [
+        {"type": "http.request", "body": b'[{"a": 1},', "more_body": True},
+        {"type": "http.request", "body": b' {"a": 2}]', "more_body": False},
+    ]
+
+    async def content(body):
+        async for index, obj in iter_json_records(body):
+            yield f"{index}:{obj['a']}\n".encode()
+
+    sent = _run(messages, content)
+    chunks = [m["body"] for m in sent if m["type"] == "http.response.body"]
+    assert b"".join(chunks) == b"0:1\n1:2\n"
+
+
+def test_disconnect_after_body_cancels_response():
+    messages = [
+        {"type": "http.request", "body": b"x", "more_body": False},
+        {"type": "http.disconnect"},
+    ]
+
+    async def content(body):
+        async for _ in body:
+            pass
+        while True:
+            yield b"."
+            await anyio.sleep(0.05)
+
+    start = time.perf_counter()
+    sent = _run(messages, content)
+    assert time.perf_counter() - start < 2
+    assert not any(m["type"] == "http.response.body" and not m.get("more_body") for m in sent)
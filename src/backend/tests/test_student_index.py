@@ -0,0 +1,87 @@
+"""
+test_student_index.py — Búsqueda por id (arreglo de sufijos), filtros y
+orden por campo de StudentIndex, contra el cálculo directo con pandas.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from student_index import RISK_LEVELS, SORT_FIELDS, StudentIndex
+
+
+def scored_frame(rows: int, first_id: int = 1, seed: int = 0) -> pd.DataFrame:
+    """DataFrame con las columnas que usa el índice; valores con muchos empates."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": rng.permutation(np.arange(first_id, first_id + rows * 7, 7))[:rows],
+        "probability": rng.integers(0, 20, rows) * 5.0,
+        "CGPA": np.round(rng.uniform(5, 10, rows), 0),
+        "Age": rng.integers(18, 24, rows).astype(float),
+        "risk_level": rng.choice(RISK_LEVELS, rows),
+    })
+
+
+@pytest.fixture(scope="module")
+def df():
+    return scored_frame(600)
+
+
+@pytest.fixture(scope="module")
+def index(df):
+    return StudentIndex(df)
+
+
+@pytest.mark.parametrize("text", ["1", "12", "0", "77", "4095", "999999", ""])
+def test_search_matches_substring(df, index, text):
+    expected = np.flatnonzero(df["id"].astype(str).str.contains(text, regex=False).to_numpy())
+    np.testing.assert_array_equal(index.search(text), expected)
+
+
+@pytest.mark.parametrize("level", [None, *RISK_LEVELS])
+def test_filter_and_counts(df, index, level):
+    positions = index.filter(search="3", risk_level=level)
+    mask = df["id"].astype(str).str.contains("3", regex=False)
+    if level:
+        mask &= df["risk_level"] == level
+    np.testing.assert_array_equal(positions, np.flatnonzero(mask.to_numpy()))
+    expected = df.loc[mask, "risk_level"].value_counts()
+    assert index.level_counts(positions) == {lvl: int(expected.get(lvl, 0)) for lvl in RISK_LEVELS}
+
+
+def test_unknown_risk_level_is_empty(index):
+    assert len(index.filter(risk_level="critical")) == 0
+
+
+@pytest.mark.parametrize("field", sorted(SORT_FIELDS))
+def test_sort_order_and_rank(df, index, field):
+    values = df[SORT_FIELDS[field]].to_numpy(dtype=float)
+    # Empates por posición de fila (argsort estable)
+    expected = np.lexsort((np.arange(len(df)), values))
+    np.testing.assert_array_equal(index.sort_order[field], expected)
+    np.testing.assert_array_equal(index.sort_values[field], values[expected])
+    np.testing.assert_array_equal(index.sort_rank[field][expected], np.arange(len(df)))
+
+
+@pytest.mark.parametrize("field", [None, *sorted(SORT_FIELDS)])
+def test_view_is_filtered_sort(df, index, field):
+    positions, _, _ = index.view(risk_level="high", sort_by=field)
+    high = np.flatnonzero((df["risk_level"] == "high").to_numpy())
+    if field is not None:
+        high = high[np.argsort(df[SORT_FIELDS[field]].to_numpy()[high], kind="stable")]
+    np.testing.assert_array_equal(positions, high)
+
+
+def test_append_equals_rebuild(df, index):
+    added = scored_frame(90, first_id=10_000, seed=1)
+    appended = index.append(added)
+    rebuilt = StudentIndex(pd.concat([df, added], ignore_index=True))
+    for name, values in rebuilt.to_arrays().items():
+        np.testing.assert_array_equal(appended.to_arrays()[name], values, err_msg=name)
+
+
+def test_from_arrays_round_trip(index):
+    restored = StudentIndex.from_arrays(index.to_arrays())
+    assert restored.counts == index.counts
+    np.testing.assert_array_equal(restored.search("12"), index.search("12"))
+    assert restored.page(sort_by="cgpa", page=3)["rows"].tolist() == index.page(sort_by="cgpa", page=3)["rows"].tolist()
@@ -0,0 +1,45 @@
+"""
+test_thresholds.py — ThresholdAnalysis con filas ingeridas (base + segmento
+nuevo) da los mismos conteos y métricas que el análisis del dataset completo.
+"""
+
+import numpy as np
+import pytest
+
+from test_analytics_query import BASE_ROWS, engines, scored  # noqa: F401 (fixtures)
+from thresholds import ThresholdAnalysis
+
+
+@pytest.fixture(scope="module")
+def analyses(engines):
+    appended, full = engines
+    base = ThresholdAnalysis(appended.base)
+    base.grouped("degree")  # una dimensión ya calculada antes de ingerir
+    return base.append(appended), ThresholdAnalysis(full)
+
+
+def by_group(result: dict) -> dict:
+    return {row[result["group_by"]]: row for row in result["groups"]}
+
+
+@pytest.mark.parametrize("medium, high", [(40, 70), (0, 100), (55.5, 55.5), (12, 90)])
+@pytest.mark.parametrize("group_by", [None, "degree", "city", "academic_pressure"])
+def test_segmented_matches_full(analyses, medium, high, group_by):
+    segmented, full = analyses
+    got, expected = segmented.run(medium, high, group_by, min_count=3), full.run(medium, high, group_by, min_count=3)
+    if group_by is None:
+        assert got == expected
+    else:
+        assert {k: v for k, v in got.items() if k != "groups"} == {k: v for k, v in expected.items() if k != "groups"}
+        assert by_group(got) == by_group(expected)
+
+
+def test_append_reuses_base(analyses, engines):
+    segmented, _ = analyses
+    appended, _ = engines
+    assert segmented.start == BASE_ROWS
+    assert len(segmented.probability) == appended.size - BASE_ROWS
+    # Un segundo append sigue sumando contra la misma base, no contra el segmento
+    again = segmented.append(appended)
+    assert again.base is segmented.base
+    np.testing.assert_array_equal(again.overall.p, segmented.overall.p)
@@ -0,0 +1,174 @@
+"""
+thresholds.py — Análisis "what-if" de los umbrales de riesgo sin re-puntuar.
+
+Los niveles dependen solo de la probabilidad: low < medium ≤ p < high ≤ p
+(RISK_THRESHOLDS en model_service.py). Con las probabilidades ordenadas y
+sumas acumuladas de la etiqueta real (Depression_actual), cualquier par
+de umbrales candidatos se responde con búsquedas binarias:
+    filas con p ≥ t       → n - searchsorted(p, t)
+    positivas con p ≥ t   → pos_acum[n] - pos_acum[searchsorted(p, t)]
+De ahí salen los conteos por nivel y la matriz de confusión (precision,
+recall, F1) tomando "p ≥ umbral" como predicción de depresión.
+
+Por grupo (p. ej. por carrera) las filas se ordenan por (grupo, p): cada
+grupo es un tramo contiguo y se resuelve igual, con una búsqueda binaria
+por grupo. Los arreglos se arman una vez por dataset puntuado; cada
+consulta cuesta O(grupos · log n), sin recorrer el dataset.
+
+Las filas ingeridas forman un segmento aparte (ThresholdAnalysis.append):
+la base conserva sus arreglos, solo se ordenan las filas nuevas y los
+conteos de ambos segmentos se suman.
+"""
+
+import threading
+
+import numpy as np
+
+from analytics_query import QueryEngine
+
+
+class SortedProbabilities:
+    """Probabilidades ordenadas por tramo (grupo) con conteos acumulados de etiquetas."""
+
+    def __init__(self, probability: np.ndarray, positive: np.ndarray, labeled: np.ndarray,
+                 order: np.ndarray, bounds: np.ndarray, labels: list):
+        self.p = probability[order]
+        self.cum_positive = np.concatenate([[0], np.cumsum(positive[order], dtype=np.int64)])
+        self.cum_labeled = np.concatenate([[0], np.cumsum(labeled[order], dtype=np.int64)])
+        self.bounds = bounds  # tramo g = [bounds[g], bounds[g + 1])
+        self.labels = labels
+
+    def at_least(self, threshold: float) -> tuple:
+        """Por tramo: (filas, positivas, etiquetadas) con probabilidad ≥ threshold."""
+        lo, hi = self.bounds[:-1], self.bounds[1:]
+        cut = np.array(
+            [a + np.searchsorted(self.p[a:b], threshold, side="left") for a, b in zip(lo.tolist(), hi.tolist())],
+            dtype=np.int64,
+        )
+        return hi - cut, self.cum_positive[hi] - self.cum_positive[cut], self.cum_labeled[hi] - self.cum_labeled[cut]
+
+    def totals(self) -> tuple:
+        """Por tramo: (filas, positivas, etiquetadas)."""
+        lo, hi = self.bounds[:-1], self.bounds[1:]
+        return hi - lo, self.cum_positive[hi] - self.cum_positive[lo], self.cum_labeled[hi] - self.cum_labeled[lo]
+
+
+class ThresholdAnalysis:
+    """
+    Arreglos de what-if de un dataset puntuado: global y por dimensión.
+    Con `base`, cubre solo las filas de `engine` posteriores a las de la
+    base y las consultas suman ambos segmentos.
+    """
+
+    def __init__(self, engine: QueryEngine, probability_order: np.ndarray = None,
+                 base: "ThresholdAnalysis" = None):
+        self.engine = engine
+        self.base = base
+        self.start = base.engine.size if base is not None else 0
+        self.probability = engine.probability[self.start:]
+        self.labeled = engine.labeled[self.start:]
+        self.positive = (engine.depression[self.start:] > 0) & self.labeled
+        # El índice de /api/students ya tiene el orden por probabilidad
+        if probability_order is None:
+            probability_order = np.argsort(self.probability, kind="stable")
+        self.overall = SortedProbabilities(
+            self.probability, self.positive, self.labeled, probability_order,
+            np.array([0, engine.size - self.start], dtype=np.int64), [None],
+        )
+        self._by_dimension = {}
+        self._lock = threading.Lock()
+
+    def append(self, engine: QueryEngine) -> "ThresholdAnalysis":
+        """Análisis de `engine` (este dataset + filas ingeridas) que reutiliza la base."""
+        return ThresholdAnalysis(engine, base=self.base or self)
+
+    def grouped(self, dimension: str) -> SortedProbabilities:
+        cached = self._by_dimension.get(dimension)
+        if cached is None:
+            with self._lock:
+                cached = self._by_dimension.get(dimension)
+                if cached is None:
+                    codes, labels = self.engine.codes(dimension)
+                    codes = codes[self.start:]
+                    order = np.lexsort((self.probability, codes))
+                    order = order[codes[order] >= 0]
+                    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1)).astype(np.int64)
+                    cached = self._by_dimension[dimension] = SortedProbabilities(
+                        self.probability, self.positive, self.labeled, order, bounds, labels
+                    )
+        return cached
+
+    def _segments(self) -> list:
+        return [self] if self.base is None else [self.base, self]
+
+    def run(self, medium: float, high: float, group_by: str = None, min_count: int = 1) -> dict:
+        """Conteos por nivel y métricas contra la etiqueta real con umbrales (medium, high)."""
+        segments = self._segments()
+        result = {
+            "thresholds": {"medium": medium, "high": high},
+            **_summary([s.overall for s in segments], medium, high, min_count=0)[0],
+        }
+        if group_by is not None:
+            result["group_by"] = group_by
+            result["groups"] = _summary(
+                [s.grouped(group_by) for s in segments], medium, high, min_count, key=group_by
+            )
+        return result
+
+
+def _summed(segments: list, counts) -> list:
+    """
+    counts(segmento) → (arreglos por tramo), sumado sobre los segmentos. Las
+    etiquetas del último incluyen las de los anteriores al principio
+    (QueryEngine.append), así que basta completar con ceros.
+    """
+    size = len(segments[-1].labels)
+    parts = [[np.pad(a, (0, size - len(a))) for a in counts(s)] for s in segments]
+    return [sum(arrays) for arrays in zip(*parts)]
+
+
+def _summary(segments: list, medium: float, high: float, min_count: int, key: str = None) -> list:
+    rows, positives, labeled = _summed(segments, lambda s: s.totals())
+    at_medium = _summed(segments, lambda s: s.at_least(medium))
+    at_high = _summed(segments, lambda s: s.at_least(high))
+    summaries = []
+    for g, label in enumerate(segments[-1].labels):
+        total = int(rows[g])
+        if key is not None and (total == 0 or total < min_count):
+            continue
+        n_high, n_medium_up = int(at_high[0][g]), int(at_medium[0][g])
+        summary = {key: label} if key is not None else {}
+        summary.update({
+            "total": total,
+            "counts": {"low": total - n_medium_up, "medium": n_medium_up - n_high, "high": n_high},
+            "high_pct": round(n_high / total * 100, 1) if total else 0.0,
+            # "p ≥ high" y "p ≥ medium" como predicción de depresión
+            "metrics": {
+                "high": _confusion(at_high[1][g], at_high[2][g], positives[g], labeled[g]),
+                "medium_or_high": _confusion(at_medium[1][g], at_medium[2][g], positives[g], labeled[g]),
+            },
+        })
+        summaries.append(summary)
+    return summaries
+
+
+def _confusion(flagged_positive, flagged_labeled, positives, labeled) -> dict:
+    tp = int(flagged_positive)
+    fp = int(flagged_labeled) - tp
+    fn = int(positives) - tp
+    tn = int(labeled) - tp - fp - fn
+    precision = tp / (tp + fp) if tp + fp else None
+    recall = tp / (tp + fn) if tp + fn else None
+    f1 = 2 * precision * recall / (precision + recall) if precision and recall else None
+    return {
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": round(precision, 4) if precision is not None else None,
+        "recall": round(recall, 4) if recall is not None else None,
+        "f1": round(f1, 4) if f1 is not None else None,
+    }
+
+
+def validate(medium: float, high: float):
+    """ValueError si los umbrales no cumplen 0 ≤ medium ≤ high ≤ 100."""
+    if not all(map(np.isfinite, (medium, high))) or not 0 <= medium <= high <= 100:
+        raise ValueError("Los umbrales deben cumplir 0 ≤ medium ≤ high ≤ 100")
@@ -6,15 +6,20 @@ ya que se considera un criterio diagnóstico.
 
 Uso:
     python train_model.py
+    python train_model.py --search [--jobs 8] [--folds 5] [--scoring f1] [--save-best]
+    python train_model.py --out-of-core [--chunk-rows 50000] [--epochs 5] [--data ruta.csv]
 
 Genera:
     backend/models/logistic_b.joblib
+    backend/models/logistic_b.linear.json   (artefacto compacto que sirve la API)
+    backend/models/leaderboard.csv / leaderboard.json   (modo --search)
+    backend/models/logistic_b_sgd.joblib                (modo --out-of-core)
 """
 
+import argparse
 import os
 import sys
-import pandas as pd
-import numpy as np
+import time
 from pathlib import Path
 
 from sklearn.model_selection import train_test_split
@@ -25,6 +30,12 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, accuracy_score, f1_score
 import joblib
 
+from dataset_cache import load_dataset
+import model_search
+import out_of_core
+from linear_artifact import SUFFIX as LINEAR_SUFFIX
+from model_service import export_linear_artifact
+
 # ──────────────────────────────────────────────
 # Rutas
 # ──────────────────────────────────────────────
@@ -35,25 +46,144 @@ MODEL_DIR = BASE_DIR / "models"
 MODEL_PATH = MODEL_DIR / "logistic_b.joblib"
 
 
-def main():
+def save_model(model, path: Path):
+    """Guarda el pipeline (.joblib) y, si es lineal, su artefacto compacto (.linear.json)."""
+    joblib.dump(model, path)
+    print(f"\nModelo guardado en: {path}")
+    print(f"Tamaño: {path.stat().st_size / 1024:.1f} KB")
+    compact = export_linear_artifact(model, path.with_name(path.stem + LINEAR_SUFFIX), source_path=path)
+    if compact is not None:
+        print(f"Artefacto compacto: {compact} ({compact.stat().st_size / 1024:.1f} KB)")
+
+
+def build_preprocessor(num_cols: list, cat_cols: list) -> ColumnTransformer:
+    return ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), num_cols),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
+        ]
+    )
+
+
+def search(args, X_train, y_train, X_test, y_test, preprocessor):
+    """
+    Modo --search: validación cruzada de caminos logísticos (y xgboost) con
+    el preprocesamiento cacheado por fold; escribe el leaderboard y, con
+    --save-best, reentrena el mejor candidato sobre todo el train.
+    """
+    t0 = time.perf_counter()
+    folds_dir = model_search.prepare_folds(
+        X_train, y_train, preprocessor, model_search.search_cache_dir(DATA_PATH),
+        n_folds=args.folds, seed=42,
+    )
+    groups = model_search.candidate_groups(args.families)
+    rows = model_search.run_search(folds_dir, groups, args.folds, jobs=args.jobs)
+    board = model_search.leaderboard(rows, args.scoring)
+    elapsed = time.perf_counter() - t0
+
+    csv_path, json_path = model_search.write_leaderboard(board, MODEL_DIR, {
+        "scoring": args.scoring,
+        "folds": args.folds,
+        "jobs": args.jobs or os.cpu_count(),
+        "train_rows": int(len(X_train)),
+        "search_seconds": round(elapsed, 2),
+    })
+
+    print("\n" + "=" * 60)
+    print(f"  LEADERBOARD ({args.folds}-fold CV, ordenado por {args.scoring}) — {elapsed:.1f} s")
+    print("=" * 60)
+    for entry in board[:args.top]:
+        print(
+            f"{entry['rank']:>3}. {entry['candidate']:<62} "
+            f"{args.scoring} {entry[args.scoring + '_mean']:.4f} ± {entry[args.scoring + '_std']:.4f}  "
+            f"ajuste {entry['fit_seconds_mean']:.2f} s"
+        )
+    print(f"\nLeaderboard completo en: {csv_path}\n                        {json_path}")
+
+    if not args.save_best:
+        return
+    best = board[0]
+    model = Pipeline(
+        steps=[
+            ("preprocessor", preprocessor),
+            ("classifier", model_search.build_estimator(best["family"], best["params"])),
+        ]
+    )
+    print(f"\nReentrenando el mejor candidato sobre todo el train: {best['candidate']}")
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    print(f"Test — Accuracy: {accuracy_score(y_test, y_pred):.4f} | F1-Score: {f1_score(y_test, y_pred):.4f}")
+    path = MODEL_DIR / f"{args.save_best}.joblib"
+    save_model(model, path)
+    print(f"Actívalo con POST /api/models/{args.save_best}/activate")
+
+
+def train_streaming(args):
+    """
+    Modo --out-of-core: lee el CSV por bloques y entrena con SGD (ver
+    out_of_core.py). Pensado para historiales que no caben en memoria.
+    """
+    data_path = Path(args.data)
+    if not data_path.exists():
+        print(f"\n[ERROR] No se encontró el dataset en: {data_path}")
+        sys.exit(1)
+
+    print(f"\nEntrenando por bloques de {args.chunk_rows} filas ({args.epochs} épocas)...")
+    model, cm = out_of_core.train_out_of_core(
+        data_path, chunk_rows=args.chunk_rows, epochs=args.epochs, C=args.C, spill_dir=args.spill_dir,
+    )
+    accuracy, f1 = out_of_core.accuracy_f1(cm)
+
+    print("\n" + "=" * 40)
+    print("  RESULTADOS - Logistic Regression B (SGD por bloques)")
+    print("=" * 40)
+    print(out_of_core.confusion_report(cm, ["No Depresión", "Depresión"]))
+    print(f"Accuracy: {accuracy:.4f}")
+    print(f"F1-Score: {f1:.4f}")
+
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    path = MODEL_DIR / f"{args.model_name}.joblib"
+    save_model(model, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrena el modelo B o busca hiperparámetros")
+    parser.add_argument("--search", action="store_true", help="búsqueda con validación cruzada y leaderboard")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=None, help="procesos del pool (por defecto, todas las CPUs)")
+    parser.add_argument("--scoring", choices=model_search.SCORING, default="f1")
+    parser.add_argument("--families", nargs="+", choices=model_search.FAMILIES, default=list(model_search.FAMILIES))
+    parser.add_argument("--top", type=int, default=15, help="filas del leaderboard a imprimir")
+    parser.add_argument("--save-best", nargs="?", const="search_best", default=None, metavar="NOMBRE",
+                        help="reentrenar el mejor candidato y guardarlo en models/NOMBRE.joblib")
+    parser.add_argument("--out-of-core", action="store_true", help="entrenar por bloques (datasets que no caben en memoria)")
+    parser.add_argument("--data", default=str(DATA_PATH), help="CSV de entrenamiento (modo --out-of-core)")
+    parser.add_argument("--chunk-rows", type=int, default=out_of_core.CHUNK_ROWS)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--C", type=float, default=0.01, help="regularización equivalente a LogisticRegression(C)")
+    parser.add_argument("--spill-dir", default=None, help="carpeta para los bloques transformados (por defecto, temporal)")
+    parser.add_argument("--model-name", default="logistic_b_sgd", help="nombre del artefacto en models/ (modo --out-of-core)")
+    args = parser.parse_args(argv)
+
     print("=" * 60)
     print("  Entrenamiento del Modelo Logistic Regression B")
     print("  (15 variables — excluye ideación suicida)")
     print("=" * 60)
 
+    if args.out_of_core:
+        train_streaming(args)
+        return
+
     # ── 1. Cargar datos ──
     if not DATA_PATH.exists():
         print(f"\n[ERROR] No se encontró el dataset en: {DATA_PATH}")
         print("Asegúrate de que 'student_depression.csv' esté en la carpeta 'data/'")
         sys.exit(1)
 
-    df = pd.read_csv(DATA_PATH)
+    # ── 2. Cache binario (el CSV ya viene con Sleep Duration limpio) ──
+    df = load_dataset(DATA_PATH)
     print(f"\nDataset cargado: {df.shape[0]} registros, {df.shape[1]} columnas")
 
-    # ── 2. Limpiar columna Sleep Duration (quitar comilla al final) ──
-    if "Sleep Duration" in df.columns:
-        df["Sleep Duration"] = df["Sleep Duration"].str.replace("'", "", regex=False)
-
     # ── 3. Separar variables ──
     y = df["Depression"]
 
@@ -72,17 +202,16 @@ def main():
 
     # ── 5. Construir pipeline ──
     num_cols = X_train.select_dtypes(include=["int64", "float64"]).columns.tolist()
-    cat_cols = X_train.select_dtypes(include=["object"]).columns.tolist()
+    cat_cols = X_train.select_dtypes(include=["object", "category"]).columns.tolist()
 
     print(f"Numéricas ({len(num_cols)}): {num_cols}")
     print(f"Categóricas ({len(cat_cols)}): {cat_cols}")
 
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("num", StandardScaler(), num_cols),
-            ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
-        ]
-    )
+    preprocessor = build_preprocessor(num_cols, cat_cols)
+
+    if args.search:
+        search(args, X_train, y_train, X_test, y_test, preprocessor)
+        return
 
     model = Pipeline(
         steps=[
@@ -108,9 +237,7 @@ def main():
 
     # ── 8. Guardar modelo ──
     MODEL_DIR.mkdir(parents=True, exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    print(f"\nModelo guardado en: {MODEL_PATH}")
-    print(f"Tamaño: {MODEL_PATH.stat().st_size / 1024:.1f} KB")
+    save_model(model, MODEL_PATH)
     print("\n¡Listo! Ahora puedes iniciar el servidor con:")
     print("  uvicorn main:app --reload")
 
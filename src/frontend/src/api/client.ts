@@ -54,8 +54,11 @@ export interface StudentRecord {
   risk_level: "low" | "medium" | "high";
   risk_label: string;
   depression_actual: number;
+  contributing_factors: string[];
 }
 
+export type StudentSortField = "probability" | "cgpa" | "age" | "id";
+
 export interface StudentsResponse {
   students: StudentRecord[];
   stats: {
@@ -64,9 +67,12 @@ export interface StudentsResponse {
     medium_risk: number;
     low_risk: number;
   };
-  page: number;
+  page: number | null;
   page_size: number;
   total_pages: number;
+  sort_by: StudentSortField | null;
+  order: "asc" | "desc";
+  next_cursor: string | null;
 }
 
 export interface RiskByDegree {
@@ -154,6 +160,9 @@ export async function getStudents(params?: {
   risk_filter?: string;
   page?: number;
   page_size?: number;
+  sort_by?: StudentSortField;
+  order?: "asc" | "desc";
+  cursor?: string;
 }): Promise<StudentsResponse> {
   const searchParams = new URLSearchParams();
   if (params?.search) searchParams.set("search", params.search);
@@ -161,6 +170,9 @@ export async function getStudents(params?: {
   if (params?.page) searchParams.set("page", String(params.page));
   if (params?.page_size)
     searchParams.set("page_size", String(params.page_size));
+  if (params?.sort_by) searchParams.set("sort_by", params.sort_by);
+  if (params?.order) searchParams.set("order", params.order);
+  if (params?.cursor) searchParams.set("cursor", params.cursor);
 
   const url = `${API_BASE}/students?${searchParams.toString()}`;
   const res = await fetch(url);
@@ -180,6 +192,83 @@ export async function getAnalytics(): Promise<AnalyticsResponse> {
   return res.json();
 }
 
+export type AnalyticsMetric =
+  | "count"
+  | "risk_counts"
+  | "mean_probability"
+  | "depression_rate";
+
+export interface AnalyticsQueryResponse {
+  dimensions: string[];
+  metrics: AnalyticsMetric[];
+  total: number;
+  groups: Record<string, string | number | null>[];
+}
+
+export async function queryAnalytics(params: {
+  dimensions: string[];
+  metrics?: AnalyticsMetric[];
+  min_count?: number;
+}): Promise<AnalyticsQueryResponse> {
+  const searchParams = new URLSearchParams();
+  searchParams.set("dimensions", params.dimensions.join(","));
+  if (params.metrics?.length)
+    searchParams.set("metrics", params.metrics.join(","));
+  if (params.min_count)
+    searchParams.set("min_count", String(params.min_count));
+
+  const res = await fetch(`${API_BASE}/analytics/query?${searchParams.toString()}`);
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({}));
+    throw new Error(err.detail || "Error al consultar analíticas");
+  }
+  return res.json();
+}
+
+export interface ThresholdMetrics {
+  tp: number;
+  fp: number;
+  fn: number;
+  tn: number;
+  precision: number | null;
+  recall: number | null;
+  f1: number | null;
+}
+
+export interface ThresholdSummary {
+  total: number;
+  counts: { low: number; medium: number; high: number };
+  high_pct: number;
+  metrics: { high: ThresholdMetrics; medium_or_high: ThresholdMetrics };
+}
+
+export interface ThresholdsResponse extends ThresholdSummary {
+  thresholds: { medium: number; high: number };
+  group_by?: string;
+  groups?: (ThresholdSummary & Record<string, unknown>)[];
+}
+
+export async function getThresholdWhatIf(params: {
+  medium: number;
+  high: number;
+  group_by?: string;
+  min_count?: number;
+}): Promise<ThresholdsResponse> {
+  const searchParams = new URLSearchParams();
+  searchParams.set("medium", String(params.medium));
+  searchParams.set("high", String(params.high));
+  if (params.group_by) searchParams.set("group_by", params.group_by);
+  if (params.min_count)
+    searchParams.set("min_count", String(params.min_count));
+
+  const res = await fetch(`${API_BASE}/analytics/thresholds?${searchParams.toString()}`);
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({}));
+    throw new Error(err.detail || "Error al calcular los umbrales");
+  }
+  return res.json();
+}
+
 export async function getDatasetColumns(): Promise<DatasetColumns> {
   const res = await fetch(`${API_BASE}/dataset/columns`);
   if (!res.ok) {